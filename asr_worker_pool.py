@@ -0,0 +1,340 @@
+"""
+Out-of-process Whisper ASR workers for the real-time translator.
+
+Audio chunks are copied into pre-allocated shared-memory slots and only the
+slot name travels over the task queue, so no sample data is pickled. Each
+worker process loads its own WhisperModel and results are handed back in the
+order the chunks were submitted.
+
+Every worker has its own task queue, so the pool knows which chunks each
+one holds. A worker that dies (out of memory, a crash in CTranslate2) has
+those chunks reported as failed instead of holding back every later result,
+and a replacement is started in its place.
+"""
+
+import os
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import queue
+import threading
+import time
+import numpy as np
+
+
+def _load_whisper(model_size, device, compute_type, cpu_threads):
+    from faster_whisper import WhisperModel
+    return WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _worker_main(worker_id, model_size, device, compute_type, cpu_threads, cpu_affinity,
+                 transcribe_options, task_queue, result_queue, model_loader=None):
+    """Worker process entry point: load a model and transcribe slot contents"""
+    if cpu_affinity and hasattr(os, "sched_setaffinity"):
+        # Before the model load, so CTranslate2's threads inherit it
+        os.sched_setaffinity(0, cpu_affinity)
+    try:
+        model = (model_loader or _load_whisper)(model_size, device, compute_type, cpu_threads)
+    except Exception as e:
+        result_queue.put(("error", worker_id, f"Error loading Whisper model: {e}", None, None))
+        return
+    result_queue.put(("ready", worker_id, None, None, None))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        seq, slot_name, length = task
+        shm = shared_memory.SharedMemory(name=slot_name)
+        try:
+            started = time.time()
+            audio = np.ndarray((length,), dtype=np.float32, buffer=shm.buf)
+            segments, info = model.transcribe(audio, **transcribe_options)
+            text = " ".join([seg.text.strip() for seg in segments if seg.text.strip()])
+            result_queue.put((seq, text, None, started, time.time()))
+        except Exception as e:
+            result_queue.put((seq, None, str(e), None, None))
+        finally:
+            # Views on the buffer must be released before the mapping is closed
+            audio = None
+            segments = None
+            shm.close()
+
+
+class ASRWorkerPool:
+    """Pool of Whisper worker processes fed through shared-memory slots.
+
+    Parameters
+    ----------
+    model_size : str
+        Whisper model size or path passed to ``WhisperModel`` in every worker.
+    num_workers : int
+        Number of worker processes; chunks are decoded in parallel when more
+        than one is queued.
+    slot_samples : int
+        Capacity of each shared-memory slot in float32 samples. Chunks longer
+        than this are rejected.
+    cpu_threads : int, optional
+        Intra-op threads per worker model; 0 lets CTranslate2 decide.
+    cpu_affinity : list of int, optional
+        Cores the worker processes are restricted to (Linux only).
+    num_slots : int, optional
+        Number of slots, i.e. chunks that may be in flight at once. Defaults
+        to twice the number of workers.
+    model_loader : callable, optional
+        Picklable ``(model_size, device, compute_type, cpu_threads)`` factory
+        run in each worker. Defaults to loading a faster-whisper model.
+    """
+
+    def __init__(self, model_size, num_workers, slot_samples, device="cpu",
+                 compute_type="float32", transcribe_options=None, num_slots=None, cpu_threads=0,
+                 cpu_affinity=None, model_loader=None):
+        self.model_size = model_size
+        self.num_workers = max(1, int(num_workers))
+        self.slot_samples = int(slot_samples)
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = int(cpu_threads)
+        self.cpu_affinity = list(cpu_affinity) if cpu_affinity else None
+        self.transcribe_options = dict(transcribe_options or {})
+        self.num_slots = num_slots or self.num_workers * 2
+        self.model_loader = model_loader
+        self.restarts = 0
+
+        self._ctx = mp.get_context("spawn")
+        self._result_queue = None
+        self._processes = []  # by worker id; None once a worker is given up on
+        self._task_queues = []
+        self._loaded = []  # whether each worker's current process finished loading
+        self._slots = {}
+        self._free_slots = queue.Queue()
+        self._in_flight = {}  # seq -> (slot name, worker id)
+        self._completed = {}  # seq -> (text, error, asr_start, asr_end)
+        self._next_seq = 0
+        self._next_result = 0
+        self._lock = threading.Lock()
+        self._collector = None
+        self._running = False
+
+    def start(self, timeout=300.0):
+        """Spawn the workers and wait until every model is loaded"""
+        self._result_queue = self._ctx.Queue()
+
+        for _ in range(self.num_slots):
+            shm = shared_memory.SharedMemory(create=True, size=self.slot_samples * 4)
+            self._slots[shm.name] = shm
+            self._free_slots.put(shm.name)
+
+        self._processes = [None] * self.num_workers
+        self._task_queues = [None] * self.num_workers
+        self._loaded = [False] * self.num_workers
+        for worker_id in range(self.num_workers):
+            self._new_task_queue(worker_id)
+            self._spawn(worker_id)
+
+        ready = 0
+        try:
+            while ready < self.num_workers:
+                kind, worker_id, message, _, _ = self._result_queue.get(timeout=timeout)
+                if kind == "error":
+                    print(f"ASR worker {worker_id}: {message}")
+                    self.stop()
+                    return False
+                self._loaded[worker_id] = True
+                ready += 1
+        except queue.Empty:
+            print("Timed out waiting for ASR workers to load")
+            self.stop()
+            return False
+
+        self._running = True
+        self._collector = threading.Thread(target=self._collect_results, daemon=True)
+        self._collector.start()
+        print(f"ASR worker pool ready ({self.num_workers} processes)")
+        return True
+
+    def _new_task_queue(self, worker_id):
+        """Give ``worker_id`` a fresh task queue; the caller holds the lock
+        once workers are running"""
+        old_queue = self._task_queues[worker_id]
+        if old_queue is not None:
+            # Nobody reads it any more; do not block interpreter exit on it
+            old_queue.cancel_join_thread()
+            old_queue.close()
+        self._task_queues[worker_id] = self._ctx.Queue()
+        self._loaded[worker_id] = False
+
+    def _spawn(self, worker_id):
+        """Start the process for ``worker_id`` reading its current task queue"""
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.model_size, self.device, self.compute_type, self.cpu_threads,
+                  self.cpu_affinity, self.transcribe_options, self._task_queues[worker_id],
+                  self._result_queue, self.model_loader),
+            daemon=True
+        )
+        process.start()
+        with self._lock:
+            self._processes[worker_id] = process
+
+    def submit(self, audio_chunk, timeout=None):
+        """Copy a chunk into a free slot and queue it for transcription.
+
+        Blocks for up to ``timeout`` seconds while every slot is in flight and
+        returns the chunk's sequence number, or None if no slot became free.
+        """
+        if len(audio_chunk) > self.slot_samples:
+            raise ValueError(f"Chunk of {len(audio_chunk)} samples exceeds slot size {self.slot_samples}")
+        try:
+            slot_name = self._free_slots.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        length = len(audio_chunk)
+        slot = np.ndarray((length,), dtype=np.float32, buffer=self._slots[slot_name].buf)
+        slot[:] = audio_chunk
+        del slot
+
+        with self._lock:
+            # The worker holding the fewest chunks; a replacement still loading
+            # its model just queues them
+            held = {worker_id: 0 for worker_id, process in enumerate(self._processes) if process is not None}
+            if not held:
+                self._free_slots.put(slot_name)
+                raise RuntimeError("No ASR workers left running")
+            for _, owner in self._in_flight.values():
+                if owner in held:
+                    held[owner] += 1
+            worker_id = min(held, key=held.get)
+            seq = self._next_seq
+            self._next_seq += 1
+            self._in_flight[seq] = (slot_name, worker_id)
+            self._task_queues[worker_id].put((seq, slot_name, length))
+        return seq
+
+    def skip(self):
+        """Take the next sequence number for a chunk handled without a worker.
+
+        The chunk completes at once with no text, so ``get_ready`` returns
+        it in its place among the decoded chunks.
+        """
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._completed[seq] = (None, None, None, None)
+        return seq
+
+    def _collect_results(self):
+        """Move worker results into the reorder buffer, recycle slots and
+        replace workers that died"""
+        next_check = time.time() + 0.5
+        while self._running:
+            try:
+                message = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+            if message is not None:
+                self._handle_message(message)
+            if message is None or time.time() >= next_check:
+                # Read everything already sent first, so a result a worker
+                # delivered just before dying is not counted as lost
+                try:
+                    while True:
+                        self._handle_message(self._result_queue.get_nowait())
+                except queue.Empty:
+                    pass
+                self._check_workers()
+                next_check = time.time() + 0.5
+
+    def _handle_message(self, message):
+        if message[0] in ("ready", "error"):
+            # A replacement worker finished (or failed) loading its model
+            kind, worker_id, error = message[:3]
+            if kind == "ready":
+                self._loaded[worker_id] = True
+            else:
+                print(f"ASR worker {worker_id}: {error}")
+            return
+        seq, text, error, started, finished = message
+        with self._lock:
+            entry = self._in_flight.pop(seq, None)
+            if entry is not None:
+                # Chunks of a dead worker were already failed
+                self._completed[seq] = (text, error, started, finished)
+        if entry is not None:
+            self._free_slots.put(entry[0])
+
+    def _check_workers(self):
+        """Fail the chunks held by dead workers and start replacements"""
+        restart = []
+        for worker_id, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            error = f"ASR worker {worker_id} died (exit code {process.exitcode})"
+            with self._lock:
+                lost = [seq for seq, (_, owner) in self._in_flight.items() if owner == worker_id]
+                for seq in lost:
+                    slot_name, _ = self._in_flight.pop(seq)
+                    self._completed[seq] = (None, error, None, None)
+                    self._free_slots.put(slot_name)
+                if self._loaded[worker_id]:
+                    # Chunks submitted from here on wait in the new queue for the replacement
+                    self._new_task_queue(worker_id)
+                    restart.append(worker_id)
+                else:
+                    self._processes[worker_id] = None
+            if worker_id in restart:
+                print(f"{error}; {len(lost)} chunk(s) lost, restarting it")
+            else:
+                # It died loading the model; a replacement would fail the same way
+                print(f"{error} before its model loaded; not restarting it")
+        # Spawning takes a while; submit() and get_ready() must not wait on it
+        for worker_id in restart:
+            self.restarts += 1
+            self._spawn(worker_id)
+
+    def get_ready(self):
+        """Return ``(seq, text, error, asr_start, asr_end)`` for completed chunks,
+        in submission order"""
+        ready = []
+        with self._lock:
+            while self._next_result in self._completed:
+                ready.append((self._next_result,) + self._completed.pop(self._next_result))
+                self._next_result += 1
+        return ready
+
+    def pending(self):
+        """Number of submitted chunks whose results have not been returned yet"""
+        with self._lock:
+            return self._next_seq - self._next_result
+
+    def stop(self):
+        """Shut down the workers and release the shared-memory slots"""
+        self._running = False
+        # Stop the collector first so it does not replace workers being shut down
+        if self._collector is not None:
+            self._collector.join(timeout=2.0)
+            self._collector = None
+        for task_queue in self._task_queues:
+            if task_queue is not None:
+                try:
+                    task_queue.put(None)
+                except Exception:
+                    pass
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._task_queues = []
+        for shm in self._slots.values():
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._slots = {}
+        self._free_slots = queue.Queue()
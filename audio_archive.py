@@ -0,0 +1,234 @@
+"""
+Archive of the audio the pipeline heard, for debugging bad captions.
+
+The capture callback copies each block into a preallocated ring buffer and
+returns. It never allocates, locks or touches the disk. A writer thread
+drains the ring into segment files of ``segment_seconds`` each: FLAC when
+the optional ``soundfile`` package is installed (or Ogg Opus if its
+libsndfile supports it), otherwise 16-bit WAV. If the writer falls more
+than ``buffer_seconds`` behind, the oldest audio is overwritten and counted
+as dropped; capture itself never waits.
+
+Each closed segment gets a line in ``index.jsonl`` with the capture time of
+its first and last sample, so any subtitle timestamp can be mapped to a file
+and offset with ``find_segment``.
+"""
+
+import os
+import json
+import time
+import wave
+import threading
+
+import numpy as np
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+FORMATS = {"flac": ("FLAC", "PCM_16", ".flac"), "opus": ("OGG", "OPUS", ".opus"), "wav": (None, None, ".wav")}
+ANCHOR_SECONDS = 0.05  # spacing of the block timestamps that map sample positions to capture time
+
+
+class AudioArchive:
+    """Ring-buffered, segmented recording of a mono stream.
+
+    Parameters
+    ----------
+    directory : str
+        Where segments and ``index.jsonl`` are written.
+    sample_rate : int
+        Rate of the blocks passed to ``write``.
+    audio_format : str
+        ``flac``, ``opus`` or ``wav``. Falls back to ``wav`` without soundfile.
+    segment_seconds : float
+        Length of each file.
+    buffer_seconds : float
+        Ring capacity; how far the writer may fall behind before audio is dropped.
+    session : str, optional
+        Prefix for file names and the session recorded in the index.
+    """
+
+    def __init__(self, directory, sample_rate=16000, audio_format="flac", segment_seconds=60.0,
+                 buffer_seconds=30.0, session=""):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.session = session
+        if audio_format not in FORMATS:
+            raise ValueError(f"Unknown archive format '{audio_format}'")
+        if audio_format != "wav" and soundfile is None:
+            print(f"soundfile is not installed; archiving as WAV instead of {audio_format}")
+            audio_format = "wav"
+        elif audio_format == "opus" and "OPUS" not in soundfile.available_subtypes("OGG"):
+            print("This libsndfile cannot write Opus; archiving as FLAC")
+            audio_format = "flac"
+        self.audio_format = audio_format
+        self.segment_samples = int(segment_seconds * sample_rate)
+
+        self.ring = np.zeros(int(buffer_seconds * sample_rate), dtype=np.float32)
+        self.written = 0  # samples ever written by the callback
+        self.read = 0  # samples ever taken by the writer
+        # One block timestamp per ANCHOR_SECONDS of audio, however small the
+        # blocks, and enough of them to cover the whole ring
+        self.anchor_interval = max(1, int(ANCHOR_SECONDS * sample_rate))
+        self.anchor_capacity = len(self.ring) // self.anchor_interval + 2
+        self.anchor_positions = np.zeros(self.anchor_capacity, dtype=np.int64)
+        self.anchor_times = np.zeros(self.anchor_capacity, dtype=np.float64)
+        self.anchors = 0
+        self.next_anchor = 0
+
+        self.segment = None  # open file object
+        self.segment_info = None
+        self.segments = 0
+        self.dropped = 0
+        self.running = False
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def write(self, block, capture_time):
+        """Copy one block into the ring; safe to call from the audio callback"""
+        n = len(block)
+        capacity = len(self.ring)
+        if n > capacity:
+            block = block[-capacity:]
+            capture_time += (n - capacity) / self.sample_rate
+            n = capacity
+        if self.written >= self.next_anchor:
+            slot = self.anchors % self.anchor_capacity
+            self.anchor_positions[slot] = self.written
+            self.anchor_times[slot] = capture_time
+            self.anchors += 1
+            self.next_anchor = self.written + self.anchor_interval
+
+        start = self.written % capacity
+        first = min(n, capacity - start)
+        self.ring[start:start + first] = block[:first]
+        self.ring[:n - first] = block[first:]
+        self.written += n
+
+    def capture_time_of(self, position):
+        """Capture time of a sample position, from the nearest earlier anchor"""
+        count = min(self.anchors, self.anchor_capacity)
+        positions = self.anchor_positions[:count]
+        earlier = positions <= position
+        if not earlier.any():
+            return None
+        slot = np.flatnonzero(earlier)[np.argmax(positions[earlier])]
+        return float(self.anchor_times[slot] + (position - positions[slot]) / self.sample_rate)
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="audio-archive", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10.0)
+            self.thread = None
+
+    def _run(self):
+        while self.running:
+            self.wakeup.wait(0.25)
+            self.wakeup.clear()
+            self._drain()
+        self._drain()
+        self._close_segment()
+
+    def _drain(self):
+        capacity = len(self.ring)
+        while True:
+            written = self.written
+            if written - self.read > capacity:
+                self.dropped += written - capacity - self.read
+                self.read = written - capacity
+                # A gap inside a file would shift every later timestamp
+                self._close_segment()
+            if written == self.read:
+                return
+            if self.segment is None:
+                self._open_segment()
+            room = self.segment_samples - self.segment_info["samples"]
+            n = min(written - self.read, room, capacity - self.read % capacity)
+            start = self.read % capacity
+            samples = self.ring[start:start + n].copy()
+            if self.written - self.read > capacity:
+                continue  # overwritten while copying; the next pass drops it
+            self._write_segment(samples)
+            self.read += n
+            if self.segment_info["samples"] >= self.segment_samples:
+                self._close_segment()
+
+    def _open_segment(self):
+        start_time = self.capture_time_of(self.read) or time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(start_time)) + f"-{int(start_time * 1000) % 1000:03d}"
+        container, subtype, extension = FORMATS[self.audio_format]
+        base = os.path.join(self.directory, f"{self.session + '_' if self.session else ''}{stamp}")
+        path = base + extension
+        suffix = 1
+        while os.path.exists(path):
+            path = f"{base}-{suffix}{extension}"
+            suffix += 1
+        if container is None:
+            self.segment = wave.open(path, "wb")
+            self.segment.setnchannels(1)
+            self.segment.setsampwidth(2)
+            self.segment.setframerate(self.sample_rate)
+        else:
+            self.segment = soundfile.SoundFile(path, "w", samplerate=self.sample_rate, channels=1,
+                                               format=container, subtype=subtype)
+        self.segment_info = {"file": os.path.basename(path), "session": self.session,
+                             "start": start_time, "position": self.read, "samples": 0}
+
+    def _write_segment(self, samples):
+        if isinstance(self.segment, wave.Wave_write):
+            self.segment.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+        else:
+            self.segment.write(samples)
+        self.segment_info["samples"] += len(samples)
+
+    def _close_segment(self):
+        if self.segment is None:
+            return
+        self.segment.close()
+        info = self.segment_info
+        entry = {
+            "file": info["file"],
+            "session": info["session"],
+            "start": info["start"],
+            "end": info["start"] + info["samples"] / self.sample_rate,
+            "samples": info["samples"],
+            "sample_rate": self.sample_rate
+        }
+        with open(os.path.join(self.directory, "index.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.segment = None
+        self.segment_info = None
+        self.segments += 1
+
+    def get_stats(self):
+        return {
+            "format": self.audio_format,
+            "segments": self.segments,
+            "seconds_archived": self.read / self.sample_rate,
+            "behind_seconds": (self.written - self.read) / self.sample_rate,
+            "dropped_seconds": self.dropped / self.sample_rate
+        }
+
+
+def find_segment(directory, timestamp, session=None):
+    """Return ``(path, offset seconds)`` of the archived audio at a capture time, or None"""
+    try:
+        with open(os.path.join(directory, "index.jsonl"), "r", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return None
+    for entry in entries:
+        if session is not None and entry.get("session") != session:
+            continue
+        if entry["start"] <= timestamp < entry["end"]:
+            return os.path.join(directory, entry["file"]), timestamp - entry["start"]
+    return None
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Calibrate the translator for the local machine.
+
+Replays a folder of WAV recordings through the pipeline (via benchmark.py)
+for every Whisper model, compute type, ``cpu_threads``/``num_workers``
+setting and chunk length in the search space, and writes the most accurate
+config that still meets the real-time factor and latency targets into
+``translation_config.json``.
+
+Candidates are tried from most to least accurate: larger models first, then
+higher precision. Every chunk length and thread setting of one
+(model, compute type) pair is measured, and the search stops at the first
+pair with a passing config. When a ``.txt`` reference transcript sits next to
+a WAV file, the word error rate is reported as well.
+
+End-to-end latency is estimated as chunk length + p95 of the ASR, translate
+and write stages. Audio is replayed faster than real time, so queue wait is
+not part of the measurement. The ASR real-time factor must stay below
+``--target-rtf`` so the queue cannot grow without bound.
+
+Example:
+    python autotune.py recordings/ --target-rtf 0.5 --target-latency 4
+"""
+
+import os
+import sys
+import json
+import glob
+
+from benchmark import run_isolated
+
+MODEL_ORDER = ("large-v2", "medium", "small", "base", "tiny")
+COMPUTE_ORDER = ("float32", "int8_float32", "int8")
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_references(wav_files):
+    """Concatenate ``<name>.txt`` transcripts if every WAV file has one"""
+    texts = []
+    for path in wav_files:
+        reference = os.path.splitext(path)[0] + ".txt"
+        if not os.path.exists(reference):
+            return None
+        with open(reference, "r", encoding="utf-8") as f:
+            texts.append(f.read().strip())
+    return " ".join(texts)
+
+
+def estimated_latency(result):
+    """Chunk length plus p95 of the per-chunk processing stages"""
+    latency = result["latency"]
+    stages = sum(latency.get(stage, {}).get("p95", 0.0) for stage in ("asr", "translate", "write"))
+    return result["config"]["chunk_duration"] + stages
+
+
+def meets_targets(result, target_rtf, target_latency):
+    if "error" in result or result.get("asr_rtf") is None:
+        return False
+    return result["asr_rtf"] <= target_rtf and estimated_latency(result) <= target_latency
+
+
+def candidate_pairs(models, compute_types):
+    """(model, compute type) pairs from most to least accurate"""
+    def rank(value, order):
+        return order.index(value) if value in order else len(order)
+
+    models = sorted(models, key=lambda model: rank(model, MODEL_ORDER))
+    compute_types = sorted(compute_types, key=lambda compute_type: rank(compute_type, COMPUTE_ORDER))
+    return [(model, compute_type) for model in models for compute_type in compute_types]
+
+
+def default_thread_counts():
+    cores = os.cpu_count() or 1
+    return sorted({max(1, cores // 4), max(1, cores // 2), cores})
+
+
+def calibrate(wav_files, base_config, models, compute_types, chunk_durations, cpu_threads,
+              num_workers, target_rtf, target_latency, translation_delay=0.0):
+    """Return ``(best config or None, all results)``"""
+    reference = load_references(wav_files)
+    results = []
+    for model, compute_type in candidate_pairs(models, compute_types):
+        passing = []
+        for chunk_duration in chunk_durations:
+            for threads in cpu_threads:
+                for workers in num_workers:
+                    config = dict(base_config)
+                    config.update({
+                        "whisper_model_size": model,
+                        "compute_type": compute_type,
+                        "chunk_duration": chunk_duration,
+                        "cpu_threads": threads,
+                        "num_workers": workers,
+                        "asr_workers": 0,
+                        "enable_translation": True,
+                        "enable_subtitles": True
+                    })
+                    result = run_isolated(wav_files, config, False, translation_delay)
+                    if reference is not None and "transcript" in result:
+                        result["wer"] = word_error_rate(reference, result["transcript"])
+                    print_candidate(result, target_rtf, target_latency)
+                    results.append(result)
+                    if meets_targets(result, target_rtf, target_latency):
+                        passing.append(result)
+        if passing:
+            best = min(passing, key=lambda result: (result.get("wer", 0.0), estimated_latency(result)))
+            return best["config"], results
+    return None, results
+
+
+def print_candidate(result, target_rtf, target_latency):
+    config = result["config"]
+    name = (f"{config['whisper_model_size']}/{config['compute_type']} chunk={config['chunk_duration']}s "
+            f"threads={config['cpu_threads']} workers={config['num_workers']}")
+    if "error" in result:
+        print(f"❌ {name}: {result['error']}")
+        return
+    mark = "✅" if meets_targets(result, target_rtf, target_latency) else "  "
+    wer = f"  WER: {result['wer']:.1%}" if "wer" in result else ""
+    print(f"{mark} {name}: ASR RTF {result['asr_rtf'] or 0:.2f}  "
+          f"latency ~{estimated_latency(result):.2f}s{wer}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pick Whisper model, compute type and threads for this machine")
+    parser.add_argument("wav_dir", help="Directory of WAV files to calibrate on (optional <name>.txt references)")
+    parser.add_argument("--target-rtf", type=float, default=0.5, help="Highest acceptable ASR real-time factor")
+    parser.add_argument("--target-latency", type=float, default=5.0, help="Highest acceptable p95 latency in seconds")
+    parser.add_argument("--models", nargs="+", default=["small", "base", "tiny"], help="Whisper model sizes to try")
+    parser.add_argument("--compute-types", nargs="+", default=["int8", "float32"], help="CTranslate2 compute types to try")
+    parser.add_argument("--chunk-durations", nargs="+", type=float, default=[2.0, 3.0, 5.0], help="Chunk lengths in seconds")
+    parser.add_argument("--cpu-threads", nargs="+", type=int, default=default_thread_counts(), help="cpu_threads values to try")
+    parser.add_argument("--num-workers", nargs="+", type=int, default=[1], help="num_workers values to try")
+    parser.add_argument("--translation-delay", type=float, default=0.0, help="Simulated translation latency in seconds")
+    parser.add_argument("--config", default="translation_config.json", help="Config file to update")
+    parser.add_argument("--dry-run", action="store_true", help="Report the choice without writing the config")
+
+    args = parser.parse_args(argv)
+
+    wav_files = sorted(glob.glob(os.path.join(args.wav_dir, "*.wav")))
+    if not wav_files:
+        print(f"No WAV files found in {args.wav_dir}")
+        return 1
+
+    base_config = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r") as f:
+            base_config = json.load(f)
+
+    print(f"🔧 Calibrating on {len(wav_files)} files "
+          f"(target ASR RTF ≤ {args.target_rtf}, latency ≤ {args.target_latency}s)")
+    best, _ = calibrate(wav_files, base_config, args.models, args.compute_types, args.chunk_durations,
+                        args.cpu_threads, args.num_workers, args.target_rtf, args.target_latency,
+                        args.translation_delay)
+    if best is None:
+        print("❌ No configuration meets the targets; relax them or try smaller models")
+        return 1
+
+    chosen = {key: best[key] for key in
+              ("whisper_model_size", "compute_type", "chunk_duration", "cpu_threads", "num_workers")}
+    print(f"🏆 Selected: {json.dumps(chosen)}")
+    if args.dry_run:
+        return 0
+
+    base_config.update(chosen)
+    base_config["asr_workers"] = 0
+    with open(args.config, "w") as f:
+        json.dump(base_config, f, indent=2)
+    print(f"✅ Written to {args.config}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Replay benchmark for the real-time translation pipeline.
+
+Feeds a directory of WAV files through RealtimeAudioTranslator exactly as the
+audio callback would receive them, with a deterministic FakeTranslator in
+place of Google Translate, and reports real-time factor, per-stage latency
+percentiles, CPU time and peak RSS for every model/config combination. Each
+combination runs in its own process so peak RSS and model load time are not
+polluted by earlier runs. Results are written as JSON for comparing runs.
+
+Example:
+    python benchmark.py recordings/ --models tiny base --chunk-durations 3 5
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import queue
+import wave
+import platform
+import tempfile
+import threading
+import multiprocessing as mp
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class FakeTranslator:
+    """Deterministic stand-in for Translator: no network, optional fixed delay"""
+
+    def __init__(self, target_lang="fa", delay=0.0):
+        self.model_name = "Fake translator"
+        self.target_lang = target_lang
+        self.delay = delay
+        self.model = self
+        self.calls = 0
+        self.texts = []  # English input, in order, for accuracy scoring
+
+    def load_model(self):
+        return True
+
+    def translate_text(self, english_text, src="en"):
+        self.calls += 1
+        self.texts.append(english_text)
+        if self.delay:
+            time.sleep(self.delay)
+        return f"[{self.target_lang}] {english_text}"
+
+    def translate_batch(self, english_texts, src="en"):
+        return [self.translate_text(text, src=src) for text in english_texts]
+
+
+def load_wav(path, sample_rate=16000):
+    """Read a PCM WAV file as mono float32 at ``sample_rate``"""
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        audio = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate:
+        from math import gcd
+        from scipy.signal import resample_poly
+        factor = gcd(rate, sample_rate)
+        audio = resample_poly(audio, sample_rate // factor, rate // factor).astype(np.float32)
+    return audio
+
+
+def replay(translator, audio, block_seconds=0.1, realtime=False):
+    """Push audio through ``translator.audio_callback`` and wait for the pipeline to drain.
+
+    Each call is one recording: audio left over from an earlier file is
+    discarded, and the tail of this one is queued as a final short chunk
+    rather than carried into the next file.
+    """
+    from latency import ChunkTrace
+
+    block = int(translator.sample_rate * block_seconds)
+    translator.buffer_fill = 0
+    translator.is_recording = True
+    worker = threading.Thread(target=translator.run_processing_loop, daemon=True)
+    worker.start()
+
+    start = time.time()
+    for offset in range(0, len(audio), block):
+        indata = audio[offset:offset + block].reshape(-1, 1)
+        translator.audio_callback(indata, len(indata), None, None)
+        if realtime:
+            delay = start + (offset + len(indata)) / translator.sample_rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+    if translator.buffer_fill:
+        chunk = translator.audio_buffer[:translator.buffer_fill].copy()
+        translator.buffer_fill = 0
+        trace = ChunkTrace(translator.chunk_capture_time)
+        trace.mark("enqueue")
+        translator.audio_queue.put((chunk, trace))
+
+    # The loop finishes the chunk it is working on before it exits
+    while translator.audio_queue.qsize() > 0:
+        time.sleep(0.01)
+    translator.is_recording = False
+    worker.join()
+    return time.time() - start
+
+
+def _usage():
+    if resource is None:
+        return None, None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return usage.ru_utime + usage.ru_stime, peak_rss
+
+
+def run_config(wav_files, config, realtime=False, translation_delay=0.0):
+    """Benchmark one config in the current process and return a result dict"""
+    from subtitle_stream import RealtimeAudioTranslator
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    config_file = os.path.join(workdir, "translation_config.json")
+    with open(config_file, "w") as f:
+        json.dump(config, f, indent=2)
+
+    translator = RealtimeAudioTranslator(
+        whisper_model_size=config.get("whisper_model_size", "tiny"),
+        chunk_duration=float(config.get("chunk_duration", 5.0)),
+        subtitle_file=os.path.join(workdir, "subtitle.txt"),
+        config_file=config_file
+    )
+
+    load_start = time.time()
+    if not translator.initialize_models():
+        return {"config": config, "error": "Failed to initialize models"}
+    load_seconds = time.time() - load_start
+    fake_translator = FakeTranslator(config.get("target_language", "fa"), delay=translation_delay)
+    translator.translator = fake_translator
+
+    audio_seconds = 0.0
+    wall_seconds = 0.0
+    cpu_before, _ = _usage()
+    try:
+        for path in wav_files:
+            audio = load_wav(path, translator.sample_rate)
+            audio_seconds += len(audio) / translator.sample_rate
+            wall_seconds += replay(translator, audio, realtime=realtime)
+    finally:
+        if translator.asr_pool:
+            translator.asr_pool.stop()
+    cpu_after, peak_rss = _usage()
+
+    stats = translator.get_stats()
+    cpu_seconds = cpu_after - cpu_before if cpu_before is not None else None
+    return {
+        "config": config,
+        "files": len(wav_files),
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall_seconds,
+        "rtf": wall_seconds / audio_seconds if audio_seconds else None,
+        "asr_rtf": stats["asr_rtf"],
+        "model_load_seconds": load_seconds,
+        "subtitles": stats["translation_count"],
+        "latency": stats["latency"],
+        "transcript": " ".join(fake_translator.texts),
+        "cpu_seconds": cpu_seconds,
+        "cpu_utilization": cpu_seconds / wall_seconds if cpu_seconds is not None and wall_seconds else None,
+        "peak_rss_mb": peak_rss / (1024 * 1024) if peak_rss else None
+    }
+
+
+def _run_in_child(result_queue, *args):
+    try:
+        result_queue.put(run_config(*args))
+    except Exception as e:
+        result_queue.put({"config": args[1], "error": str(e)})
+
+
+def run_isolated(wav_files, config, realtime=False, translation_delay=0.0, timeout=None):
+    """Run one config in a fresh process so RSS and load time are its own"""
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    process = ctx.Process(target=_run_in_child,
+                          args=(result_queue, wav_files, config, realtime, translation_delay))
+    process.start()
+    return _wait_for_result(process, result_queue, config, timeout)
+
+
+def _wait_for_result(process, result_queue, config, timeout=None, poll=1.0):
+    """Return the child's result, or an error result if it dies or runs past ``timeout``"""
+    deadline = time.time() + timeout if timeout else None
+    while True:
+        try:
+            result = result_queue.get(timeout=poll)
+            break
+        except queue.Empty:
+            pass
+        if process.exitcode is not None:
+            # The child may have put its result just before exiting
+            try:
+                result = result_queue.get(timeout=poll)
+            except queue.Empty:
+                result = {"config": config, "error": f"Benchmark process exited with code {process.exitcode}"}
+            break
+        if deadline is not None and time.time() > deadline:
+            process.terminate()
+            result = {"config": config, "error": f"Benchmark timed out after {timeout:.0f}s"}
+            break
+    process.join()
+    return result
+
+
+def build_configs(base_config, models, compute_types, chunk_durations, asr_workers):
+    configs = []
+    for model in models:
+        for compute_type in compute_types:
+            for chunk_duration in chunk_durations:
+                for workers in asr_workers:
+                    config = dict(base_config)
+                    config.update({
+                        "whisper_model_size": model,
+                        "compute_type": compute_type,
+                        "chunk_duration": chunk_duration,
+                        "asr_workers": workers,
+                        "enable_translation": True,
+                        "enable_subtitles": True
+                    })
+                    configs.append(config)
+    return configs
+
+
+def print_result(result):
+    config = result["config"]
+    name = (f"{config['whisper_model_size']}/{config['compute_type']} "
+            f"chunk={config['chunk_duration']}s workers={config['asr_workers']}")
+    if "error" in result:
+        print(f"❌ {name}: {result['error']}")
+        return
+    total = result["latency"].get("total", {})
+    asr = result["latency"].get("asr", {})
+    print(f"📊 {name}")
+    print(f"   RTF: {result['rtf']:.3f}  ASR RTF: {result['asr_rtf'] or 0:.3f}  "
+          f"load: {result['model_load_seconds']:.1f}s")
+    if total:
+        print(f"   total latency p50/p95/p99: {total['p50']:.2f}/{total['p95']:.2f}/{total['p99']:.2f}s")
+    if asr:
+        print(f"   ASR latency p50/p95/p99: {asr['p50']:.2f}/{asr['p95']:.2f}/{asr['p99']:.2f}s")
+    if result["cpu_seconds"] is not None:
+        print(f"   CPU: {result['cpu_seconds']:.1f}s ({result['cpu_utilization']:.1f} cores)  "
+              f"peak RSS: {result['peak_rss_mb']:.0f} MB")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay WAV files through the translation pipeline")
+    parser.add_argument("wav_dir", help="Directory of WAV files to replay")
+    parser.add_argument("--models", nargs="+", default=["tiny"], help="Whisper model sizes")
+    parser.add_argument("--compute-types", nargs="+", default=["auto"], help="CTranslate2 compute types")
+    parser.add_argument("--chunk-durations", nargs="+", type=float, default=[3.0], help="Chunk lengths in seconds")
+    parser.add_argument("--asr-workers", nargs="+", type=int, default=[0], help="ASR worker process counts")
+    parser.add_argument("--realtime", action="store_true", help="Feed audio at real-time speed instead of as fast as possible")
+    parser.add_argument("--translation-delay", type=float, default=0.0, help="Simulated translation latency in seconds")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds before a config's run is abandoned")
+    parser.add_argument("--config", default="translation_config.json", help="Base config to override")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write JSON results")
+
+    args = parser.parse_args(argv)
+
+    wav_files = sorted(glob.glob(os.path.join(args.wav_dir, "*.wav")))
+    if not wav_files:
+        print(f"No WAV files found in {args.wav_dir}")
+        return 1
+
+    base_config = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r") as f:
+            base_config = json.load(f)
+
+    configs = build_configs(base_config, args.models, args.compute_types,
+                            args.chunk_durations, args.asr_workers)
+    print(f"🚀 Benchmarking {len(configs)} configs on {len(wav_files)} files")
+
+    results = []
+    for config in configs:
+        result = run_isolated(wav_files, config, args.realtime, args.translation_delay, args.timeout)
+        print_result(result)
+        results.append(result)
+
+    report = {
+        "timestamp": time.time(),
+        "host": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version()
+        },
+        "realtime": args.realtime,
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Apply edits to translation_config.json to a running translator.
+
+ConfigWatcher polls the config file's modification time and passes changed
+keys to ``RealtimeAudioTranslator.apply_config``, so a text editor is enough
+to change the target language, the chunk length or the Whisper model while
+the stream keeps running.
+"""
+
+import os
+import json
+import threading
+
+
+class ConfigWatcher:
+    """Poll a config file and hot-apply its changes.
+
+    Parameters
+    ----------
+    translator : RealtimeAudioTranslator
+        Translator to reconfigure.
+    path : str, optional
+        File to watch. Defaults to the translator's ``config_file``.
+    interval : float, optional
+        Seconds between checks.
+    """
+
+    def __init__(self, translator, path=None, interval=1.0):
+        self.translator = translator
+        self.path = path or translator.config_file
+        self.interval = interval
+        self.last_mtime = self._mtime()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self.thread.start()
+        print(f"Watching {self.path} for changes")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.interval * 2)
+            self.thread = None
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Apply the file's changes if it was modified since the last check"""
+        mtime = self._mtime()
+        if mtime is None or mtime == self.last_mtime:
+            return None
+        self.last_mtime = mtime
+        try:
+            with open(self.path, "r") as f:
+                config = json.load(f)
+        except Exception as e:
+            # Probably caught mid-save; the next write changes the mtime again
+            print(f"Ignoring unreadable config: {e}")
+            return None
+        changes = {key: value for key, value in config.items()
+                   if self.translator.config.get(key) != value}
+        if not changes:
+            return None
+        # The file already holds these values, so do not write it back
+        result = self.translator.apply_config(changes, persist=False)
+        print(f"Config reloaded: {result}")
+        return result
@@ -0,0 +1,3 @@
+# test_audio_capture.py is an interactive capture check that opens a real
+# audio device at import time, not a pytest module
+collect_ignore = ["test_audio_capture.py"]
@@ -0,0 +1,158 @@
+"""
+Spectral fingerprint cache for audio that repeats.
+
+Streams replay the same jingles, ad reads and stingers many times a day. A
+chunk's fingerprint is one bit per frame and band pair: whether the energy
+difference between neighbouring bands rose or fell since the previous frame.
+This is the Haitsma-Kalker scheme, and it holds up under volume changes and
+light noise. Two chunks match when few enough bits differ. When a chunk
+matches one seen recently, the pipeline reuses its transcript and
+translations and skips Whisper and the translation call.
+
+Chunk boundaries do not line up with a replay exactly, so a match is looked
+for at every frame shift up to ``max_shift`` seconds. A chunk first has to
+pass a cheap check on its average spectrum, so only the closest few entries
+are compared bit by bit.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import REGISTRY
+
+FINGERPRINT_LOOKUPS = REGISTRY.counter("translator_cache_lookups_total", "Cache lookups", labels={"cache": "fingerprint"})
+FINGERPRINT_HITS = REGISTRY.counter("translator_cache_hits_total", "Cache hits", labels={"cache": "fingerprint"})
+
+FRAME = 2048
+HOP = 256
+BANDS = 33  # 32 bits per frame
+MIN_RMS = 1e-3  # near-silence fingerprints are noise and would match each other
+CANDIDATES = 4
+
+
+class Fingerprint:
+    """Bits plus the average band profile used to pick candidates"""
+
+    __slots__ = ("bits", "profile")
+
+    def __init__(self, bits, profile):
+        self.bits = bits
+        self.profile = profile
+
+
+class CacheEntry:
+    __slots__ = ("fingerprint", "text", "translations")
+
+    def __init__(self, fingerprint, text):
+        self.fingerprint = fingerprint
+        self.text = text
+        self.translations = {}  # target language -> translated text
+
+
+class FingerprintCache:
+    """LRU of recent chunk fingerprints and what they decoded to.
+
+    Parameters
+    ----------
+    size : int
+        Entries kept; the least recently matched is evicted first.
+    threshold : float
+        Largest fraction of differing bits that still counts as a match.
+    max_shift : float
+        Seconds a replay may be offset from the cached chunk.
+    sample_rate : int
+        Rate of the chunks passed in.
+    """
+
+    def __init__(self, size=128, threshold=0.25, max_shift=0.25, sample_rate=16000):
+        self.size = int(size)
+        self.threshold = float(threshold)
+        self.max_shift = max(0, int(max_shift * sample_rate / HOP))
+        self.sample_rate = sample_rate
+        self.entries = OrderedDict()
+        self.next_key = 0
+        self.lock = threading.Lock()
+
+        # Log-spaced band edges over 300 Hz - 5 kHz, where speech and music carry most energy
+        freqs = np.fft.rfftfreq(FRAME, 1.0 / sample_rate)
+        edges = np.geomspace(300.0, min(5000.0, sample_rate / 2), BANDS + 1)
+        band = np.searchsorted(edges, freqs, side="right") - 1
+        # power (frames, bins) @ bands (bins, BANDS) sums each band's bins
+        self.bands = ((band[:, None] == np.arange(BANDS)) & (freqs[:, None] < edges[-1])).astype(np.float32)
+        self.window = np.hanning(FRAME).astype(np.float32)
+
+        self.lookups = 0
+        self.hits = 0
+
+    def fingerprint(self, chunk):
+        """Fingerprint a mono chunk; None if it is too quiet or too short"""
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if len(chunk) < FRAME + 2 * HOP or np.sqrt(np.dot(chunk, chunk) / len(chunk)) < MIN_RMS:
+            return None
+        frames = np.lib.stride_tricks.sliding_window_view(chunk, FRAME)[::HOP] * self.window
+        power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+        energy = np.log(power.astype(np.float32) @ self.bands + 1e-10)
+        band_diff = energy[:, :-1] - energy[:, 1:]
+        bits = (band_diff[1:] - band_diff[:-1]) > 0
+        profile = energy.mean(axis=0)
+        return Fingerprint(bits, profile - profile.mean())
+
+    def distance(self, a, b):
+        """Lowest bit error rate over the allowed shifts"""
+        best = 1.0
+        for shift in range(-self.max_shift, self.max_shift + 1):
+            x = a.bits[max(shift, 0):]
+            y = b.bits[max(-shift, 0):]
+            overlap = min(len(x), len(y))
+            # Shifting must leave most of both chunks compared
+            if overlap < 0.8 * max(len(a.bits), len(b.bits)):
+                continue
+            best = min(best, np.count_nonzero(x[:overlap] != y[:overlap]) / x[:overlap].size)
+        return best
+
+    def lookup(self, fingerprint):
+        """Return the matching CacheEntry, or None"""
+        if fingerprint is None:
+            return None
+        FINGERPRINT_LOOKUPS.inc()
+        with self.lock:
+            self.lookups += 1
+            if not self.entries:
+                return None
+            keys = list(self.entries)
+            profiles = np.stack([self.entries[key].fingerprint.profile for key in keys])
+            nearest = np.argsort(np.abs(profiles - fingerprint.profile).mean(axis=1))[:CANDIDATES]
+            for index in nearest:
+                entry = self.entries[keys[index]]
+                if self.distance(fingerprint, entry.fingerprint) <= self.threshold:
+                    self.entries.move_to_end(keys[index])
+                    self.hits += 1
+                    FINGERPRINT_HITS.inc()
+                    return entry
+        return None
+
+    def add(self, fingerprint, text):
+        """Remember what a chunk decoded to; returns the new CacheEntry"""
+        if fingerprint is None or not self.size:
+            return None
+        entry = CacheEntry(fingerprint, text)
+        with self.lock:
+            self.entries[self.next_key] = entry
+            self.next_key += 1
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self):
+        return {
+            "entries": len(self.entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0
+        }
@@ -4,15 +4,21 @@ Flask-based web interface for real-time audio translation
 This should work without any permission issues
 """
 
-from flask import Flask, render_template_string, request, jsonify
-import threading
+from flask import Flask, Response, render_template_string, request, jsonify
+import os
 import time
-from subtitle_stream import RealtimeAudioTranslator
+import json
+from session_manager import SessionManager
+from transcript_store import TranscriptReader
+from metrics import REGISTRY
+from profiling import TRACER, PROFILER
 
 app = Flask(__name__)
 
-# Global translator instance
-translator_instance = None
+# All caption sessions share models through the session manager; the
+# Start/Stop buttons drive the "default" session
+session_manager = SessionManager()
+DEFAULT_SESSION = "default"
 
 # HTML template
 HTML_TEMPLATE = """
@@ -106,37 +112,138 @@ def home():
 
 @app.route('/start', methods=['POST'])
 def start_translation():
-    global translator_instance
     try:
-        translator_instance = RealtimeAudioTranslator(
+        session_manager.create_session(
             whisper_model_size="tiny",
             chunk_duration=3.0,
-            device_name="CABLE Output"
+            device_name="CABLE Output",
+            subtitle_file="subtitle.txt",
+            session_id=DEFAULT_SESSION
         )
-        # Start in a separate thread
-        thread = threading.Thread(target=translator_instance.start_streaming)
-        thread.daemon = True
-        thread.start()
         return jsonify({"message": "✅ Translation started successfully!"})
     except Exception as e:
         return jsonify({"message": f"❌ Error: {e}"})
 
 @app.route('/stop', methods=['POST'])
 def stop_translation():
-    global translator_instance
-    if translator_instance:
-        translator_instance.stop_streaming()
+    if session_manager.stop_session(DEFAULT_SESSION):
         return jsonify({"message": "⏹️ Translation stopped"})
     return jsonify({"message": "⚠️ No active translation"})
 
 @app.route('/stats')
 def get_stats():
-    global translator_instance
-    if translator_instance:
-        stats = translator_instance.get_stats()
-        return jsonify({"message": f"📊 Translations: {stats['translation_count']}, Last: {stats['last_translation']:.1f}s ago"})
+    session = session_manager.get_session(DEFAULT_SESSION)
+    if session:
+        stats = session.get_stats()
+        message = f"📊 Translations: {stats['translation_count']}, Last: {stats['last_translation']:.1f}s ago"
+        total = stats["latency"].get("total")
+        if total:
+            message += f", Latency p50/p95: {total['p50']:.1f}s/{total['p95']:.1f}s"
+        return jsonify({"message": message})
     return jsonify({"message": "📊 No active translation"})
 
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route('/trace/start', methods=['POST'])
+def start_trace():
+    TRACER.start()
+    return jsonify({"message": "🔴 Tracing started"})
+
+@app.route('/trace/stop', methods=['POST'])
+def stop_trace():
+    path = TRACER.stop(f"trace_{int(time.time())}.json")
+    if path:
+        return jsonify({"message": f"💾 Trace written to {path}", "path": path})
+    return jsonify({"message": "❌ Failed to write trace"}), 500
+
+@app.route('/profile', methods=['POST'])
+def start_profile():
+    try:
+        seconds = float(request.args.get("seconds", 10))
+    except ValueError:
+        seconds = None
+    if seconds is None or not 0 < seconds <= 3600:
+        return jsonify({"message": "❌ seconds must be a number between 0 and 3600"}), 400
+    path = f"profile_{int(time.time())}.folded"
+    if PROFILER.start(seconds, path):
+        return jsonify({"message": f"⏱️ Profiling for {seconds:.0f}s", "path": path})
+    return jsonify({"message": "⚠️ A profile is already running"}), 409
+
+@app.route('/sessions', methods=['GET'])
+def list_sessions():
+    return jsonify({"sessions": session_manager.list_sessions(), "stats": session_manager.get_stats()})
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    params = request.get_json(silent=True) or {}
+    # No subtitle_file: a client must not pick where the server writes;
+    # sessions write subtitle_<session_id>.txt
+    allowed = ["device_name", "language", "target_language", "whisper_model_size",
+               "chunk_duration", "session_id"]
+    try:
+        session_id = session_manager.create_session(**{k: v for k, v in params.items() if k in allowed})
+        return jsonify({"session_id": session_id, "message": "✅ Session started"})
+    except Exception as e:
+        return jsonify({"message": f"❌ Error: {e}"}), 400
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def stop_session(session_id):
+    if session_manager.stop_session(session_id):
+        return jsonify({"message": "⏹️ Session stopped"})
+    return jsonify({"message": "⚠️ No such session"}), 404
+
+@app.route('/sessions/<session_id>/stats')
+def session_stats(session_id):
+    session = session_manager.get_session(session_id)
+    if session:
+        return jsonify(session.get_stats())
+    return jsonify({"message": "⚠️ No such session"}), 404
+
+def _reconfigure(session_id):
+    session = session_manager.get_session(session_id)
+    if not session:
+        return jsonify({"message": "⚠️ No such session"}), 404
+    if request.method == 'GET':
+        return jsonify(session.translator.config)
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict):
+        return jsonify({"message": "❌ Expected a JSON object of config changes"}), 400
+    result = session.reconfigure(changes)
+    return jsonify(result), (400 if result["errors"] and not (result["applied"] or result["pending"]) else 200)
+
+@app.route('/config', methods=['GET', 'POST'])
+def default_session_config():
+    return _reconfigure(DEFAULT_SESSION)
+
+@app.route('/sessions/<session_id>/config', methods=['GET', 'POST'])
+def session_config(session_id):
+    return _reconfigure(session_id)
+
+@app.route('/transcripts')
+def search_transcripts():
+    """Search stored lines: ?q=words&session=id&since=unix&until=unix&limit=n"""
+    try:
+        with open(session_manager.config_file, 'r') as f:
+            path = json.load(f).get("transcript_db")
+    except (OSError, ValueError):
+        path = None
+    if not path:
+        return jsonify({"message": "⚠️ transcript_db is not configured"}), 404
+    args = request.args
+    try:
+        since = float(args["since"]) if "since" in args else None
+        until = float(args["until"]) if "until" in args else None
+        limit = min(int(args.get("limit", 50)), 1000)
+    except ValueError:
+        return jsonify({"message": "❌ since, until and limit must be numbers"}), 400
+    if not os.path.exists(path):
+        return jsonify({"message": "⚠️ No transcripts stored yet"}), 404
+    # Read-only: searching must not start a writer thread in this process
+    lines = TranscriptReader(path).search(args.get("q"), args.get("session"), since, until, limit)
+    return jsonify({"lines": lines})
+
 if __name__ == '__main__':
     print("🚀 Starting Flask web interface...")
     print("🌐 Opening at: http://localhost:5000")
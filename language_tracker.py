@@ -0,0 +1,94 @@
+"""
+Sticky source-language detection for ``language: "auto"``.
+
+Detecting the language of every chunk lets one misheard chunk flip a whole
+stream to the wrong language. Pinning it with ``language: "en"`` breaks on
+guests who speak something else. LanguageTracker does both: it detects on
+the first chunks, pins the result, and re-checks every
+``check_interval`` chunks. It switches only after ``switch_checks``
+confident detections in a row disagree with the pinned language. While a
+switch is pending it checks every chunk, so a real change is followed
+within a few chunks.
+
+Detection costs almost nothing extra. faster-whisper detects the language
+from the encoder output of the chunk it is transcribing anyway, so a check
+just means calling ``transcribe`` with ``language=None``.
+"""
+
+import threading
+
+
+class LanguageTracker:
+    """Decide per chunk whether to detect, and which language to pin.
+
+    Parameters
+    ----------
+    initial_chunks : int
+        Chunks that are always detected when the stream starts.
+    check_interval : int
+        Chunks between re-checks once a language is pinned.
+    min_probability : float
+        Detections less confident than this are ignored.
+    switch_checks : int
+        Consecutive confident disagreeing detections needed to switch.
+    """
+
+    def __init__(self, initial_chunks=3, check_interval=10, min_probability=0.7, switch_checks=2):
+        self.initial_chunks = initial_chunks
+        self.check_interval = max(1, int(check_interval))
+        self.min_probability = min_probability
+        self.switch_checks = max(1, int(switch_checks))
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.language = None
+        self.chunks = 0
+        self.candidate = None
+        self.candidate_count = 0
+        self.detections = 0
+        self.switches = 0
+
+    def next_language(self):
+        """Language to decode the next chunk with; None means detect it"""
+        with self.lock:
+            chunk = self.chunks
+            self.chunks += 1
+            if self.language is None or self.candidate is not None or chunk < self.initial_chunks:
+                return None
+            return None if chunk % self.check_interval == 0 else self.language
+
+    def observe(self, language, probability):
+        """Fold in the result of a detecting chunk; returns the pinned language"""
+        with self.lock:
+            self.detections += 1
+            if not language or (probability is not None and probability < self.min_probability):
+                return self.language
+            if self.language is None:
+                self.language = language
+            elif language == self.language:
+                self.candidate = None
+                self.candidate_count = 0
+            else:
+                if language == self.candidate:
+                    self.candidate_count += 1
+                else:
+                    self.candidate = language
+                    self.candidate_count = 1
+                if self.candidate_count >= self.switch_checks:
+                    print(f"Source language changed: {self.language} -> {language}")
+                    self.language = language
+                    self.candidate = None
+                    self.candidate_count = 0
+                    self.switches += 1
+            return self.language
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "language": self.language,
+                "candidate": self.candidate,
+                "detections": self.detections,
+                "chunks": self.chunks,
+                "switches": self.switches
+            }
@@ -0,0 +1,90 @@
+"""
+Per-chunk latency traces and rolling per-stage percentiles.
+
+Every audio chunk carries a ChunkTrace that is stamped as it moves through
+the pipeline (capture, enqueue, ASR, translation, write). Finished traces are
+folded into a LatencyTracker, which keeps a bounded window of durations per
+stage and computes p50/p95/p99 only when stats are requested.
+"""
+
+import time
+import threading
+from collections import deque
+import numpy as np
+
+# Stamps in pipeline order
+STAGES = ("capture", "enqueue", "asr_start", "asr_end", "translate_start", "translate_end", "write")
+
+# Durations reported per trace: name -> (from stamp, to stamp)
+SPANS = {
+    "buffering": ("capture", "enqueue"),
+    "queue_wait": ("enqueue", "asr_start"),
+    "asr": ("asr_start", "asr_end"),
+    "translate": ("translate_start", "translate_end"),
+    "write": ("translate_end", "write"),
+    "total": ("capture", "write")
+}
+
+
+class ChunkTrace:
+    """Wall-clock stamps for one chunk on its way from capture to subtitle"""
+
+    __slots__ = ("stamps",)
+
+    def __init__(self, capture_time=None):
+        self.stamps = {}
+        if capture_time is not None:
+            self.stamps["capture"] = capture_time
+
+    def mark(self, stage, timestamp=None):
+        """Record when the chunk reached a stage"""
+        self.stamps[stage] = time.time() if timestamp is None else timestamp
+
+    def durations(self):
+        """Seconds spent in each span whose two stamps are both present"""
+        result = {}
+        for name, (start, end) in SPANS.items():
+            if start in self.stamps and end in self.stamps:
+                result[name] = self.stamps[end] - self.stamps[start]
+        return result
+
+    def to_dict(self):
+        return {
+            "stamps": {stage: self.stamps[stage] for stage in STAGES if stage in self.stamps},
+            "durations": self.durations()
+        }
+
+
+class LatencyTracker:
+    """Rolling window of per-span durations with percentile summaries"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self.samples = {name: deque(maxlen=window) for name in SPANS}
+        self.lock = threading.Lock()
+
+    def record(self, trace):
+        """Add a finished trace; the lock keeps a concurrent snapshot from
+        seeing a deque mid-append"""
+        durations = trace.durations()
+        with self.lock:
+            for name, value in durations.items():
+                self.samples[name].append(value)
+
+    def get_percentiles(self):
+        """Return ``{span: {"p50", "p95", "p99", "count"}}`` for spans with data"""
+        result = {}
+        with self.lock:
+            snapshot = {name: list(values) for name, values in self.samples.items()}
+        for name, values in snapshot.items():
+            if not values:
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[name] = {"p50": float(p50), "p95": float(p95), "p99": float(p99), "count": len(values)}
+        return result
+
+    def reset(self):
+        """Forget every sample, e.g. once chunks change length"""
+        with self.lock:
+            for values in self.samples.values():
+                values.clear()
@@ -0,0 +1,205 @@
+"""
+Minimal Prometheus-style metrics for the translation pipeline.
+
+Counters and histograms are sharded per thread: every thread only ever
+writes its own slot, so updates from the audio callback or the processing
+loop need no lock and cannot lose increments. Shards are summed when the
+registry is rendered for a scrape, which is the only place that pays for
+aggregation. A thread takes a lock once, when it creates its shard; shards
+of threads that have exited are folded into a retired total then and at
+scrape time, so short-lived threads do not grow the metric forever.
+"""
+
+import bisect
+import math
+import threading
+
+# Seconds; covers callback-sized work up to multi-second ASR on slow boxes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def _merge_into(total, shard):
+    for i, value in enumerate(shard):
+        total[i] += value
+
+
+class _ThreadShards:
+    """Per-thread shards, each a list only its own thread writes"""
+
+    def __init__(self, new_shard):
+        self.new_shard = new_shard
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.live = []
+        self.retired = new_shard()
+
+    def get(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = self.local.shard = self.new_shard()
+            with self.lock:
+                self._prune()
+                self.live.append((threading.current_thread(), shard))
+        return shard
+
+    def _prune(self):
+        # An exited thread never writes its shard again, so it can be folded
+        live = []
+        for thread, shard in self.live:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                _merge_into(self.retired, shard)
+        self.live = live
+
+    def collect(self):
+        """Return a new shard holding the sum of every thread's"""
+        total = self.new_shard()
+        with self.lock:
+            self._prune()
+            _merge_into(total, self.retired)
+            for _, shard in self.live:
+                _merge_into(total, shard)
+        return total
+
+    def __len__(self):
+        with self.lock:
+            return len(self.live)
+
+
+class Counter:
+    """Monotonic counter"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels or {}
+        self._shards = _ThreadShards(lambda: [0])
+
+    def inc(self, amount=1):
+        self._shards.get()[0] += amount
+
+    def value(self):
+        return self._shards.collect()[0]
+
+    def samples(self):
+        yield self.name, self.labels, self.value()
+
+
+class Gauge:
+    """Value that can go up and down, or be computed at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=None, callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels or {}
+        self.callback = callback
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        if self.callback is not None:
+            try:
+                return self.callback()
+            except Exception:
+                return math.nan
+        return self._value
+
+    def samples(self):
+        yield self.name, self.labels, self.value()
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels or {}
+        self.bounds = tuple(sorted(buckets))
+        # counts per bucket (+Inf last), then the running sum
+        size = len(self.bounds) + 1
+        self._shards = _ThreadShards(lambda: [0] * size + [0.0])
+
+    def observe(self, value):
+        shard = self._shards.get()
+        shard[bisect.bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """Return ``(per-bucket counts, sum)`` summed over all threads"""
+        total = self._shards.collect()
+        return total[:-1], total[-1]
+
+    def samples(self):
+        counts, total = self.snapshot()
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), counts):
+            cumulative += count
+            yield self.name + "_bucket", dict(self.labels, le=_format_value(bound)), cumulative
+        yield self.name + "_sum", self.labels, total
+        yield self.name + "_count", self.labels, cumulative
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=None):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=None, callback=None):
+        return self.register(Gauge(name, help_text, labels, callback))
+
+    def histogram(self, name, help_text, labels=None, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        """Render every metric, emitting HELP/TYPE once per metric name"""
+        lines = []
+        seen = set()
+        with self.lock:
+            # Stable sort keeps every sample of a metric family together
+            metrics = sorted(self.metrics, key=lambda metric: metric.name)
+        for metric in metrics:
+            if metric.name not in seen:
+                seen.add(metric.name)
+                lines.append(f"# HELP {metric.name} {metric.help_text}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if isinstance(value, float):
+                    value = _format_value(value)
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry served by the /metrics endpoint
+REGISTRY = Registry()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Local registry of pre-converted CTranslate2 Whisper models.
+
+``initialize_models`` used to hand a bare size name such as "tiny" to
+WhisperModel, which resolves it through the Hugging Face cache and may go to
+the network. The registry pins model directories under ``model_dir`` with a
+manifest of sha256 checksums, so startup loads a known set of files and
+works offline.
+
+Every variant is a (size, compute_type) pair. Plain variants share one
+downloaded directory per size and CTranslate2 converts the weights to the
+requested compute type at load time. Quantized variants (``--quantize``)
+store weights already converted to int8/int8_float32/float32, which
+shortens the load and shrinks the files. Converting them needs
+``transformers`` and is done once, offline from the stream.
+
+Hashing a large model.bin takes seconds, so loads and hot swaps only check
+each file's size and mtime against the manifest; a file whose mtime moved
+is re-hashed once. ``verify`` re-hashes everything.
+
+CTranslate2 reads model.bin itself, so the registry cannot hand it a
+mapping. Instead files are hashed and pre-faulted through mmap so the load
+that follows reads from the page cache.
+
+Example:
+    python model_registry.py add tiny --compute-type int8 --quantize
+    python model_registry.py list
+    python model_registry.py verify
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import shutil
+import hashlib
+
+from startup import STARTUP, detect_device, default_compute_type
+
+MANIFEST = "manifest.json"
+CPU_COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+
+
+def file_sha256(path, block_size=16 * 1024 * 1024):
+    """Hash a file through a read-only mapping, without copying it into Python"""
+    digest = hashlib.sha256()
+    if os.path.getsize(path) == 0:
+        return digest.hexdigest()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            for offset in range(0, len(mapped), block_size):
+                digest.update(view[offset:offset + block_size])
+        finally:
+            view.release()
+    return digest.hexdigest()
+
+
+def warm_file(path):
+    """Ask the kernel to read a file into the page cache ahead of the model load"""
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            mapped.madvise(mmap.MADV_WILLNEED)
+        else:
+            # Touch one byte per page
+            for offset in range(0, len(mapped), mmap.PAGESIZE):
+                mapped[offset]
+
+
+class ModelRegistry:
+    """Pinned directory of CTranslate2 Whisper models with a checksum manifest.
+
+    Parameters
+    ----------
+    root : str, optional
+        Directory holding the model folders and ``manifest.json``.
+        Defaults to "models".
+    """
+
+    def __init__(self, root="models"):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST)
+        self.manifest = self.load_manifest()
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"models": {}}
+        except Exception as e:
+            print(f"Error reading model manifest: {e}")
+            return {"models": {}}
+
+    def save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def variant_name(size, compute_type):
+        return f"{size}-{compute_type}"
+
+    def entries(self):
+        return self.manifest["models"]
+
+    def register(self, size, compute_type, path, quantized=False):
+        """Checksum every file in ``path`` and record it as a variant"""
+        files = {}
+        for directory, _, names in os.walk(path):
+            for name in sorted(names):
+                full_path = os.path.join(directory, name)
+                stat = os.stat(full_path)
+                files[os.path.relpath(full_path, path).replace(os.sep, "/")] = {
+                    "sha256": file_sha256(full_path),
+                    "bytes": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns
+                }
+        name = self.variant_name(size, compute_type)
+        self.entries()[name] = {
+            "size": size,
+            "compute_type": compute_type,
+            "path": os.path.relpath(path, self.root),
+            "quantized": quantized,
+            "files": files,
+            "added": time.time()
+        }
+        self.save_manifest()
+        return name
+
+    def add(self, size, compute_type="int8", quantize=False):
+        """Fetch (and optionally quantize) a model and register it"""
+        if quantize:
+            path = os.path.join(self.root, self.variant_name(size, compute_type))
+            import ctranslate2
+            print(f"Converting openai/whisper-{size} to {compute_type}")
+            converter = ctranslate2.converters.TransformersConverter(
+                f"openai/whisper-{size}", copy_files=["tokenizer.json"]
+            )
+            converter.convert(path, quantization=compute_type, force=True)
+        else:
+            path = os.path.join(self.root, size)
+            if not os.path.exists(os.path.join(path, "model.bin")):
+                from faster_whisper import download_model
+                print(f"Downloading Whisper model: {size}")
+                download_model(size, output_dir=path)
+        return self.register(size, compute_type, path, quantized=quantize)
+
+    def remove(self, name):
+        entry = self.entries().pop(name, None)
+        if entry is None:
+            return False
+        path = os.path.join(self.root, entry["path"])
+        still_used = any(other["path"] == entry["path"] for other in self.entries().values())
+        if not still_used and os.path.isdir(path):
+            shutil.rmtree(path)
+        self.save_manifest()
+        return True
+
+    def verify(self, name):
+        """Re-hash every file of a variant; returns True when all match"""
+        entry = self.entries().get(name)
+        if entry is None:
+            print(f"Model variant '{name}' is not registered")
+            return False
+        path = os.path.join(self.root, entry["path"])
+        ok = True
+        for rel_path, expected in entry["files"].items():
+            full_path = os.path.join(path, rel_path)
+            if not os.path.exists(full_path):
+                print(f"{name}: missing {rel_path}")
+                ok = False
+            elif os.path.getsize(full_path) != expected["bytes"] or file_sha256(full_path) != expected["sha256"]:
+                print(f"{name}: checksum mismatch for {rel_path}")
+                ok = False
+        return ok
+
+    def check(self, name):
+        """Check every file of a variant by size and mtime; returns True when all match.
+
+        Files whose mtime differs from the manifest (copied, touched, or
+        registered before mtimes were recorded) are re-hashed, and the new
+        mtime is recorded when the hash still matches.
+        """
+        entry = self.entries().get(name)
+        if entry is None:
+            print(f"Model variant '{name}' is not registered")
+            return False
+        path = os.path.join(self.root, entry["path"])
+        rehashed = False
+        for rel_path, expected in entry["files"].items():
+            full_path = os.path.join(path, rel_path)
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                print(f"{name}: missing {rel_path}")
+                return False
+            if stat.st_size != expected["bytes"]:
+                print(f"{name}: size mismatch for {rel_path}")
+                return False
+            if stat.st_mtime_ns == expected.get("mtime_ns"):
+                continue
+            if file_sha256(full_path) != expected["sha256"]:
+                print(f"{name}: checksum mismatch for {rel_path}")
+                return False
+            expected["mtime_ns"] = stat.st_mtime_ns
+            rehashed = True
+        if rehashed:
+            try:
+                self.save_manifest()
+            except OSError as e:
+                # A read-only model directory just re-hashes on the next load
+                print(f"Could not update model manifest: {e}")
+        return True
+
+    def find(self, size, compute_type):
+        """Return the variant name to use for a size and compute type, or None"""
+        name = self.variant_name(size, compute_type)
+        if name in self.entries():
+            return name
+        # Unquantized weights convert to any compute type at load time
+        for other_name, entry in sorted(self.entries().items()):
+            if entry["size"] == size and not entry["quantized"]:
+                return other_name
+        return None
+
+    def resolve(self, size, compute_type, verify=True, warm=True):
+        """Return the local model directory for a size and compute type.
+
+        Returns None when no variant is registered or its files fail
+        ``check``, so the caller can fall back or refuse to start.
+        """
+        name = self.find(size, compute_type)
+        if name is None:
+            return None
+        if verify and not self.check(name):
+            return None
+        entry = self.entries()[name]
+        path = os.path.join(self.root, entry["path"])
+        if warm:
+            for rel_path in entry["files"]:
+                try:
+                    warm_file(os.path.join(path, rel_path))
+                except OSError:
+                    pass
+        return os.path.abspath(path)
+
+
+def compute_type_for(config, device):
+    """The configured ``compute_type``, with "auto" resolved for ``device``"""
+    compute_type = config.get("compute_type") or "auto"
+    return default_compute_type(device) if compute_type == "auto" else compute_type
+
+
+def resolve_model(config, compute_type):
+    """Return the registry directory for ``config``'s model.
+
+    Falls back to the bare size name, which faster-whisper downloads,
+    unless ``offline`` is set. Returns None when nothing usable is found.
+    """
+    size = config["whisper_model_size"]
+    with STARTUP.phase("resolve model"):
+        path = ModelRegistry(config.get("model_dir", "models")).resolve(size, compute_type)
+    if path:
+        print(f"Using registered model {size}/{compute_type} from {path}")
+        return path
+    if config.get("offline"):
+        print(f"No verified {size}/{compute_type} model in '{config.get('model_dir')}'; "
+              f"run: python model_registry.py add {size} --compute-type {compute_type}")
+        return None
+    return size
+
+
+def load_whisper(config, cpu_threads=None):
+    """Load the in-process Whisper model ``config`` asks for.
+
+    Every loader goes through here so ``compute_type``, the registry
+    checksums and ``offline`` apply the same way to the CLI, the model
+    server and shared sessions. Returns None when the model cannot be
+    resolved; load errors propagate.
+    """
+    with STARTUP.phase("device probe"):
+        device = detect_device()
+    compute_type = compute_type_for(config, device)
+    path = resolve_model(config, compute_type)
+    if path is None:
+        return None
+    if cpu_threads is None:
+        cpu_threads = int(config.get("cpu_threads", 0))
+    # faster_whisper pulls in ctranslate2 and tokenizers; only pay
+    # for them when a model is actually loaded
+    with STARTUP.phase("import faster_whisper"):
+        from faster_whisper import WhisperModel
+    with STARTUP.phase("load Whisper model"):
+        return WhisperModel(path, device=device, compute_type=compute_type, cpu_threads=cpu_threads,
+                            num_workers=int(config.get("num_workers", 1)))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the local Whisper model registry")
+    parser.add_argument("--model-dir", default="models", help="Registry directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = commands.add_parser("add", help="Download or convert a model and register it")
+    add_parser.add_argument("size", help="Whisper model size, e.g. tiny or base")
+    add_parser.add_argument("--compute-type", default="int8", help="CTranslate2 compute type")
+    add_parser.add_argument("--quantize", action="store_true", help="Store weights pre-converted to the compute type (needs transformers)")
+
+    commands.add_parser("list", help="List registered variants")
+
+    verify_parser = commands.add_parser("verify", help="Re-check checksums")
+    verify_parser.add_argument("names", nargs="*", help="Variants to check (default: all)")
+
+    remove_parser = commands.add_parser("remove", help="Unregister a variant and delete unused files")
+    remove_parser.add_argument("name")
+
+    args = parser.parse_args(argv)
+    registry = ModelRegistry(args.model_dir)
+
+    if args.command == "add":
+        if args.compute_type not in CPU_COMPUTE_TYPES:
+            print(f"Note: {args.compute_type} is not a CPU compute type ({', '.join(CPU_COMPUTE_TYPES)})")
+        name = registry.add(args.size, args.compute_type, quantize=args.quantize)
+        print(f"✅ Registered {name}")
+    elif args.command == "list":
+        for name, entry in sorted(registry.entries().items()):
+            size_mb = sum(f["bytes"] for f in entry["files"].values()) / (1024 * 1024)
+            kind = "quantized" if entry["quantized"] else "converted at load"
+            print(f"{name:24} {size_mb:8.1f} MB  {kind}  {entry['path']}")
+    elif args.command == "verify":
+        names = args.names or sorted(registry.entries())
+        failed = [name for name in names if not registry.verify(name)]
+        for name in names:
+            print(f"{'❌' if name in failed else '✅'} {name}")
+        return 1 if failed else 0
+    elif args.command == "remove":
+        if not registry.remove(args.name):
+            print(f"Model variant '{args.name}' is not registered")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Shared model server for real-time translator front-ends.
+
+Hosts one Whisper model and the translation client on a Unix socket so the
+Flask UI, the Gradio control panel and CLI instances on the same host do not
+each load their own copy. Transcriptions from all clients run one at a time
+on the ASR thread. Translations wait on the network, so they have their own
+queue and thread and a slow translation never holds up ASR for the other
+clients. Both queues are bounded and clients are told to back off when one
+is full.
+
+Wire format: every message is a 4-byte big-endian header length, a UTF-8
+JSON header and, for audio, ``header["payload_bytes"]`` bytes of float32
+samples.
+"""
+
+import os
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from model_registry import load_whisper
+
+DEFAULT_SOCKET_PATH = "/tmp/realtime_translator.sock"
+
+Segment = namedtuple("Segment", ["text", "start", "end"])
+TranscriptionInfo = namedtuple("TranscriptionInfo", ["language", "language_probability"])
+
+
+def send_message(sock, header, payload=b""):
+    """Send a framed header and optional binary payload"""
+    header = dict(header, payload_bytes=len(payload))
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(data)) + data + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock, max_header_bytes=None, max_payload_bytes=None):
+    """Receive one framed message and return ``(header, payload)``.
+
+    With the limits set, a peer announcing a larger header or payload, or
+    sending a header that is not a JSON object, raises ValueError before
+    anything is allocated for it.
+    """
+    (length,) = struct.unpack(">I", _recv_exact(sock, 4))
+    if max_header_bytes is not None and length > max_header_bytes:
+        raise ValueError(f"Header of {length} bytes exceeds {max_header_bytes}")
+    header = json.loads(_recv_exact(sock, length).decode("utf-8"))
+    if not isinstance(header, dict):
+        raise ValueError("Header is not a JSON object")
+    payload_bytes = header.get("payload_bytes", 0)
+    if not isinstance(payload_bytes, int) or payload_bytes < 0:
+        raise ValueError("Invalid payload_bytes")
+    if max_payload_bytes is not None and payload_bytes > max_payload_bytes:
+        raise ValueError(f"Payload of {payload_bytes} bytes exceeds {max_payload_bytes}")
+    payload = _recv_exact(sock, payload_bytes)
+    return header, payload
+
+
+class _Request:
+    def __init__(self, connection, header, payload):
+        self.connection = connection
+        self.header = header
+        self.payload = payload
+
+
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.send_lock = threading.Lock()
+
+    def reply(self, header):
+        with self.send_lock:
+            try:
+                send_message(self.sock, header)
+            except OSError:
+                pass
+
+
+class ModelServer:
+    """Serve transcribe/translate RPCs from a single set of loaded models.
+
+    Parameters
+    ----------
+    socket_path : str
+        Filesystem path of the Unix socket to listen on.
+    whisper_model_size : str
+        Whisper model loaded once for every client.
+    max_queue : int
+        Requests of each kind allowed to wait before clients get a ``busy``
+        reply.
+    batch_window : float
+        Seconds to wait for more translations after the first one of a
+        batch. Translations for the same language pair in a batch share one
+        ``translate_batch`` call.
+    max_batch : int
+        Maximum number of translations handled in one batch.
+    compute_type, model_dir, offline :
+        As the config keys of the same names; the model is resolved through
+        the local model registry like any other loader.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, whisper_model_size="tiny",
+                 max_queue=32, batch_window=0.02, max_batch=16, compute_type="auto",
+                 model_dir="models", offline=False):
+        self.socket_path = socket_path
+        self.whisper_model_size = whisper_model_size
+        self.compute_type = compute_type
+        self.model_dir = model_dir
+        self.offline = offline
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self.requests = queue.Queue(maxsize=max_queue)  # transcribe and ping
+        self.translations = queue.Queue(maxsize=max_queue)
+        self.asr_model = None
+        self.translators = {}
+        self.server_socket = None
+        self.running = False
+
+        # Each counter is only written by one thread
+        self.transcribed_count = 0
+        self.translated_count = 0
+        self.rejected_count = 0
+        self.batch_count = 0
+
+    def load_models(self):
+        """Load the Whisper model shared by all clients"""
+        try:
+            print(f"Loading Whisper model: {self.whisper_model_size}")
+            self.asr_model = load_whisper({
+                "whisper_model_size": self.whisper_model_size,
+                "compute_type": self.compute_type,
+                "model_dir": self.model_dir,
+                "offline": self.offline
+            })
+            if self.asr_model is None:
+                return False
+            print("Whisper model loaded successfully")
+            return True
+        except Exception as e:
+            print(f"Error loading Whisper model: {e}")
+            return False
+
+    def get_translator(self, target_lang):
+        """Return the translator for a target language, creating it on first use"""
+        translator = self.translators.get(target_lang)
+        if translator is None:
+            from translator import Translator
+            translator = Translator(target_lang=target_lang)
+            if not translator.load_model():
+                raise RuntimeError("Failed to load translator")
+            self.translators[target_lang] = translator
+        return translator
+
+    def serve_forever(self):
+        """Bind the socket and serve until stop() is called"""
+        if self.asr_model is None and not self.load_models():
+            return
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server_socket.bind(self.socket_path)
+        self.server_socket.listen()
+        self.running = True
+
+        for target in (self._process_requests, self._process_translations):
+            threading.Thread(target=target, daemon=True).start()
+        print(f"Model server listening on {self.socket_path}")
+
+        try:
+            while self.running:
+                try:
+                    client_socket, _ = self.server_socket.accept()
+                except OSError:
+                    break
+                thread = threading.Thread(target=self._read_requests,
+                                          args=(_Connection(client_socket),), daemon=True)
+                thread.start()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop accepting requests and remove the socket file"""
+        self.running = False
+        if self.server_socket is not None:
+            try:
+                self.server_socket.close()
+            except OSError:
+                pass
+            self.server_socket = None
+        if os.path.exists(self.socket_path):
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+
+    def _read_requests(self, connection):
+        """Queue requests from one client, rejecting them when the queue is full"""
+        try:
+            while self.running:
+                header, payload = recv_message(connection.sock)
+                requests = self.translations if header.get("op") == "translate" else self.requests
+                try:
+                    requests.put_nowait(_Request(connection, header, payload))
+                except queue.Full:
+                    self.rejected_count += 1
+                    connection.reply({"id": header.get("id"), "ok": False, "error": "busy"})
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            connection.sock.close()
+
+    def _next_batch(self):
+        batch = [self.translations.get(timeout=0.5)]
+        deadline = time.time() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.translations.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _process_requests(self):
+        """ASR thread: transcriptions one at a time, and control requests"""
+        while self.running:
+            try:
+                request = self.requests.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            op = request.header.get("op")
+            if op == "transcribe":
+                self._handle_transcribe(request)
+            elif op == "ping":
+                request.connection.reply({"id": request.header.get("id"), "ok": True,
+                                          "result": self.get_stats()})
+            else:
+                request.connection.reply({"id": request.header.get("id"), "ok": False,
+                                          "error": f"Unknown op: {op}"})
+
+    def _process_translations(self):
+        """Translation thread: network calls never hold up the ASR thread"""
+        while self.running:
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                continue
+            self.batch_count += 1
+
+            # Translations for the same language pair go out as one call
+            groups = {}
+            for request in batch:
+                key = (request.header.get("src", "en"), request.header.get("target_lang", "fa"))
+                groups.setdefault(key, []).append(request)
+            for (src, target_lang), requests in groups.items():
+                self._handle_translate(src, target_lang, requests)
+
+    def _handle_transcribe(self, request):
+        header = request.header
+        try:
+            audio = np.frombuffer(request.payload, dtype=np.float32)
+            segments, info = self.asr_model.transcribe(audio, **header.get("options", {}))
+            result = {
+                "segments": [[seg.text, seg.start, seg.end] for seg in segments],
+                "language": getattr(info, "language", None),
+                "language_probability": getattr(info, "language_probability", None)
+            }
+            request.connection.reply({"id": header.get("id"), "ok": True, "result": result})
+        except Exception as e:
+            request.connection.reply({"id": header.get("id"), "ok": False, "error": str(e)})
+        self.transcribed_count += 1
+
+    def _handle_translate(self, src, target_lang, requests):
+        texts = [request.header.get("text", "") for request in requests]
+        try:
+            translator = self.get_translator(target_lang)
+            results = translator.translate_batch(texts, src=src)
+            for request, result in zip(requests, results):
+                request.connection.reply({"id": request.header.get("id"), "ok": True, "result": result})
+        except Exception as e:
+            for request in requests:
+                request.connection.reply({"id": request.header.get("id"), "ok": False, "error": str(e)})
+        self.translated_count += len(requests)
+
+    def get_stats(self):
+        """Get server statistics"""
+        return {
+            "served_count": self.transcribed_count + self.translated_count,
+            "transcribed_count": self.transcribed_count,
+            "translated_count": self.translated_count,
+            "rejected_count": self.rejected_count,
+            "batch_count": self.batch_count,
+            "queue_depth": self.requests.qsize(),
+            "translation_queue_depth": self.translations.qsize()
+        }
+
+
+class ModelServerClient:
+    """Synchronous client for a ModelServer.
+
+    Busy replies are retried with exponential backoff so clients slow down
+    instead of piling more work onto a saturated server. A reply that takes
+    longer than ``timeout`` seconds raises TimeoutError instead of hanging
+    the caller on a stuck server.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, max_retries=5, retry_delay=0.05, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.sock = None
+        self.lock = threading.Lock()
+        self.next_id = 0
+
+    def connect(self):
+        """Open the connection to the server"""
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+    def close(self):
+        """Close the connection"""
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def call(self, header, payload=b""):
+        """Send a request and wait for its reply, retrying while the server is busy"""
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            with self.lock:
+                if self.sock is None:
+                    self.connect()
+                self.next_id += 1
+                request = dict(header, id=self.next_id)
+                try:
+                    send_message(self.sock, request, payload)
+                    reply, _ = recv_message(self.sock)
+                except socket.timeout:
+                    # A late reply would answer the next request; start over on a new connection
+                    self.close()
+                    raise TimeoutError(f"Model server did not reply within {self.timeout:.0f}s")
+                except (ConnectionError, OSError):
+                    self.close()
+                    if attempt == self.max_retries:
+                        raise
+                    continue
+            if reply.get("ok"):
+                return reply.get("result")
+            if reply.get("error") != "busy":
+                raise RuntimeError(reply.get("error"))
+            time.sleep(delay)
+            delay *= 2
+        raise RuntimeError("Model server busy")
+
+    def transcribe(self, audio, **options):
+        """Transcribe float32 audio and return the server's result dict"""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        return self.call({"op": "transcribe", "options": options}, audio.tobytes())
+
+    def translate(self, text, target_lang="fa", src="en"):
+        """Translate a string on the server"""
+        return self.call({"op": "translate", "text": text, "target_lang": target_lang, "src": src})
+
+    def ping(self):
+        """Return the server statistics"""
+        return self.call({"op": "ping"})
+
+
+class RemoteWhisperModel:
+    """Drop-in for ``WhisperModel.transcribe`` backed by a ModelServer"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def transcribe(self, audio, **options):
+        result = self.client.transcribe(audio, **options)
+        segments = [Segment(*seg) for seg in result["segments"]]
+        info = TranscriptionInfo(result.get("language"), result.get("language_probability"))
+        return segments, info
+
+
+class RemoteTranslator:
+    """Drop-in for ``Translator`` backed by a ModelServer"""
+
+    def __init__(self, client, target_lang="fa"):
+        self.model_name = "Model server"
+        self.client = client
+        self.target_lang = target_lang
+        self.model = None
+
+    def load_model(self):
+        try:
+            self.client.ping()
+            self.model = self.client
+            return True
+        except Exception as e:
+            print(f"Error connecting to model server: {e}")
+            return False
+
+    def translate_text(self, english_text, src="en"):
+        if not self.model:
+            return "Error: Translator not initialized."
+        try:
+            return self.client.translate(english_text, target_lang=self.target_lang, src=src)
+        except Exception as e:
+            return f"Translation error: {e}"
+
+    def translate_batch(self, english_texts, src="en"):
+        return [self.translate_text(text, src=src) for text in english_texts]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shared model server for real-time translators")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--whisper-model", default="tiny", choices=["tiny", "base", "small", "medium"], help="Whisper model size")
+    parser.add_argument("--max-queue", type=int, default=32, help="Requests queued before clients are told to back off")
+    parser.add_argument("--batch-window", type=float, default=0.02, help="Seconds to gather translations into one batch")
+    parser.add_argument("--compute-type", default="auto", help="CTranslate2 compute type (auto picks one for the device)")
+    parser.add_argument("--model-dir", default="models", help="Local model registry")
+    parser.add_argument("--offline", action="store_true", help="Only load verified models from the registry")
+
+    args = parser.parse_args()
+
+    server = ModelServer(
+        socket_path=args.socket,
+        whisper_model_size=args.whisper_model,
+        max_queue=args.max_queue,
+        batch_window=args.batch_window,
+        compute_type=args.compute_type,
+        model_dir=args.model_dir,
+        offline=args.offline
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nModel server stopped")
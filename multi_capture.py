@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Caption several audio inputs from one process.
+
+Every input (a device, or one channel of a multi-channel device) gets its own
+RealtimeAudioTranslator. Each has its own buffer, energy VAD, language pair
+and subtitle files, but no models of its own. They share one loaded Whisper
+model through SharedModels, and a SharedASRScheduler decodes their chunks
+round-robin so a busy input cannot starve a quiet one. A device opens a
+single InputStream at its native rate whose callback hands each block to
+every input on that device; each input takes its own channel and resamples
+it to the model rate with its own StreamingResampler.
+
+Example:
+    python multi_capture.py --input host="Microphone" --input guest="CABLE Output"
+    python multi_capture.py --input host="Scarlett#0" --input guest="Scarlett#1" --vad-threshold 0.01
+"""
+
+import os
+import sys
+import time
+import json
+import threading
+from contextlib import ExitStack
+
+import numpy as np
+import sounddevice as sd
+
+from resampler import StreamingResampler
+from session_manager import SharedModels, SharedASRScheduler
+from subtitle_stream import RealtimeAudioTranslator
+
+
+class MultiDeviceCapture:
+    """Capture and caption several inputs on shared models.
+
+    Parameters
+    ----------
+    inputs : list of dict
+        One entry per input with ``name`` and ``device_name``, and optionally
+        ``channel`` (default 0), ``target_language``, ``language``,
+        ``subtitle_file`` (default ``subtitle_<name>.txt``) and
+        ``vad_threshold``.
+    whisper_model_size : str
+        Model shared by all inputs.
+    decode_threads : int
+        Chunks decoded concurrently across all inputs.
+    cpu_budget : int, optional
+        CPU threads inference may use in total. Defaults to the core count.
+    models : SharedModels, optional
+        Existing model cache to share, e.g. a SessionManager's.
+    """
+
+    def __init__(self, inputs, whisper_model_size="tiny", chunk_duration=3.0, decode_threads=1,
+                 cpu_budget=None, config_file="translation_config.json", models=None):
+        names = [spec["name"] for spec in inputs]
+        if len(set(names)) != len(names):
+            raise ValueError("Input names must be unique")
+        self.inputs = inputs
+        self.whisper_model_size = whisper_model_size
+        self.chunk_duration = chunk_duration
+        self.config_file = config_file
+
+        cpu_budget = cpu_budget or os.cpu_count() or 1
+        decode_threads = max(1, min(int(decode_threads), cpu_budget))
+        self.models = models or SharedModels(cpu_threads=max(1, cpu_budget // decode_threads),
+                                             num_workers=decode_threads)
+        self.scheduler = SharedASRScheduler(decode_threads=decode_threads)
+        self.translators = {}
+        self.threads = []
+        self.streams = ExitStack()
+
+    def build_translators(self):
+        """Create one translator per input, attached to the shared models"""
+        for spec in self.inputs:
+            name = spec["name"]
+            translator = RealtimeAudioTranslator(
+                whisper_model_size=self.whisper_model_size,
+                chunk_duration=self.chunk_duration,
+                device_name=spec["device_name"],
+                subtitle_file=spec.get("subtitle_file") or f"subtitle_{name}.txt",
+                config_file=self.config_file
+            )
+            for key in ("language", "target_language", "vad_threshold"):
+                if key in spec:
+                    translator.config[key] = spec[key]
+            translator.config["whisper_model_size"] = self.whisper_model_size
+            translator.input_channel = translator.config["input_channel"] = int(spec.get("channel", 0))
+            translator.attach_shared_models(
+                self.models.get_asr_model(self.whisper_model_size, translator.config),
+                self.models.get_translator(translator.config["target_language"]),
+                asr_scheduler=self.scheduler,
+                model_provider=self.models
+            )
+            self.translators[name] = translator
+
+    def device_groups(self):
+        """Map each device name to the translators capturing from it"""
+        groups = {}
+        for translator in self.translators.values():
+            groups.setdefault(translator.device_name, []).append(translator)
+        return groups
+
+    @staticmethod
+    def fan_out(callbacks):
+        """One stream callback feeding every input on a device"""
+        def callback(indata, frames, time_info, status):
+            for input_callback in callbacks:
+                input_callback(indata, frames, time_info, status)
+        return callback
+
+    @staticmethod
+    def input_callback(translator, capture_rate):
+        """The callback that takes ``translator``'s channel from blocks at ``capture_rate``"""
+        translator.resampler = None
+        translator.audio_thread_pinned = False  # a new stream gets a new callback thread
+        if capture_rate != translator.sample_rate or translator.config.get("downmix"):
+            translator.resampler = StreamingResampler(capture_rate, translator.sample_rate)
+            return translator.native_audio_callback
+        return translator.audio_callback
+
+    def start(self):
+        """Open every device and start captioning; returns False on failure"""
+        try:
+            self.build_translators()
+        except Exception as e:
+            print(f"Error loading models: {e}")
+            return False
+
+        for translator in self.translators.values():
+            self.scheduler.register(translator)
+            translator.is_recording = True
+            thread = threading.Thread(target=translator.run_processing_loop, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.scheduler.start()
+
+        for device_name, translators in self.device_groups().items():
+            first = translators[0]
+            device_index = first.find_device_index(device_name)
+            if device_index is None:
+                print(f"Device '{device_name}' not found. Available devices:")
+                first.get_audio_devices()
+                self.stop()
+                return False
+            # Open the device as it natively runs and let each input
+            # resample its own channel, as a single stream does
+            capture_rate, capture_channels = first.capture_format(device_index)
+            channels = max([capture_channels] + [translator.input_channel + 1 for translator in translators])
+            callbacks = [self.input_callback(translator, capture_rate) for translator in translators]
+            try:
+                self.streams.enter_context(sd.InputStream(
+                    device=device_index,
+                    channels=channels,
+                    samplerate=capture_rate,
+                    callback=self.fan_out(callbacks),
+                    dtype=np.float32,
+                    blocksize=int(capture_rate * 0.1),
+                    latency='low'
+                ))
+            except Exception as e:
+                print(f"Error opening {device_name}: {e}")
+                self.stop()
+                return False
+            names = ", ".join(f"{t.subtitle_file} (channel {t.input_channel})" for t in translators)
+            print(f"Listening on {device_name} at {capture_rate} Hz -> {names}")
+        return True
+
+    def stop(self):
+        """Close the devices and stop every input"""
+        self.streams.close()
+        for translator in self.translators.values():
+            translator.stop_streaming()
+            self.scheduler.unregister(translator)
+        for thread in self.threads:
+            thread.join(timeout=5.0)
+        self.threads = []
+        self.scheduler.stop()
+
+    def get_stats(self):
+        return {
+            "decoded_count": self.scheduler.decoded_count,
+            "queue_depth": self.scheduler.queue_depth(),
+            "inputs": {name: translator.get_stats() for name, translator in self.translators.items()}
+        }
+
+
+def parse_input(text):
+    """Parse ``name=device`` or ``name=device#channel``"""
+    name, _, device = text.partition("=")
+    if not name or not device:
+        raise ValueError(f"Expected name=device[#channel], got '{text}'")
+    device, _, channel = device.rpartition("#") if "#" in device else (device, "", "0")
+    return {"name": name, "device_name": device, "channel": int(channel)}
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Caption several audio inputs in one process")
+    parser.add_argument("--input", action="append", default=[], metavar="NAME=DEVICE[#CHANNEL]",
+                        help="Input to caption; repeat for each input")
+    parser.add_argument("--inputs", metavar="FILE", help="JSON list of input specs instead of --input")
+    parser.add_argument("--whisper-model", default="tiny", help="Whisper model shared by all inputs")
+    parser.add_argument("--chunk-duration", type=float, default=3.0, help="Audio chunk duration in seconds")
+    parser.add_argument("--decode-threads", type=int, default=1, help="Chunks decoded concurrently")
+    parser.add_argument("--target-language", help="Target language for inputs that do not set one")
+    parser.add_argument("--vad-threshold", type=float, help="RMS level below which chunks are skipped")
+
+    args = parser.parse_args(argv)
+
+    if args.inputs:
+        with open(args.inputs, "r") as f:
+            inputs = json.load(f)
+    else:
+        inputs = [parse_input(text) for text in args.input]
+    if not inputs:
+        parser.error("no inputs given")
+    for spec in inputs:
+        if args.target_language:
+            spec.setdefault("target_language", args.target_language)
+        if args.vad_threshold is not None:
+            spec.setdefault("vad_threshold", args.vad_threshold)
+
+    capture = MultiDeviceCapture(inputs, whisper_model_size=args.whisper_model,
+                                 chunk_duration=args.chunk_duration, decode_threads=args.decode_threads)
+    if not capture.start():
+        return 1
+    print("Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        capture.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Network audio ingest: capture on one machine, caption on another.
+
+A CaptureAgent runs next to the audio device and streams timestamped frames
+over TCP to an IngestServer inside the inference process. One server
+accepts any number of agents and routes each by its stream name to a
+NetworkSource. A RealtimeAudioTranslator reads from a NetworkSource the way
+it would read from a sound card (see ``network_source`` in
+translation_config.json).
+
+Frames use the model server framing: a length-prefixed JSON header plus a
+binary payload. Audio is sent as 16-bit PCM by default, which halves the
+bandwidth of float32 at no cost to Whisper. ``pcm16z`` adds zlib on top,
+and ``f32`` sends raw samples.
+
+Agents reconnect with exponential backoff and keep up to ``buffer_seconds``
+of audio while disconnected, then resend it with the original sequence
+numbers. On the server side the jitter buffer puts frames back in order,
+drops duplicates, and fills a gap with silence once a later frame has waited
+``jitter_delay`` seconds, so a lost frame cannot stall the stream.
+
+The server has no authentication, so it listens on 127.0.0.1 unless a host
+is given, and it drops agents that send oversized or malformed frames.
+
+Example:
+    # capture machine
+    python network_ingest.py --server inference-box:7880 --stream host --device "Microphone"
+    # inference machine (0.0.0.0 accepts agents from any host; firewall it)
+    python subtitle_stream.py --network-source 0.0.0.0:7880/host
+"""
+
+import sys
+import time
+import uuid
+import zlib
+import socket
+import threading
+from collections import deque
+
+import numpy as np
+
+from model_server import send_message, recv_message
+
+DEFAULT_PORT = 7880
+ENCODINGS = ("pcm16", "pcm16z", "f32")
+# Limits on what an agent may send; frames are normally 0.1 s
+MAX_HEADER_BYTES = 64 * 1024
+MAX_FRAME_SAMPLES = 1 << 20
+MAX_SEQ_AHEAD = 10000  # frames past the next expected one before resyncing
+MAX_CONCEALED_SECONDS = 1.0  # silence inserted for one gap, at most
+SAMPLE_RATES = (1000, 384000)
+
+
+def encode_frame(samples, encoding):
+    samples = np.asarray(samples, dtype=np.float32)
+    if encoding == "f32":
+        return samples.tobytes()
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+    return zlib.compress(pcm, 1) if encoding == "pcm16z" else pcm
+
+
+def decode_frame(payload, encoding):
+    """Decode a frame payload; raises ValueError for a malformed or oversized one"""
+    if encoding == "f32":
+        return np.frombuffer(payload, dtype=np.float32)
+    if encoding == "pcm16z":
+        # Bounded, so a small payload cannot inflate into gigabytes
+        decompressor = zlib.decompressobj()
+        try:
+            payload = decompressor.decompress(payload, MAX_FRAME_SAMPLES * 2)
+        except zlib.error as e:
+            raise ValueError(f"Bad compressed frame: {e}")
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"Frame exceeds {MAX_FRAME_SAMPLES} samples")
+    return np.frombuffer(payload, dtype="<i2").astype(np.float32) / 32767.0
+
+
+def parse_address(text, default_host="127.0.0.1"):
+    """Split ``host:port[/stream]`` into ``(host, port, stream)``"""
+    address, _, stream = text.partition("/")
+    host, _, port = address.rpartition(":")
+    return host or default_host, int(port or DEFAULT_PORT), stream or None
+
+
+class NetworkSource:
+    """Jitter buffer for one remote stream, delivering audio in order.
+
+    Parameters
+    ----------
+    name : str
+        Stream name agents announce in their hello message.
+    callback : callable
+        Called as ``callback(samples, sample_rate)`` from the playout thread.
+    jitter_delay : float
+        Seconds a gap may stay open before it is filled with silence.
+    """
+
+    def __init__(self, name, callback, jitter_delay=0.3):
+        self.name = name
+        self.callback = callback
+        self.jitter_delay = jitter_delay
+        self.sample_rate = None
+        self.agent_session = None
+        self.frames = {}  # seq -> (samples, arrival time)
+        self.next_seq = 0
+        self.condition = threading.Condition()
+        self.running = True
+        self.connected = False
+
+        self.received = 0
+        self.duplicates = 0
+        self.concealed = 0
+        self.transit = None  # smoothed seconds from agent capture to arrival
+        self.thread = threading.Thread(target=self._playout, name=f"ingest-{name}", daemon=True)
+        self.thread.start()
+
+    def on_hello(self, header):
+        with self.condition:
+            if header.get("session") != self.agent_session:
+                # A restarted agent numbers its frames from zero again
+                self.agent_session = header.get("session")
+                self.frames.clear()
+                self.next_seq = 0
+            self.sample_rate = int(header["sample_rate"])
+            self.connected = True
+
+    def on_disconnect(self):
+        with self.condition:
+            self.connected = False
+
+    def push(self, seq, timestamp, samples):
+        now = time.time()
+        with self.condition:
+            self.received += 1
+            if seq > self.next_seq + MAX_SEQ_AHEAD:
+                # After a long outage (or a bogus seq) there is no gap worth
+                # concealing; carry on from this frame
+                self.frames.clear()
+                self.next_seq = seq
+            if seq < self.next_seq or seq in self.frames:
+                self.duplicates += 1
+                return
+            self.frames[seq] = (samples, now)
+            if timestamp:
+                transit = now - timestamp
+                self.transit = transit if self.transit is None else 0.9 * self.transit + 0.1 * transit
+            self.condition.notify()
+
+    def _next_frame(self):
+        """Wait for the next frame in order, or conceal it; None when closed"""
+        with self.condition:
+            while self.running:
+                frame = self.frames.pop(self.next_seq, None)
+                if frame is not None:
+                    self.next_seq += 1
+                    return frame[0]
+                if self.frames:
+                    later = min(self.frames)
+                    waited = time.time() - self.frames[later][1]
+                    if waited >= self.jitter_delay:
+                        # Give up on the gap: one frame of silence per missing
+                        # frame, but no more than MAX_CONCEALED_SECONDS
+                        self.concealed += later - self.next_seq
+                        length = len(self.frames[later][0]) * (later - self.next_seq)
+                        length = min(length, int((self.sample_rate or 0) * MAX_CONCEALED_SECONDS))
+                        silence = np.zeros(length, dtype=np.float32)
+                        self.next_seq = later
+                        return silence
+                    self.condition.wait(self.jitter_delay - waited)
+                else:
+                    self.condition.wait(0.5)
+        return None
+
+    def _playout(self):
+        while True:
+            samples = self._next_frame()
+            if samples is None:
+                break
+            try:
+                self.callback(samples, self.sample_rate)
+            except Exception as e:
+                print(f"Error in network audio callback: {e}")
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=2.0)
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                "connected": self.connected,
+                "sample_rate": self.sample_rate,
+                "received": self.received,
+                "duplicates": self.duplicates,
+                "concealed": self.concealed,
+                "buffered": len(self.frames),
+                "transit_seconds": self.transit
+            }
+
+
+class IngestServer:
+    """TCP listener that routes agent connections to NetworkSources by name"""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.sources = {}
+        self.lock = threading.Lock()
+        self.server_socket = None
+        self.running = False
+
+    def start(self):
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.host, self.port))
+        self.server_socket.listen()
+        self.port = self.server_socket.getsockname()[1]
+        self.running = True
+        threading.Thread(target=self._accept_loop, name="ingest-accept", daemon=True).start()
+        print(f"Audio ingest listening on {self.host}:{self.port}")
+        if self.host not in ("127.0.0.1", "localhost", "::1"):
+            print("Warning: audio ingest has no authentication; only expose it on a trusted network")
+
+    def stop(self):
+        self.running = False
+        if self.server_socket is not None:
+            self.server_socket.close()
+            self.server_socket = None
+        with self.lock:
+            sources = list(self.sources.values())
+            self.sources = {}
+        for source in sources:
+            source.close()
+
+    def open_source(self, name, callback, jitter_delay=0.3):
+        """Register the consumer of stream ``name``"""
+        with self.lock:
+            if name in self.sources:
+                raise ValueError(f"Stream '{name}' already has a consumer")
+            source = self.sources[name] = NetworkSource(name, callback, jitter_delay)
+        return source
+
+    def close_source(self, name):
+        with self.lock:
+            source = self.sources.pop(name, None)
+        if source is not None:
+            source.close()
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                connection, address = self.server_socket.accept()
+            except OSError:
+                break
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._handle_agent, args=(connection, address), daemon=True).start()
+
+    def _handle_agent(self, connection, address):
+        source = None
+        try:
+            header, _ = recv_message(connection, MAX_HEADER_BYTES, 0)
+            if header.get("type") != "hello" or header.get("encoding") not in ENCODINGS:
+                send_message(connection, {"ok": False, "error": "expected hello"})
+                return
+            rate = header.get("sample_rate")
+            if not _is_int(rate) or not SAMPLE_RATES[0] <= rate <= SAMPLE_RATES[1]:
+                send_message(connection, {"ok": False, "error": "invalid sample_rate"})
+                return
+            with self.lock:
+                source = self.sources.get(header.get("stream"))
+            if source is None:
+                send_message(connection, {"ok": False, "error": f"unknown stream '{header.get('stream')}'"})
+                return
+            source.on_hello(header)
+            send_message(connection, {"ok": True})
+            print(f"Capture agent {address[0]} connected to stream '{source.name}'")
+            encoding = header["encoding"]
+            while self.running:
+                frame, payload = recv_message(connection, MAX_HEADER_BYTES, MAX_FRAME_SAMPLES * 4)
+                seq, timestamp = frame.get("seq"), frame.get("ts")
+                if not _is_int(seq) or seq < 0:
+                    raise ValueError(f"Invalid frame seq {seq!r}")
+                if timestamp is not None and (isinstance(timestamp, bool) or not isinstance(timestamp, (int, float))):
+                    raise ValueError(f"Invalid frame ts {timestamp!r}")
+                source.push(seq, timestamp, decode_frame(payload, encoding))
+        except ValueError as e:
+            print(f"Dropping capture agent {address[0]}: {e}")
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if source is not None:
+                source.on_disconnect()
+                print(f"Capture agent {address[0]} disconnected from stream '{source.name}'")
+            connection.close()
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def get_server(host, port):
+    """Process-wide IngestServer per address, started on first use"""
+    with _servers_lock:
+        server = _servers.get((host, port))
+        if server is None or not server.running:
+            server = _servers[(host, port)] = IngestServer(host, port)
+            server.start()
+        return server
+
+
+class CaptureAgent:
+    """Stream frames from a local device to an IngestServer.
+
+    Parameters
+    ----------
+    server : tuple
+        ``(host, port)`` of the ingest server.
+    stream : str
+        Stream name the inference side consumes.
+    sample_rate : int
+        Rate of the frames passed to ``push``.
+    encoding : str
+        One of ``pcm16``, ``pcm16z`` or ``f32``.
+    buffer_seconds : float
+        Audio kept while disconnected; older frames are dropped.
+    """
+
+    def __init__(self, server, stream, sample_rate, encoding="pcm16", buffer_seconds=10.0,
+                 frame_seconds=0.1):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding '{encoding}'")
+        self.server = server
+        self.stream = stream
+        self.sample_rate = int(sample_rate)
+        self.encoding = encoding
+        self.session = uuid.uuid4().hex
+        self.pending = deque(maxlen=max(1, int(buffer_seconds / frame_seconds)))
+        self.condition = threading.Condition()
+        self.next_seq = 0
+        self.running = False
+        self.connected = False
+        self.sent = 0
+        self.thread = None
+
+    def push(self, samples, timestamp=None):
+        """Queue one frame of mono float32 samples; safe to call from an audio callback"""
+        with self.condition:
+            self.pending.append((self.next_seq, timestamp or time.time(), np.array(samples, dtype=np.float32)))
+            self.next_seq += 1
+            self.condition.notify()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._send_loop, name="capture-agent", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=5.0)
+
+    def _connect(self):
+        sock = socket.create_connection(self.server, timeout=5.0)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send_message(sock, {"type": "hello", "stream": self.stream, "session": self.session,
+                            "sample_rate": self.sample_rate, "encoding": self.encoding})
+        reply, _ = recv_message(sock)
+        if not reply.get("ok"):
+            sock.close()
+            raise ConnectionError(reply.get("error"))
+        sock.settimeout(None)
+        return sock
+
+    def _send_loop(self):
+        delay = 0.5
+        sock = None
+        while self.running:
+            if sock is None:
+                try:
+                    sock = self._connect()
+                    self.connected = True
+                    delay = 0.5
+                    print(f"Connected to {self.server[0]}:{self.server[1]} as '{self.stream}'")
+                except (ConnectionError, OSError) as e:
+                    print(f"Ingest server unreachable ({e}); retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    delay = min(delay * 2, 10.0)
+                    continue
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait(0.5)
+                if not self.pending:
+                    continue
+                seq, timestamp, samples = self.pending[0]
+            try:
+                send_message(sock, {"seq": seq, "ts": timestamp, "samples": len(samples)},
+                             encode_frame(samples, self.encoding))
+                with self.condition:
+                    # Only forget a frame once it is on the wire
+                    if self.pending and self.pending[0][0] == seq:
+                        self.pending.popleft()
+                self.sent += 1
+            except OSError:
+                sock.close()
+                sock = None
+                self.connected = False
+        if sock is not None:
+            sock.close()
+
+
+def main(argv=None):
+    import argparse
+    import sounddevice as sd
+
+    parser = argparse.ArgumentParser(description="Stream a local audio device to a remote translator")
+    parser.add_argument("--server", required=True, help="Ingest server as host:port")
+    parser.add_argument("--stream", required=True, help="Stream name the translator listens for")
+    parser.add_argument("--device", default=None, help="Input device name (default: system default)")
+    parser.add_argument("--channel", type=int, default=0, help="Input channel to send")
+    parser.add_argument("--encoding", default="pcm16", choices=ENCODINGS, help="Frame encoding")
+    parser.add_argument("--buffer-seconds", type=float, default=10.0, help="Audio kept while disconnected")
+
+    args = parser.parse_args(argv)
+    host, port, _ = parse_address(args.server, default_host="127.0.0.1")
+
+    device_index = None
+    if args.device:
+        for index, device in enumerate(sd.query_devices()):
+            if args.device.lower() in device["name"].lower() and device["max_input_channels"] > 0:
+                device_index = index
+                break
+        if device_index is None:
+            print(f"Device '{args.device}' not found")
+            return 1
+    info = sd.query_devices(device_index, "input")
+    sample_rate = int(info["default_samplerate"])
+
+    agent = CaptureAgent((host, port), args.stream, sample_rate, args.encoding, args.buffer_seconds)
+    agent.start()
+
+    def callback(indata, frames, time_info, status):
+        agent.push(indata[:, args.channel], time.time() - frames / sample_rate)
+
+    try:
+        with sd.InputStream(device=device_index, channels=args.channel + 1, samplerate=sample_rate,
+                            callback=callback, dtype=np.float32, blocksize=int(sample_rate * 0.1)):
+            print(f"Streaming {info['name']} at {sample_rate} Hz to {host}:{port} (Ctrl+C to stop)")
+            while True:
+                time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -131,9 +131,11 @@ class OBSSubtitleDisplay:
                         data = json.load(f)
                         text = data.get('text', '')
                         timestamp = data.get('timestamp', 0)
+                        # Progressively revealed cues carry their own lifetime
+                        duration = data.get('duration') if data.get('progressive') else self.subtitle_duration
                         
                         # Check if subtitle is still valid (not too old)
-                        if text and (time.time() - timestamp < self.subtitle_duration):
+                        if text and (time.time() - timestamp < duration):
                             subtitle_text = text
                             found_valid_subtitle = True
                             print(f"DEBUG: Valid JSON subtitle: {text}")
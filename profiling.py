@@ -0,0 +1,204 @@
+"""
+Opt-in timeline tracing and sampling profiler for the translation pipeline.
+
+TRACER records spans from the audio callback, ASR, translation and writer
+threads and dumps them in the Chrome trace event format (open the file in
+chrome://tracing or https://ui.perfetto.dev). While it is stopped, ``span()``
+hands back one shared no-op context manager, so instrumented code pays only
+for a method call.
+
+SamplingProfiler snapshots the stacks of every thread at a fixed interval
+for N seconds and writes them as folded stacks (one ``frame;frame;frame
+count`` line per stack), which flamegraph.pl and speedscope read directly.
+Unlike cProfile it sees all threads, including the PortAudio callback.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import threading
+from collections import deque, Counter
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "start")
+
+    def __init__(self, tracer, name, category):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.tracer.add_event(self.name, self.category, self.start, end - self.start)
+        return False
+
+
+class Tracer:
+    """Collect complete ("X") events for a Chrome trace"""
+
+    def __init__(self, max_events=200000):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+        self.thread_names = {}
+
+    def start(self):
+        self.events.clear()
+        self.thread_names = {}
+        self.origin = time.perf_counter()
+        self.enabled = True
+        print("Tracing started")
+
+    def stop(self, path=None):
+        """Stop tracing and, if a path is given, dump the trace there"""
+        self.enabled = False
+        print("Tracing stopped")
+        if path:
+            return self.dump(path)
+        return None
+
+    def span(self, name, category="pipeline"):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category)
+
+    def add_event(self, name, category, start, duration):
+        ident = threading.get_ident()
+        if ident not in self.thread_names:
+            self.thread_names[ident] = threading.current_thread().name
+        self.events.append((name, category, start, duration, ident))
+
+    def dump(self, path):
+        """Write the collected events as a Chrome trace JSON file"""
+        pid = os.getpid()
+        trace_events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": ident, "args": {"name": name}}
+            for ident, name in list(self.thread_names.items())
+        ]
+        for name, category, start, duration, ident in list(self.events):
+            trace_events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": ident
+            })
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+            print(f"Trace written to {path} ({len(trace_events)} events)")
+        except Exception as e:
+            print(f"Error writing trace: {e}")
+            return None
+        return path
+
+
+class SamplingProfiler:
+    """Sample every thread's stack at a fixed interval and dump folded stacks"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self.thread = None
+        self.running = False
+        self.output_path = None
+
+    def is_running(self):
+        return self.running
+
+    def start(self, seconds, output_path):
+        """Profile for ``seconds`` in the background, then write ``output_path``"""
+        if self.running:
+            return False
+        self.samples = Counter()
+        self.output_path = output_path
+        self.running = True
+        self.thread = threading.Thread(target=self._run, args=(seconds,), name="sampling-profiler", daemon=True)
+        self.thread.start()
+        print(f"Profiling for {seconds}s -> {output_path}")
+        return True
+
+    def stop(self):
+        """End the session early; the dump still happens"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=5.0)
+
+    def _run(self, seconds):
+        own_ident = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        while self.running and time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+        self.running = False
+        self.dump(self.output_path)
+
+    def dump(self, path):
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            print(f"Profile written to {path} ({sum(self.samples.values())} samples)")
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+
+
+# Process-wide instances used by the pipeline and the control endpoints
+TRACER = Tracer()
+PROFILER = SamplingProfiler()
+
+
+def install_signal_handlers(profile_seconds=10.0, output_dir="."):
+    """SIGUSR1 profiles for ``profile_seconds``; SIGUSR2 toggles tracing.
+
+    Output files are timestamped in ``output_dir``. Does nothing on platforms
+    without these signals (Windows).
+    """
+    if not hasattr(signal, "SIGUSR1"):
+        return False
+
+    def on_profile(signum, frame):
+        path = os.path.join(output_dir, f"profile_{int(time.time())}.folded")
+        PROFILER.start(profile_seconds, path)
+
+    def on_trace(signum, frame):
+        if TRACER.enabled:
+            # Dump from a thread; file I/O does not belong in a signal handler
+            path = os.path.join(output_dir, f"trace_{int(time.time())}.json")
+            threading.Thread(target=TRACER.stop, args=(path,), daemon=True).start()
+        else:
+            TRACER.start()
+
+    signal.signal(signal.SIGUSR1, on_profile)
+    signal.signal(signal.SIGUSR2, on_trace)
+    return True
@@ -0,0 +1,111 @@
+"""
+Streaming polyphase resampler for native-rate capture.
+
+Virtual cables and USB interfaces usually run at 44.1 or 48 kHz, and asking
+PortAudio for 16 kHz makes the driver resample, often slowly and sometimes
+not at all. Instead the device is opened at its native rate and channel
+count, and StreamingResampler converts each callback block to the model
+rate.
+
+The filter is the Kaiser-windowed FIR that ``scipy.signal.resample_poly``
+designs. Output samples are computed directly from the input with one
+vectorized multiply-add per block, so nothing is ever upsampled. The last
+taps of each block are kept so consecutive blocks join without clicks, and
+the output equals ``scipy.signal.upfirdn`` over the whole stream.
+"""
+
+import time
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from metrics import REGISTRY
+
+RESAMPLE_SECONDS = REGISTRY.histogram("translator_resample_seconds", "Resampling time per audio block",
+                                      buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01))
+
+
+def design_filter(up, down, half_len=10, beta=5.0):
+    """Low-pass FIR for ``up/down`` resampling, as designed by resample_poly"""
+    from scipy.signal import firwin
+
+    max_rate = max(up, down)
+    taps = firwin(2 * half_len * max_rate + 1, 1.0 / max_rate, window=("kaiser", beta))
+    return (taps * up).astype(np.float32)
+
+
+class StreamingResampler:
+    """Resample a mono stream block by block, keeping filter state.
+
+    Parameters
+    ----------
+    in_rate : int
+        Capture rate in Hz.
+    out_rate : int
+        Rate the pipeline expects, e.g. 16000.
+    half_len : int, optional
+        Filter half-length in output-rate zero crossings. Longer filters give
+        a sharper cutoff for more work per sample.
+    """
+
+    def __init__(self, in_rate, out_rate, half_len=10):
+        factor = gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // factor
+        self.down = self.in_rate // factor
+
+        if self.up == self.down:
+            taps = np.ones(1, dtype=np.float32)  # same rate: pass through
+        else:
+            taps = design_filter(self.up, self.down, half_len)
+        self.taps_per_phase = -(-len(taps) // self.up)
+        padded = np.zeros(self.taps_per_phase * self.up, dtype=np.float32)
+        padded[:len(taps)] = taps
+        # phases[p, j] multiplies input sample n - (taps_per_phase - 1 - j)
+        # for outputs whose upsampled position is congruent to p mod up
+        self.phases = padded.reshape(self.taps_per_phase, self.up).T[:, ::-1].copy()
+
+        self.history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        self.offset = 0  # next output's upsampled position relative to the block start
+
+        self.blocks = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+
+    def process(self, block):
+        """Resample one block of mono samples; returns float32 output"""
+        start = time.perf_counter()
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        buffer = np.concatenate((self.history, block))
+        end = len(block) * self.up
+        count = max(0, -(-(end - self.offset) // self.down))
+
+        positions = self.offset + np.arange(count) * self.down
+        rows = positions // self.up
+        windows = sliding_window_view(buffer, self.taps_per_phase)[rows]
+        output = np.einsum("ij,ij->i", windows, self.phases[positions % self.up])
+
+        self.offset += count * self.down - end
+        self.history = buffer[len(buffer) - len(self.history):].copy()
+
+        elapsed = time.perf_counter() - start
+        RESAMPLE_SECONDS.observe(elapsed)
+        self.blocks += 1
+        self.seconds_total += elapsed
+        self.seconds_max = max(self.seconds_max, elapsed)
+        return output.astype(np.float32, copy=False)
+
+    def reset(self):
+        self.history[:] = 0
+        self.offset = 0
+
+    def get_stats(self):
+        return {
+            "in_rate": self.in_rate,
+            "out_rate": self.out_rate,
+            "blocks": self.blocks,
+            "mean_ms_per_block": self.seconds_total / self.blocks * 1000 if self.blocks else 0.0,
+            "max_ms_per_block": self.seconds_max * 1000
+        }
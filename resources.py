@@ -0,0 +1,93 @@
+"""
+CPU budget and thread placement for the translation pipeline stages.
+
+One translator instance runs three kinds of work:
+
+- ``audio``: the PortAudio callback. It is short but must never wait for a
+  core, so by default it gets a core of its own.
+- ``io``: translation and subtitle writes, mostly waiting on the network and
+  the disk.
+- ``asr``: Whisper inference, i.e. CTranslate2's intra-op threads, or the ASR
+  worker processes.
+
+ResourceManager splits the cores an instance may use (``cpu_affinity``,
+capped at ``cpu_budget``) between the stages and derives the ASR thread
+count from that split. Give instances on one host disjoint ``cpu_affinity``
+lists and they no longer oversubscribe it. Pinning uses
+``os.sched_setaffinity``, which on Linux applies to the calling thread and is
+inherited by threads it creates later. Elsewhere only the thread counts are
+applied.
+"""
+
+import os
+
+STAGES = ("audio", "io", "asr")
+
+
+def available_cores():
+    """Cores this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def can_pin():
+    return hasattr(os, "sched_setaffinity")
+
+
+class ResourceManager:
+    """Split a core budget between the audio, io and asr stages.
+
+    Parameters
+    ----------
+    cores : list of int, optional
+        Core ids this instance may use. Defaults to the process affinity.
+    cpu_budget : int, optional
+        Most cores to use out of ``cores``; 0 means all of them.
+    isolate_audio : bool, optional
+        Reserve a core for the audio callback when there are at least two.
+    """
+
+    def __init__(self, cores=None, cpu_budget=0, isolate_audio=True):
+        cores = sorted(cores) if cores else available_cores()
+        if cpu_budget and cpu_budget > 0:
+            cores = cores[:cpu_budget]
+        self.cores = cores
+        self.isolate_audio = isolate_audio
+        self.allocation = self._allocate(cores)
+
+    def _allocate(self, cores):
+        if len(cores) == 1 or (len(cores) == 2 and not self.isolate_audio):
+            return {"audio": list(cores), "io": list(cores), "asr": list(cores)}
+        if len(cores) == 2:
+            return {"audio": cores[:1], "io": cores[1:], "asr": cores[1:]}
+        if self.isolate_audio:
+            return {"audio": cores[:1], "io": cores[1:2], "asr": cores[2:]}
+        return {"audio": cores[:1], "io": cores[:1], "asr": cores[1:]}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(cores=config.get("cpu_affinity") or None,
+                   cpu_budget=int(config.get("cpu_budget", 0)),
+                   isolate_audio=bool(config.get("isolate_audio", True)))
+
+    def cores_for(self, stage):
+        return self.allocation[stage]
+
+    def threads_for(self, stage, workers=1):
+        """Threads each of ``workers`` processes of a stage should run"""
+        return max(1, len(self.allocation[stage]) // max(1, workers))
+
+    def pin(self, stage):
+        """Restrict the calling thread to the cores of a stage"""
+        if not can_pin():
+            return False
+        try:
+            os.sched_setaffinity(0, self.allocation[stage])
+            return True
+        except OSError as e:
+            print(f"Could not pin {stage} thread: {e}")
+            return False
+
+    def describe(self):
+        return {stage: list(self.allocation[stage]) for stage in STAGES}
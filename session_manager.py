@@ -0,0 +1,337 @@
+"""
+Multi-stream caption sessions sharing one set of models.
+
+Each session owns its own RealtimeAudioTranslator (audio device, language
+pair, subtitle files) but no models: Whisper models and translators are
+loaded once in SharedModels, and a SharedASRScheduler decodes the chunks of
+every session round-robin on a fixed number of decode threads. The decode
+threads and the CTranslate2 threads per decode together stay within a global
+CPU budget, so ten streams share the CPU instead of each grabbing all cores.
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from startup import detect_device
+from model_registry import compute_type_for, load_whisper
+from subtitle_stream import RealtimeAudioTranslator
+from translator import Translator
+
+
+# Session ids end up in file names
+SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class SharedModels:
+    """Load Whisper models and translators once and hand them to every session"""
+
+    def __init__(self, cpu_threads=0, num_workers=1):
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.asr_models = {}
+        self.translators = {}
+        self.lock = threading.Lock()
+
+    def get_asr_model(self, model_size, config=None):
+        """Return the Whisper model for a size, loading it on first use.
+
+        ``compute_type``, ``model_dir`` and ``offline`` come from ``config``
+        (a translator config) and are honored as by every other loader;
+        the thread counts are the shared budget's.
+        """
+        config = dict(config or {}, whisper_model_size=model_size,
+                      cpu_threads=self.cpu_threads, num_workers=self.num_workers)
+        key = (model_size, compute_type_for(config, detect_device()))
+        with self.lock:
+            model = self.asr_models.get(key)
+            if model is None:
+                print(f"Loading shared Whisper model: {model_size}/{key[1]}")
+                model = load_whisper(config)
+                if model is None:
+                    raise RuntimeError(f"No usable Whisper model for {model_size}/{key[1]}")
+                self.asr_models[key] = model
+            return model
+
+    def get_translator(self, target_lang):
+        """Return the translator for a target language, creating it on first use"""
+        with self.lock:
+            translator = self.translators.get(target_lang)
+            if translator is None:
+                translator = Translator(target_lang=target_lang)
+                if not translator.load_model():
+                    raise RuntimeError("Failed to load translator")
+                self.translators[target_lang] = translator
+            return translator
+
+
+class SharedASRScheduler:
+    """Decode audio chunks from many translators on shared models.
+
+    Registered translators keep filling their own ``audio_queue``; the decode
+    threads take one chunk per translator in turn so a busy stream cannot
+    starve a quiet one, and put the recognized text on the translator's
+    ``transcript_queue``. A chunk found in the translator's fingerprint cache
+    is not decoded; it is queued with its cache entry in the same order.
+    """
+
+    def __init__(self, decode_threads=1, idle_sleep=0.02):
+        self.decode_threads = max(1, int(decode_threads))
+        self.idle_sleep = idle_sleep
+        self.translators = []
+        # Translators with a chunk being decoded. Decoding one chunk per
+        # translator at a time keeps its transcripts in capture order
+        self.busy = set()
+        self.next_index = 0
+        self.lock = threading.Lock()
+        self.threads = []
+        self.running = False
+        self.decoded_count = 0
+
+    def register(self, translator):
+        with self.lock:
+            if translator not in self.translators:
+                self.translators.append(translator)
+
+    def unregister(self, translator):
+        with self.lock:
+            if translator in self.translators:
+                self.translators.remove(translator)
+
+    def start(self):
+        """Start the decode threads"""
+        if self.running:
+            return
+        self.running = True
+        for _ in range(self.decode_threads):
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Stop the decode threads"""
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=5.0)
+        self.threads = []
+
+    def _next_chunk(self):
+        """Pick the next chunk, rotating over translators for fairness"""
+        with self.lock:
+            count = len(self.translators)
+            for offset in range(count):
+                index = (self.next_index + offset) % count
+                translator = self.translators[index]
+                if translator in self.busy:
+                    continue
+                try:
+                    item = translator.audio_queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self.busy.add(translator)
+                self.next_index = (index + 1) % count
+                return translator, item
+        return None, None
+
+    def _run(self):
+        while self.running:
+            translator, item = self._next_chunk()
+            if translator is None:
+                time.sleep(self.idle_sleep)
+                continue
+            chunk, trace = item
+            try:
+                text, options = translator.recognize_chunk(chunk, trace)
+                translator.transcript_queue.put((text, trace, options))
+            except Exception as e:
+                print(f"Error processing audio chunk: {e}")
+            finally:
+                with self.lock:
+                    self.busy.discard(translator)
+                    self.decoded_count += 1
+
+    def queue_depth(self):
+        """Chunks waiting to be decoded across all translators"""
+        with self.lock:
+            return sum(translator.audio_queue.qsize() for translator in self.translators)
+
+
+class Session:
+    """One caption stream: an audio source, a language pair and its outputs"""
+
+    def __init__(self, session_id, translator, settings):
+        self.session_id = session_id
+        self.translator = translator
+        self.settings = settings
+        self.created = time.time()
+        self.thread = None
+
+    def reconfigure(self, changes):
+        """Hot-apply config changes; the shared config file is left alone"""
+        result = self.translator.apply_config(changes, persist=False)
+        for key in result["applied"] + result["pending"]:
+            if key in self.settings:
+                self.settings[key] = changes[key]
+        return result
+
+    def get_stats(self):
+        # Live values (chunk_duration after adaptive chunking) win over the
+        # settings the session was created with
+        stats = dict(self.settings)
+        stats.update(self.translator.get_stats())
+        stats.update({
+            "session_id": self.session_id,
+            "created": self.created,
+            "queue_depth": self.translator.audio_queue.qsize()
+        })
+        return stats
+
+
+class SessionManager:
+    """Registry of caption sessions sharing models and a CPU budget.
+
+    Parameters
+    ----------
+    cpu_budget : int, optional
+        Total CPU threads inference may use across all sessions. Defaults to
+        the number of cores.
+    decode_threads : int
+        Chunks decoded concurrently; each decode gets
+        ``cpu_budget // decode_threads`` CTranslate2 threads.
+    max_sessions : int
+        Sessions allowed at once.
+    """
+
+    def __init__(self, cpu_budget=None, decode_threads=1, max_sessions=8,
+                 config_file="translation_config.json"):
+        self.cpu_budget = cpu_budget or os.cpu_count() or 1
+        self.decode_threads = max(1, min(int(decode_threads), self.cpu_budget))
+        self.max_sessions = max_sessions
+        self.config_file = config_file
+
+        self.models = SharedModels(
+            cpu_threads=max(1, self.cpu_budget // self.decode_threads),
+            num_workers=self.decode_threads
+        )
+        self.scheduler = SharedASRScheduler(decode_threads=self.decode_threads)
+        self.sessions = {}
+        self.reserved = set()  # ids of sessions whose models are still loading
+        self.lock = threading.Lock()
+
+    def create_session(self, device_name="CABLE Output", language="en", target_language="fa",
+                       whisper_model_size="tiny", chunk_duration=3.0, subtitle_file=None,
+                       session_id=None):
+        """Create and start a session, returning its id
+
+        ``session_id`` may only hold letters, digits, ``-`` and ``_``, since
+        it names the default subtitle file.
+        """
+        with self.lock:
+            if len(self.sessions) + len(self.reserved) >= self.max_sessions:
+                raise ValueError(f"Session limit reached ({self.max_sessions})")
+            session_id = session_id or uuid.uuid4().hex[:8]
+            if not SESSION_ID.fullmatch(str(session_id)):
+                raise ValueError("Session id must be 1-64 letters, digits, '-' or '_'")
+            if session_id in self.sessions or session_id in self.reserved:
+                raise ValueError(f"Session '{session_id}' already exists")
+            self.reserved.add(session_id)
+
+        # Loading a model can mean a long download; SharedModels has its own
+        # lock, so other sessions stay reachable meanwhile
+        try:
+            settings = {
+                "device_name": device_name,
+                "language": language,
+                "target_language": target_language,
+                "whisper_model_size": whisper_model_size,
+                "chunk_duration": float(chunk_duration),
+                "subtitle_file": subtitle_file or f"subtitle_{session_id}.txt"
+            }
+            translator = RealtimeAudioTranslator(
+                whisper_model_size=whisper_model_size,
+                chunk_duration=float(chunk_duration),
+                device_name=device_name,
+                subtitle_file=settings["subtitle_file"],
+                config_file=self.config_file
+            )
+            translator.config.update({
+                "language": language,
+                "target_language": target_language,
+                "whisper_model_size": whisper_model_size,
+                "transcript_session": session_id
+            })
+            translator.attach_shared_models(
+                self.models.get_asr_model(whisper_model_size, translator.config),
+                self.models.get_translator(target_language),
+                asr_scheduler=self.scheduler,
+                model_provider=self.models
+            )
+        except Exception:
+            with self.lock:
+                self.reserved.discard(session_id)
+            raise
+
+        with self.lock:
+            self.reserved.discard(session_id)
+            session = Session(session_id, translator, settings)
+            self.scheduler.register(translator)
+            self.scheduler.start()
+            self.sessions[session_id] = session
+            session.thread = threading.Thread(target=self._run_session, args=(session,), daemon=True)
+            session.thread.start()
+            return session_id
+
+    def _run_session(self, session):
+        """Stream a session, and drop it once the stream ends for any reason"""
+        try:
+            session.translator.start_streaming()
+        finally:
+            # start_streaming returns early when the device is missing or
+            # fails to open; such a session must not hold a slot forever
+            with self.lock:
+                if self.sessions.get(session.session_id) is session:
+                    print(f"Session {session.session_id} ended")
+                    self._remove(session)
+
+    def _remove(self, session):
+        del self.sessions[session.session_id]
+        self.scheduler.unregister(session.translator)
+        if not self.sessions:
+            self.scheduler.stop()
+
+    def list_sessions(self):
+        """Return the stats of every session"""
+        with self.lock:
+            return [session.get_stats() for session in self.sessions.values()]
+
+    def get_session(self, session_id):
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def stop_session(self, session_id):
+        """Stop a session and remove it from the registry"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return False
+            self._remove(session)
+            session.translator.stop_streaming()
+            return True
+
+    def stop_all(self):
+        for session_id in list(self.sessions):
+            self.stop_session(session_id)
+
+    def get_stats(self):
+        """Get statistics across all sessions"""
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "max_sessions": self.max_sessions,
+                "cpu_budget": self.cpu_budget,
+                "decode_threads": self.decode_threads,
+                "decoded_chunks": self.scheduler.decoded_count,
+                "queue_depth": self.scheduler.queue_depth()
+            }
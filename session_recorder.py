@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Record a live session and replay it offline.
+
+While recording, SessionRecorder saves four things:
+- every audio block the callback received, with its capture time
+- every ASR result and how long it took
+- every translation response and how long it took
+- every chunk's latency trace
+
+A recording is a directory holding ``meta.json`` (config and sample rate),
+``audio.f32`` (the blocks back to back) and ``events.jsonl``. The files are
+written by a background thread, so the audio callback only queues a copy.
+
+SessionReplayer feeds the audio back through a RealtimeAudioTranslator at
+the original pace, ``speed`` times faster, or as fast as possible. ASR and
+translation can each come from the recording or from real models. A mocked
+stage returns the recorded output after the recorded delay, scaled by the
+same speed. Replaying with both stages mocked reproduces an incident's
+timing without a GPU or network. Replaying with real ASR shows whether a new
+model or setting would have kept up. Use ``--trace`` to profile the re-run.
+
+Only the in-process and shared-scheduler decode paths are recorded. ASR
+pool workers decode in other processes.
+
+Example:
+    python subtitle_stream.py --record recordings/incident
+    python session_recorder.py recordings/incident --speed 4 --trace replay_trace.json
+    python session_recorder.py recordings/incident --real asr
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import tempfile
+import threading
+from collections import defaultdict, deque, namedtuple
+
+import numpy as np
+
+from model_server import TranscriptionInfo
+
+STAGES = ("asr", "translate")
+
+Word = namedtuple("Word", ["start", "end", "word"])
+ReplaySegment = namedtuple("ReplaySegment", ["text", "start", "end", "words"])
+
+
+class SessionRecorder:
+    """Capture a translator's inputs, stage outputs and timings to a directory.
+
+    Parameters
+    ----------
+    directory : str
+        Created if missing; an existing recording there is replaced.
+    translator : RealtimeAudioTranslator
+        The translator to record; its ``recorder`` is set by ``start``.
+    """
+
+    def __init__(self, directory, translator):
+        self.directory = directory
+        self.translator = translator
+        self.events = queue.Queue()
+        self.samples = 0  # audio samples queued so far
+        self.start_time = None
+        self.thread = None
+        self.recorded = defaultdict(int)
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.start_time = time.time()
+        meta = {
+            "started": self.start_time,
+            "sample_rate": self.translator.sample_rate,
+            "chunk_duration": self.translator.chunk_duration,
+            "config": self.translator.config
+        }
+        with open(os.path.join(self.directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        self.thread = threading.Thread(target=self._writer, name="session-recorder", daemon=True)
+        self.thread.start()
+        self.translator.recorder = self
+
+    def stop(self):
+        self.translator.recorder = None
+        self.events.put(None)
+        if self.thread is not None:
+            self.thread.join(timeout=10.0)
+            self.thread = None
+
+    def _writer(self):
+        with open(os.path.join(self.directory, "audio.f32"), "wb") as audio_file, \
+                open(os.path.join(self.directory, "events.jsonl"), "w", encoding="utf-8") as events_file:
+            while True:
+                item = self.events.get()
+                if item is None:
+                    break
+                event, block = item
+                if block is not None:
+                    audio_file.write(block.tobytes())
+                events_file.write(json.dumps(event, ensure_ascii=False) + "\n")
+                self.recorded[event["type"]] += 1
+
+    def record_audio(self, block, capture_time):
+        """Called from the audio callback: queue a copy of the block"""
+        block = np.array(block, dtype=np.float32)
+        event = {"type": "audio", "t": capture_time - self.start_time, "offset": self.samples,
+                 "frames": len(block)}
+        self.samples += len(block)
+        self.events.put_nowait((event, block))
+
+    def record_asr(self, start, end, segments, info):
+        """``segments`` are ``(text, start, end, words)`` with ``words`` as ``(start, end, word)``"""
+        self.events.put_nowait(({
+            "type": "asr", "t": start - self.start_time, "seconds": end - start,
+            "segments": [{"text": text, "start": seg_start, "end": seg_end, "words": words}
+                         for text, seg_start, seg_end, words in segments],
+            "language": getattr(info, "language", None),
+            "language_probability": getattr(info, "language_probability", None)
+        }, None))
+
+    def record_translation(self, start, end, text, src, target, result):
+        self.events.put_nowait(({
+            "type": "translate", "t": start - self.start_time, "seconds": end - start,
+            "text": text, "src": src, "target": target, "result": result
+        }, None))
+
+    def record_trace(self, trace):
+        self.events.put_nowait(({"type": "trace", "durations": trace.durations()}, None))
+
+
+def load_recording(directory):
+    """Return ``(meta, events, audio)`` of a recording directory"""
+    with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(os.path.join(directory, "events.jsonl"), "r", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    audio = np.fromfile(os.path.join(directory, "audio.f32"), dtype=np.float32)
+    return meta, events, audio
+
+
+class ReplayASR:
+    """Stand-in Whisper model returning recorded results in order"""
+
+    def __init__(self, results, speed=1.0):
+        self.results = deque(results)
+        self.speed = speed
+        self.missing = 0
+
+    def transcribe(self, audio, **options):
+        if not self.results:
+            self.missing += 1
+            return iter([]), TranscriptionInfo(options.get("language"), None)
+        result = self.results.popleft()
+        if self.speed:
+            time.sleep(result["seconds"] / self.speed)
+        segments = [ReplaySegment(seg["text"], seg["start"], seg["end"],
+                                  [Word(*word) for word in seg.get("words") or ()])
+                    for seg in result["segments"]]
+        return iter(segments), TranscriptionInfo(result.get("language"), result.get("language_probability"))
+
+
+class ReplayTranslator:
+    """Stand-in translator answering with recorded responses"""
+
+    def __init__(self, responses, target_lang, speed=1.0):
+        self.responses = {}
+        for response in responses:
+            self.responses.setdefault((response["text"], response["target"]), response)
+        self.target_lang = target_lang
+        self.speed = speed
+        self.model = self
+        self.missing = 0
+
+    def translate_text(self, english_text, src="en"):
+        response = self.responses.get((english_text, self.target_lang))
+        if response is None:
+            # A real ASR stage can produce text that was never translated
+            self.missing += 1
+            return english_text
+        if self.speed:
+            time.sleep(response["seconds"] / self.speed)
+        return response["result"]
+
+    def translate_batch(self, english_texts, src="en"):
+        return [self.translate_text(text, src=src) for text in english_texts]
+
+
+def _format_percentiles(percentiles):
+    return f"p50 {percentiles['p50']:.2f}s p95 {percentiles['p95']:.2f}s" if percentiles else "-"
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "count": len(values)}
+
+
+class SessionReplayer:
+    """Feed a recording back through a RealtimeAudioTranslator.
+
+    Parameters
+    ----------
+    directory : str
+        A recording made by SessionRecorder.
+    speed : float
+        1.0 replays at the recorded pace, 4.0 four times faster, 0 as fast
+        as possible. Mocked stage delays are scaled the same way.
+    mock : iterable of str
+        Stages served from the recording: any of ``asr`` and ``translate``.
+    output_dir : str, optional
+        Where the replay's config and subtitle files go; a temporary
+        directory by default.
+    """
+
+    def __init__(self, directory, speed=1.0, mock=STAGES, output_dir=None):
+        unknown = set(mock) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+        self.meta, self.events, self.audio = load_recording(directory)
+        self.speed = speed
+        self.mock = set(mock)
+        self.output_dir = output_dir or tempfile.mkdtemp(prefix="replay_")
+        self.translator = None
+
+    def build_translator(self):
+        """Create a translator with the recorded config and the requested mocks"""
+        from subtitle_stream import RealtimeAudioTranslator
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        config = dict(self.meta["config"])
+        if int(config.get("asr_workers") or 0) > 0:
+            print(f"Recorded with {config['asr_workers']} ASR worker(s); replaying in-process")
+        # Replays must not append to the live session's stores or archive.
+        # Mocked results are handed out in order, so no chunk may be dropped
+        # from a queue that a fast replay fills
+        config.update({"transcript_db": "", "archive_dir": "", "network_source": "", "asr_workers": 0,
+                       "max_queued_chunks": 0})
+        config_file = os.path.join(self.output_dir, "translation_config.json")
+        with open(config_file, "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+
+        translator = RealtimeAudioTranslator(
+            whisper_model_size=config.get("whisper_model_size", "tiny"),
+            chunk_duration=self.meta.get("chunk_duration"),
+            sample_rate=self.meta["sample_rate"],
+            subtitle_file=os.path.join(self.output_dir, "subtitle.txt"),
+            config_file=config_file
+        )
+        if self.mock != set(STAGES) and not translator.initialize_models():
+            raise RuntimeError("Failed to initialize models for the real stages")
+        if "asr" in self.mock:
+            translator.asr_model = ReplayASR([e for e in self.events if e["type"] == "asr"], self.speed)
+        if "translate" in self.mock:
+            translator.translator = ReplayTranslator([e for e in self.events if e["type"] == "translate"],
+                                                     config.get("target_language", "fa"), self.speed)
+        self.translator = translator
+        return translator
+
+    def run(self):
+        """Replay the whole recording and return a report dict"""
+        translator = self.translator or self.build_translator()
+        translator.is_recording = True
+        worker = threading.Thread(target=translator.run_processing_loop, daemon=True)
+        worker.start()
+
+        audio_events = [event for event in self.events if event["type"] == "audio"]
+        first = audio_events[0]["t"] if audio_events else 0.0
+        start = time.time()
+        for event in audio_events:
+            if self.speed:
+                delay = start + (event["t"] - first) / self.speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            block = self.audio[event["offset"]:event["offset"] + event["frames"]]
+            translator.audio_callback(block, len(block), None, None)
+
+        # The loop finishes the chunk it is working on before it exits
+        while translator.audio_queue.qsize() > 0:
+            time.sleep(0.01)
+        translator.is_recording = False
+        worker.join()
+        if translator.asr_pool:
+            translator.asr_pool.stop()
+
+        recorded = defaultdict(list)
+        for event in self.events:
+            if event["type"] == "trace":
+                for name, value in event["durations"].items():
+                    recorded[name].append(value)
+        stats = translator.get_stats()
+        return {
+            "wall_seconds": time.time() - start,
+            "audio_seconds": len(self.audio) / self.meta["sample_rate"],
+            "mocked": sorted(self.mock),
+            "subtitles": stats["translation_count"],
+            "recorded_subtitles": sum(1 for event in self.events if event["type"] == "trace"),
+            "latency": stats["latency"],
+            "recorded_latency": {name: _percentiles(values) for name, values in recorded.items()},
+            "unmatched": {
+                "asr": getattr(translator.asr_model, "missing", 0),
+                "translate": getattr(translator.translator, "missing", 0)
+            },
+            "subtitle_file": translator.subtitle_file
+        }
+
+
+def main(argv=None):
+    import argparse
+    from profiling import TRACER
+
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the pipeline")
+    parser.add_argument("recording", help="Directory written by subtitle_stream.py --record")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed; 0 runs as fast as possible")
+    parser.add_argument("--real", action="append", default=[], choices=STAGES,
+                        help="Run this stage for real instead of replaying it; repeatable")
+    parser.add_argument("--output", help="Directory for the replay's subtitle files")
+    parser.add_argument("--trace", metavar="FILE", help="Write a Chrome trace of the replay to FILE")
+
+    args = parser.parse_args(argv)
+    replayer = SessionReplayer(args.recording, speed=args.speed,
+                               mock=[stage for stage in STAGES if stage not in args.real],
+                               output_dir=args.output)
+    if args.trace:
+        TRACER.start()
+    try:
+        report = replayer.run()
+    except (OSError, RuntimeError) as e:
+        print(f"Replay failed: {e}")
+        return 1
+    finally:
+        if args.trace:
+            TRACER.stop(args.trace)
+
+    print(f"Replayed {report['audio_seconds']:.1f}s of audio in {report['wall_seconds']:.1f}s "
+          f"(mocked: {', '.join(report['mocked']) or 'nothing'})")
+    print(f"Subtitles: {report['subtitles']} (recorded: {report['recorded_subtitles']})")
+    for name in ("asr", "translate", "total"):
+        replayed = report["latency"].get(name)
+        recorded = report["recorded_latency"].get(name)
+        if replayed or recorded:
+            print(f"  {name:<10} replay {_format_percentiles(replayed):<22} recorded {_format_percentiles(recorded)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
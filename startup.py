@@ -0,0 +1,67 @@
+"""
+Startup helpers: a torch-free compute device probe and a startup-time profiler.
+
+The device probe asks CTranslate2 (already installed with faster-whisper) for
+CUDA devices instead of importing torch, which alone takes seconds. The probe
+result is cached for the life of the process.
+
+STARTUP records how long each startup phase takes (imports, model loads,
+opening the audio device) so ``--profile-startup`` can print a breakdown.
+"""
+
+import time
+from contextlib import contextmanager
+
+_device = None
+
+
+def detect_device():
+    """Return "cuda" if CTranslate2 sees a CUDA device, otherwise "cpu" """
+    global _device
+    if _device is None:
+        try:
+            import ctranslate2
+            _device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        except Exception:
+            _device = "cpu"
+    return _device
+
+
+def default_compute_type(device):
+    """Compute type used when the config says "auto" """
+    return "float16" if device == "cuda" else "float32"
+
+
+class StartupProfiler:
+    """Wall-clock breakdown of startup phases, relative to process import time"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = []
+        self.enabled = False
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start - self.origin, time.perf_counter() - start))
+
+    def mark(self, name):
+        """Record an instant, e.g. the end of module imports"""
+        self.phases.append((name, time.perf_counter() - self.origin, 0.0))
+
+    def report(self):
+        """Print the breakdown if profiling was requested"""
+        if not self.enabled:
+            return
+        print("\nStartup profile:")
+        print(f"  {'phase':32} {'at':>8} {'took':>8}")
+        for name, offset, duration in self.phases:
+            print(f"  {name:32} {offset:7.3f}s {duration:7.3f}s")
+        print(f"  {'total':32} {time.perf_counter() - self.origin:7.3f}s")
+        print("  (run with python -X importtime for a per-module import breakdown)\n")
+
+
+STARTUP = StartupProfiler()
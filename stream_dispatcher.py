@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Spread caption streams over several worker processes or machines.
+
+A StreamCoordinator assigns streams to CaptionWorkers from the load each
+worker reports (queue depth and ASR real-time factor), moves streams off
+workers that are overloaded and reassigns everything a worker owned when its
+heartbeats stop. Every load report lists the streams the worker actually
+runs, and the coordinator reconciles its assignments against it: a stream
+that failed to start is reassigned, and a worker running a stream that now
+belongs elsewhere (after a partition, say) is told to release it.
+Coordinator and workers only exchange JSON messages through a transport:
+
+- LocalBroker / LocalTransport: in-process queues, for tests and single-host use
+- SocketBroker / SocketTransport: a small TCP relay for workers on other hosts
+"""
+
+import json
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+COORDINATOR = "coordinator"
+
+
+class LocalBroker:
+    """In-process message hub with one inbox per endpoint name"""
+
+    def __init__(self):
+        self.inboxes = {}
+        self.lock = threading.Lock()
+
+    def inbox(self, name):
+        with self.lock:
+            if name not in self.inboxes:
+                self.inboxes[name] = queue.Queue()
+            return self.inboxes[name]
+
+    def deliver(self, name, message):
+        self.inbox(name).put(message)
+
+
+class LocalTransport:
+    """Endpoint on a LocalBroker"""
+
+    def __init__(self, broker, name):
+        self.broker = broker
+        self.name = name
+        self.inbox = broker.inbox(name)
+        self.on_reconnect = None  # never called; local links do not drop
+
+    def send(self, to, message):
+        self.broker.deliver(to, dict(message, sender=self.name))
+
+    def recv(self, timeout=None):
+        """Return the next message, or None if none arrives within timeout"""
+        try:
+            return self.inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+class _RelayHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        relay = self.server.relay
+        name = None
+        try:
+            hello = json.loads(self.rfile.readline())
+            name = hello["name"]
+            with relay.lock:
+                relay.clients[name] = self.wfile
+            for line in self.rfile:
+                message = json.loads(line)
+                relay.forward(message.get("to"), line)
+        except (OSError, ValueError, KeyError):
+            pass
+        finally:
+            with relay.lock:
+                if name is not None and relay.clients.get(name) is self.wfile:
+                    del relay.clients[name]
+
+
+class SocketBroker:
+    """TCP relay that forwards JSON-line messages between named endpoints"""
+
+    def __init__(self, host="127.0.0.1", port=7870):
+        self.clients = {}
+        self.lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer((host, port), _RelayHandler)
+        self.server.daemon_threads = True
+        self.server.relay = self
+        self.address = self.server.server_address
+
+    def forward(self, to, line):
+        with self.lock:
+            wfile = self.clients.get(to)
+            if wfile is None:
+                return
+            try:
+                wfile.write(line)
+                wfile.flush()
+            except OSError:
+                pass
+
+    def start(self):
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SocketTransport:
+    """Endpoint connected to a SocketBroker; reconnects if the link drops"""
+
+    def __init__(self, host, port, name, reconnect_delay=1.0):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.reconnect_delay = reconnect_delay
+        # Called after the link comes back, e.g. so a worker registers again
+        self.on_reconnect = None
+        self.inbox = queue.Queue()
+        self.sock = None
+        self.send_lock = threading.Lock()
+        self.running = True
+        self._connect()
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def _connect(self):
+        self.sock = socket.create_connection((self.host, self.port))
+        self.sock.sendall((json.dumps({"name": self.name}) + "\n").encode("utf-8"))
+
+    def _read_loop(self):
+        while self.running:
+            try:
+                for line in self.sock.makefile("rb"):
+                    self.inbox.put(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            if not self.running:
+                break
+            time.sleep(self.reconnect_delay)
+            try:
+                with self.send_lock:
+                    self._connect()
+            except OSError:
+                continue
+            if self.on_reconnect is not None:
+                self.on_reconnect()
+
+    def send(self, to, message):
+        data = json.dumps(dict(message, to=to, sender=self.name)) + "\n"
+        with self.send_lock:
+            try:
+                self.sock.sendall(data.encode("utf-8"))
+            except OSError as e:
+                print(f"Error sending to {to}: {e}")
+
+    def recv(self, timeout=None):
+        try:
+            return self.inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.running = False
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class WorkerState:
+    """What the coordinator knows about one worker"""
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity
+        self.streams = set()
+        self.last_seen = time.time()
+        self.queue_depth = 0
+        self.rtf = 0.0
+
+    def load_score(self):
+        """Smaller is better: stream share of capacity, scaled up by RTF and backlog"""
+        utilization = (len(self.streams) + 1) / max(1, self.capacity)
+        return utilization * (1.0 + self.rtf + 0.5 * self.queue_depth)
+
+    def has_room(self):
+        return len(self.streams) < self.capacity
+
+
+class StreamCoordinator:
+    """Assign streams to workers and rebalance them from reported load.
+
+    Parameters
+    ----------
+    transport : LocalTransport or SocketTransport
+        Endpoint named ``"coordinator"``.
+    heartbeat_timeout : float
+        Seconds without a load report before a worker is considered dead.
+    max_rtf : float
+        Real-time factor above which a worker is overloaded.
+    max_queue_depth : int
+        Queued chunks above which a worker is overloaded.
+    assign_timeout : float
+        Seconds a worker may take to start an assigned stream before a load
+        report without it counts as a failed start.
+    """
+
+    def __init__(self, transport, heartbeat_timeout=10.0, max_rtf=0.9, max_queue_depth=3,
+                 rebalance_interval=5.0, assign_timeout=5.0):
+        self.transport = transport
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_rtf = max_rtf
+        self.max_queue_depth = max_queue_depth
+        self.rebalance_interval = rebalance_interval
+        self.assign_timeout = assign_timeout
+        self.workers = {}
+        self.streams = {}      # stream_id -> spec
+        self.assignments = {}  # stream_id -> worker name
+        self.assigned_at = {}  # stream_id -> time the assign was sent
+        self.last_rebalance = 0.0
+        self.moves = 0
+        self.failed_starts = 0
+        self.running = False
+
+    def add_stream(self, stream_id, spec):
+        self.streams[stream_id] = dict(spec, stream_id=stream_id)
+
+    def remove_stream(self, stream_id):
+        self.streams.pop(stream_id, None)
+        self._unassign(stream_id)
+
+    def handle_message(self, message):
+        kind = message.get("type")
+        name = message.get("sender")
+        if kind == "register":
+            # A restarted worker runs nothing it was given before, so its
+            # old state is dropped rather than reused
+            for stream_id, owner in list(self.assignments.items()):
+                if owner == name:
+                    self.assignments.pop(stream_id)
+                    self.assigned_at.pop(stream_id, None)
+            worker = WorkerState(name, message.get("capacity", 1))
+            self.workers[name] = worker
+            print(f"Worker registered: {name} (capacity {worker.capacity})")
+            self._reconcile(worker, message.get("streams", []))
+        elif kind == "load":
+            worker = self.workers.get(name)
+            if worker is None:
+                # Timed out earlier (e.g. a partition); its streams may run
+                # elsewhere by now, so it must register and be reconciled
+                self.transport.send(name, {"type": "reregister"})
+                return
+            worker.last_seen = time.time()
+            worker.queue_depth = message.get("queue_depth", 0)
+            worker.rtf = message.get("rtf") or 0.0
+            if "streams" in message:
+                self._reconcile(worker, message["streams"])
+
+    def _reconcile(self, worker, reported):
+        """Match assignments to the streams ``worker`` reports running"""
+        now = time.time()
+        reported = set(reported)
+        for stream_id in reported:
+            owner = self.assignments.get(stream_id)
+            if owner == worker.name:
+                continue
+            if owner is None and stream_id in self.streams and worker.has_room():
+                # Still running from before a reconnect, and nobody took it over
+                worker.streams.add(stream_id)
+                self.assignments[stream_id] = worker.name
+                self.assigned_at[stream_id] = now
+            else:
+                self.transport.send(worker.name, {"type": "release", "stream_id": stream_id})
+        for stream_id in sorted(worker.streams - reported):
+            if now - self.assigned_at.get(stream_id, 0.0) < self.assign_timeout:
+                continue  # the assign may still be on its way
+            print(f"Worker {worker.name} is not running {stream_id}; reassigning it")
+            self.failed_starts += 1
+            worker.streams.discard(stream_id)
+            self.assignments.pop(stream_id, None)
+            self.assigned_at.pop(stream_id, None)
+            if stream_id in self.streams:
+                # Another worker first; otherwise tick() retries anywhere
+                self._assign(stream_id, exclude=worker.name)
+
+    def _assign(self, stream_id, exclude=None):
+        candidates = [w for w in self.workers.values() if w.has_room() and w.name != exclude]
+        if not candidates:
+            return False
+        worker = min(candidates, key=lambda w: w.load_score())
+        worker.streams.add(stream_id)
+        self.assignments[stream_id] = worker.name
+        self.assigned_at[stream_id] = time.time()
+        self.transport.send(worker.name, {"type": "assign", "stream": self.streams[stream_id]})
+        return True
+
+    def _unassign(self, stream_id):
+        self.assigned_at.pop(stream_id, None)
+        worker_name = self.assignments.pop(stream_id, None)
+        if worker_name in self.workers:
+            self.workers[worker_name].streams.discard(stream_id)
+            self.transport.send(worker_name, {"type": "release", "stream_id": stream_id})
+        return worker_name
+
+    def is_overloaded(self, worker):
+        return worker.rtf > self.max_rtf or worker.queue_depth > self.max_queue_depth
+
+    def tick(self):
+        """Process messages, drop dead workers and (re)assign streams"""
+        message = self.transport.recv(timeout=0.1)
+        while message is not None:
+            self.handle_message(message)
+            message = self.transport.recv(timeout=0)
+
+        now = time.time()
+        for name, worker in list(self.workers.items()):
+            if now - worker.last_seen > self.heartbeat_timeout:
+                print(f"Worker {name} stopped reporting; reassigning {len(worker.streams)} streams")
+                for stream_id in worker.streams:
+                    self.assignments.pop(stream_id, None)
+                    self.assigned_at.pop(stream_id, None)
+                    # In case it is alive but cut off: it must not keep captioning
+                    self.transport.send(name, {"type": "release", "stream_id": stream_id})
+                del self.workers[name]
+
+        for stream_id in self.streams:
+            if stream_id not in self.assignments:
+                self._assign(stream_id)
+
+        # Move one stream off each overloaded worker per rebalance interval
+        # so a worker is never drained on a single bad report
+        if now - self.last_rebalance >= self.rebalance_interval:
+            self.last_rebalance = now
+            for worker in list(self.workers.values()):
+                if self.is_overloaded(worker) and len(worker.streams) > 1:
+                    stream_id = sorted(worker.streams)[-1]
+                    others = [w for w in self.workers.values()
+                              if w.name != worker.name and w.has_room() and not self.is_overloaded(w)]
+                    if others:
+                        self._unassign(stream_id)
+                        self._assign(stream_id, exclude=worker.name)
+                        self.moves += 1
+
+    def run(self):
+        self.running = True
+        while self.running:
+            self.tick()
+
+    def stop(self):
+        self.running = False
+
+    def get_stats(self):
+        return {
+            "workers": {
+                name: {"streams": sorted(w.streams), "rtf": w.rtf, "queue_depth": w.queue_depth}
+                for name, w in self.workers.items()
+            },
+            "unassigned": sorted(set(self.streams) - set(self.assignments)),
+            "moves": self.moves,
+            "failed_starts": self.failed_starts
+        }
+
+
+class CaptionWorker:
+    """Run the streams a coordinator assigns and report load back to it.
+
+    ``stream_factory(spec)`` must return an object with ``stop()``,
+    ``get_stats()`` and ``is_running()``; the default starts a session on a
+    SessionManager.
+    """
+
+    def __init__(self, transport, capacity=4, stream_factory=None, report_interval=2.0):
+        self.transport = transport
+        self.capacity = capacity
+        self.report_interval = report_interval
+        self.stream_factory = stream_factory or self._session_factory
+        self.streams = {}
+        self.session_manager = None
+        self.running = False
+        # Register again whenever the link to the coordinator comes back
+        transport.on_reconnect = self.register
+
+    def _session_factory(self, spec):
+        if self.session_manager is None:
+            from session_manager import SessionManager
+            self.session_manager = SessionManager(max_sessions=self.capacity)
+        settings = {k: v for k, v in spec.items() if k != "stream_id"}
+        session_id = self.session_manager.create_session(session_id=spec["stream_id"], **settings)
+        return _SessionHandle(self.session_manager, session_id)
+
+    def register(self):
+        """Announce this worker, with the streams it already runs"""
+        self.transport.send(COORDINATOR, {"type": "register", "capacity": self.capacity,
+                                          "streams": sorted(self.streams)})
+
+    def report_load(self):
+        # Only streams that are still up are reported, so the coordinator
+        # reassigns one whose device failed after it started
+        for stream_id in [s for s, stream in self.streams.items() if not stream.is_running()]:
+            print(f"Stream {stream_id} stopped")
+            del self.streams[stream_id]
+        queue_depth = 0
+        rtf = 0.0
+        for stream in self.streams.values():
+            stats = stream.get_stats()
+            queue_depth += stats.get("queue_depth", 0)
+            rtf = max(rtf, stats.get("asr_rtf") or 0.0)
+        self.transport.send(COORDINATOR, {
+            "type": "load",
+            "streams": sorted(self.streams),
+            "queue_depth": queue_depth,
+            "rtf": rtf
+        })
+
+    def handle_message(self, message):
+        kind = message.get("type")
+        if kind == "assign":
+            spec = message["stream"]
+            stream_id = spec["stream_id"]
+            if stream_id not in self.streams:
+                try:
+                    self.streams[stream_id] = self.stream_factory(spec)
+                    print(f"Started stream {stream_id}")
+                except Exception as e:
+                    print(f"Error starting stream {stream_id}: {e}")
+        elif kind == "release":
+            stream = self.streams.pop(message.get("stream_id"), None)
+            if stream is not None:
+                stream.stop()
+                print(f"Released stream {message.get('stream_id')}")
+        elif kind == "reregister":
+            self.register()
+
+    def run(self):
+        self.running = True
+        self.register()
+        last_report = 0.0
+        while self.running:
+            message = self.transport.recv(timeout=0.2)
+            if message is not None:
+                self.handle_message(message)
+            if time.time() - last_report >= self.report_interval:
+                self.report_load()
+                last_report = time.time()
+
+    def stop(self):
+        self.running = False
+        for stream in self.streams.values():
+            stream.stop()
+        self.streams = {}
+
+
+class _SessionHandle:
+    def __init__(self, session_manager, session_id):
+        self.session_manager = session_manager
+        self.session_id = session_id
+
+    def stop(self):
+        self.session_manager.stop_session(self.session_id)
+
+    def get_stats(self):
+        session = self.session_manager.get_session(self.session_id)
+        return session.get_stats() if session else {}
+
+    def is_running(self):
+        # The manager drops sessions whose stream ended
+        return self.session_manager.get_session(self.session_id) is not None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Distribute caption streams over worker nodes")
+    parser.add_argument("role", choices=["broker", "coordinator", "worker"], help="Process role")
+    parser.add_argument("--broker", default="127.0.0.1:7870", help="Broker address (host:port)")
+    parser.add_argument("--name", default=socket.gethostname(), help="Worker name")
+    parser.add_argument("--capacity", type=int, default=4, help="Streams this worker may run")
+    parser.add_argument("--streams", help="JSON file mapping stream ids to session settings")
+
+    args = parser.parse_args()
+    host, port = args.broker.rsplit(":", 1)
+
+    try:
+        if args.role == "broker":
+            broker = SocketBroker(host, int(port))
+            print(f"Broker listening on {args.broker}")
+            broker.serve_forever()
+        elif args.role == "coordinator":
+            coordinator = StreamCoordinator(SocketTransport(host, int(port), COORDINATOR))
+            if args.streams:
+                with open(args.streams, "r", encoding="utf-8") as f:
+                    for stream_id, spec in json.load(f).items():
+                        coordinator.add_stream(stream_id, spec)
+            coordinator.run()
+        else:
+            worker = CaptionWorker(SocketTransport(host, int(port), args.name), capacity=args.capacity)
+            worker.run()
+    except KeyboardInterrupt:
+        print("\nStopped")
@@ -0,0 +1,123 @@
+"""
+Progressive subtitle reveal driven by word timestamps.
+
+Without it a chunk's whole subtitle appears at once, after decoding and
+translation, and stays up for a fixed ``subtitle_duration``. With it the
+source text appears word by word at the pace it was spoken. The translation
+is revealed in step: the same share of its words as the share of the speech
+heard so far. Its word order differs, so this is only an approximation. The
+cue stays up for the length of the speech plus ``hold`` seconds.
+
+One timer thread serves all cues. It sleeps until the next reveal step is
+due and writes only at word boundaries. Words closer together than
+``min_step`` share one write. A new cue replaces the steps left over from
+the previous one.
+"""
+
+import math
+import threading
+import time
+
+# Assumed speaking rate when the ASR gave no word timestamps
+SECONDS_PER_WORD = 0.3
+
+
+def plan_reveal(english_text, translated_text, words=None, audio_seconds=None, min_step=0.2):
+    """Return ``(steps, span)``; steps are ``(offset, english, translated)``.
+
+    ``words`` are ``(start, end, word)`` tuples from the ASR. Without them
+    the words of ``english_text`` are spread evenly over ``audio_seconds``.
+    """
+    if not words:
+        tokens = english_text.split()
+        if not tokens:
+            return [(0.0, english_text, translated_text)], 0.0
+        step = (audio_seconds / len(tokens)) if audio_seconds else SECONDS_PER_WORD
+        words = [(i * step, (i + 1) * step, token) for i, token in enumerate(tokens)]
+
+    first = words[0][0]
+    span = max(words[-1][1] - first, 0.0)
+    translated_words = translated_text.split()
+
+    # Each group is one write: (start, index of its last word, end of its last word)
+    groups = []
+    for index, (start, end, word) in enumerate(words):
+        if groups and start - groups[-1][0] < min_step:
+            groups[-1] = (groups[-1][0], index, end)
+        else:
+            groups.append((start, index, end))
+    shown = [word.strip() for _, _, word in words]
+
+    plan = []
+    for start, index, end in groups[:-1]:
+        fraction = (end - first) / span if span else 1.0
+        count = min(len(translated_words), math.ceil(fraction * len(translated_words)))
+        plan.append((start - first, " ".join(shown[:index + 1]), " ".join(translated_words[:count])))
+    # The last step always shows the complete texts
+    plan.append((groups[-1][0] - first, english_text, translated_text))
+    return plan, span
+
+
+class RevealScheduler:
+    """Reveal subtitle cues word by word from one timer thread.
+
+    Parameters
+    ----------
+    write : callable
+        Called as ``write(translated_text, english_text, duration, trace)``.
+        ``duration`` is the time the cue has left.
+    hold : float
+        Seconds the complete cue stays up after the last word.
+    min_step : float
+        Words closer together than this are revealed in one write.
+    """
+
+    def __init__(self, write, hold=1.0, min_step=0.2):
+        self.write = write
+        self.hold = hold
+        self.min_step = min_step
+        self.condition = threading.Condition()
+        self.steps = []  # (due time, english, translated) of the current cue
+        self.expires = 0.0
+        self.thread = None
+        self.cues = 0
+        self.writes = 0
+
+    def show(self, translated_text, english_text, words=None, audio_seconds=None, trace=None):
+        """Start revealing a cue; the first step is written before returning"""
+        plan, span = plan_reveal(english_text, translated_text, words, audio_seconds, self.min_step)
+        start = time.time()
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="subtitle-reveal", daemon=True)
+                self.thread.start()
+            self.cues += 1
+            self.expires = start + span + self.hold
+            self.steps = [(start + offset, english, translated) for offset, english, translated in plan[1:]]
+            # Written under the lock so a step of the old cue cannot land after it
+            _, english, translated = plan[0]
+            self.write(translated, english, self.expires - start, trace)
+            self.writes += 1
+            self.condition.notify()
+
+    def _run(self):
+        with self.condition:
+            while True:
+                if not self.steps:
+                    self.condition.wait()
+                    continue
+                now = time.time()
+                due, english, translated = self.steps[0]
+                if due > now:
+                    self.condition.wait(due - now)
+                    continue
+                self.steps.pop(0)
+                try:
+                    self.write(translated, english, self.expires - now, None)
+                    self.writes += 1
+                except Exception as e:
+                    print(f"Error revealing subtitle: {e}")
+
+    def get_stats(self):
+        with self.condition:
+            return {"cues": self.cues, "writes": self.writes, "pending_steps": len(self.steps)}
@@ -4,59 +4,253 @@ import threading
 import time
 import queue
 import os
-from faster_whisper import WhisperModel
+from startup import STARTUP, detect_device
+from model_registry import compute_type_for, resolve_model, load_whisper
+from resources import ResourceManager
+from resampler import StreamingResampler
+from fingerprint_cache import FingerprintCache
+from subtitle_reveal import RevealScheduler
+from language_tracker import LanguageTracker
+from text_filter import TextFilter
+from transcript_store import open_store
+from audio_archive import AudioArchive
 from translator import Translator
-import torch
-from collections import deque
+from asr_worker_pool import ASRWorkerPool
+from model_server import ModelServerClient, RemoteWhisperModel, RemoteTranslator
+from network_ingest import get_server, parse_address
+from latency import ChunkTrace, LatencyTracker
+from metrics import REGISTRY
+from profiling import TRACER, install_signal_handlers
 import json
+import weakref
+
+STARTUP.mark("subtitle_stream imported")
+
+# Translators alive in this process, for scrape-time gauges
+_live_translators = weakref.WeakSet()
+
+CHUNKS_PROCESSED = REGISTRY.counter("translator_chunks_processed_total", "Audio chunks run through ASR")
+SILENT_CHUNKS = REGISTRY.counter("translator_silent_chunks_total", "Audio chunks skipped by the energy VAD")
+DROPPED_CHUNKS = REGISTRY.counter("translator_dropped_chunks_total", "Audio chunks dropped because the queue was full")
+CHUNK_PROCESSING_SECONDS = REGISTRY.histogram("translator_chunk_processing_seconds", "Time from ASR start to subtitle write")
+ASR_RTF = REGISTRY.histogram("translator_asr_rtf", "ASR seconds per second of audio",
+                             buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0))
+TRANSLATION_SECONDS = REGISTRY.histogram("translator_translation_seconds", "Translation call latency")
+WRITE_SECONDS = REGISTRY.histogram("translator_write_seconds", "Subtitle file write latency",
+                                   buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+CHUNK_DURATION_SECONDS = REGISTRY.gauge("translator_chunk_duration_seconds", "Current audio chunk length")
+QUEUE_DEPTH = REGISTRY.gauge("translator_queue_depth", "Audio chunks waiting for ASR",
+                             callback=lambda: sum(t.audio_queue.qsize() for t in list(_live_translators)))
+
+# Adaptive chunking: grow chunks above ADAPT_HIGH_RTF, shrink them below
+# ADAPT_LOW_RTF, by ADAPT_STEP at most once every ADAPT_COOLDOWN_CHUNKS chunks
+ADAPT_HIGH_RTF = 0.8
+ADAPT_LOW_RTF = 0.4
+ADAPT_STEP = 1.25
+ADAPT_COOLDOWN_CHUNKS = 3
+
+# Hot reconfiguration: these keys need a new ASR model, which is loaded in the
+# background and switched to at a chunk boundary
+MODEL_KEYS = ("whisper_model_size", "compute_type", "cpu_threads", "num_workers")
+# These are saved but only used by the next start_streaming
+RESTART_KEYS = ("sample_rate", "device_name", "input_channel", "native_capture", "downmix", "asr_workers", "model_server", "model_server_timeout", "max_queued_chunks",
+                "cpu_budget", "cpu_affinity", "isolate_audio", "pin_threads", "network_source", "jitter_delay",
+                "fingerprint_cache_size", "fingerprint_threshold", "fingerprint_max_shift",
+                "progressive_reveal", "reveal_hold",
+                "language_check_interval", "language_min_probability", "language_switch_checks",
+                "text_filter", "text_filter_history", "text_filter_similarity", "text_filter_blocklist",
+                "transcript_db", "transcript_session",
+                "archive_dir", "archive_format", "archive_segment_seconds", "archive_buffer_seconds")
+
+
+def get_default_config():
+    """Config written on first run; also gives the type each key must have"""
+    return {
+        "whisper_model_size": "tiny",
+        "chunk_duration": 5.0,
+        "sample_rate": 16000,
+        "device_name": "CABLE Output",
+        "subtitle_file": "subtitle.txt",
+        "enable_translation": True,
+        "enable_subtitles": True,
+        "subtitle_duration": 3.0,
+        "min_confidence": 0.5,
+        "language": "en",
+        "target_language": "fa",
+        "asr_workers": 0,
+        "model_server": "",
+        "model_server_timeout": 30.0,
+        "max_queued_chunks": 0,
+        "compute_type": "auto",
+        "adaptive_chunking": False,
+        "min_chunk_duration": 2.0,
+        "max_chunk_duration": 8.0,
+        "input_channel": 0,
+        "native_capture": True,
+        "downmix": False,
+        "vad_threshold": 0.0,
+        "network_source": "",
+        "jitter_delay": 0.3,
+        "fingerprint_cache_size": 0,
+        "fingerprint_threshold": 0.25,
+        "fingerprint_max_shift": 0.25,
+        "language_check_interval": 10,
+        "language_min_probability": 0.7,
+        "language_switch_checks": 2,
+        "text_filter": False,
+        "text_filter_history": 5,
+        "text_filter_similarity": 0.9,
+        "text_filter_blocklist": [],
+        "transcript_db": "",
+        "transcript_session": "",
+        "archive_dir": "",
+        "archive_format": "flac",
+        "archive_segment_seconds": 60.0,
+        "archive_buffer_seconds": 30.0,
+        "progressive_reveal": False,
+        "reveal_hold": 1.0,
+        "cpu_threads": 0,
+        "num_workers": 1,
+        "cpu_budget": 0,
+        "cpu_affinity": [],
+        "isolate_audio": True,
+        "pin_threads": False,
+        "model_dir": "models",
+        "offline": False
+    }
+
+
+def check_setting(key, value, defaults):
+    """Return ``(value, error)`` for a config change, typed like its default.
+
+    Whole floats are accepted for integer keys and integers for float keys;
+    booleans are never taken for numbers.
+    """
+    if key not in defaults:
+        return None, "unknown setting"
+    default = defaults[key]
+    if isinstance(default, bool):
+        if isinstance(value, bool):
+            return value, None
+        return None, "must be true or false"
+    if isinstance(default, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None, "must be a number"
+        if isinstance(default, int) and value != int(value):
+            return None, "must be a whole number"
+        return type(default)(value), None
+    if isinstance(value, type(default)):
+        return value, None
+    return None, "must be a list" if isinstance(default, list) else "must be a string"
+
 
 class RealtimeAudioTranslator:
     def __init__(self, 
                  whisper_model_size="tiny",
-                 chunk_duration=5.0,
+                 chunk_duration=None,
                  sample_rate=16000,
                  device_name="CABLE Output",
                  subtitle_file="subtitle.txt",
                  config_file="translation_config.json"):
         
         self.whisper_model_size = whisper_model_size
-        self.chunk_duration = chunk_duration
         self.sample_rate = sample_rate
         self.device_name = device_name
         self.subtitle_file = subtitle_file
         self.config_file = config_file
         
+        # Translation settings
+        self.load_config()
+        
         # Audio processing
-        self.audio_buffer = deque(maxlen=int(sample_rate * chunk_duration))
-        self.audio_queue = queue.Queue()
+        # None means the configured length; adaptive chunking moves it between
+        # min_chunk_duration and max_chunk_duration while streaming
+        self.chunk_duration = float(chunk_duration if chunk_duration is not None else self.config["chunk_duration"])
+        self.chunk_samples = int(sample_rate * self.chunk_duration)  # read by the audio callback
+        self.chunks_since_adapt = 0
+        self.input_channel = int(self.config.get("input_channel", 0))
+        self.resampler = None  # set when the device runs at another rate or is downmixed
+        self.network_source = None  # set while reading from a remote capture agent
+        # Preallocated so the callback only copies samples, never allocates per sample
+        self.audio_buffer = np.zeros(int(sample_rate * self.max_chunk_duration()) * 2, dtype=np.float32)
+        self.buffer_fill = 0
+        # (chunk, ChunkTrace) pairs; 0 means unbounded
+        self.audio_queue = queue.Queue(maxsize=int(self.config.get("max_queued_chunks", 0)))
+        self.chunk_capture_time = None
         self.is_recording = False
         
+        # CPU placement of the audio, io and asr stages
+        self.resources = ResourceManager.from_config(self.config)
+        self.pin_threads = bool(self.config.get("pin_threads"))
+        self.audio_thread_pinned = False
+        
         # Models
         self.asr_model = None
+        self.asr_pool = None
+        self.asr_scheduler = None  # set when a SharedASRScheduler decodes for us
+        self.model_provider = None  # SharedModels to take replacement models from
+        self.transcript_queue = queue.Queue()
         self.translator = None
         
-        # Translation settings
-        self.load_config()
+        # Hot reconfiguration
+        self.reconfig_lock = threading.Lock()
+        self.pending_asr = None  # (asr_model, asr_pool, config changes, persist) ready to switch to
+        self.model_generation = 0
+        self.swapping_keys = []  # model keys whose new model is still loading
+        self.model_swap_error = None  # why the last model swap failed, if it did
         
         # Performance tracking
         self.translation_count = 0
         self.last_translation_time = time.time()
+        self.asr_rtf = None  # smoothed ASR seconds per second of audio
+        self.latency = LatencyTracker()
+        self.pool_traces = {}  # ASR pool sequence number -> (ChunkTrace, audio seconds)
+        
+        # Repeated audio (jingles, ad reads) reuses an earlier transcript and translation
+        self.fingerprints = None
+        if self.config.get("fingerprint_cache_size"):
+            self.fingerprints = FingerprintCache(self.config["fingerprint_cache_size"],
+                                                 self.config.get("fingerprint_threshold", 0.25),
+                                                 self.config.get("fingerprint_max_shift", 0.25),
+                                                 sample_rate)
+        self.pool_fingerprints = {}  # ASR pool sequence number -> fingerprint
+        self.pool_cached = {}  # ASR pool sequence number -> cache hit waiting for its turn
+        
+        # language "auto": detect on some chunks and pin the result for the rest
+        self.language_tracker = LanguageTracker(
+            check_interval=self.config.get("language_check_interval", 10),
+            min_probability=self.config.get("language_min_probability", 0.7),
+            switch_checks=self.config.get("language_switch_checks", 2)
+        )
+        
+        # Hallucinated and repeated transcripts are dropped before translation
+        self.text_filter = None
+        if self.config.get("text_filter"):
+            self.text_filter = TextFilter(history=self.config.get("text_filter_history", 5),
+                                          similarity=self.config.get("text_filter_similarity", 0.9),
+                                          blocklist=self.config.get("text_filter_blocklist", []))
+        
+        # Every committed line goes to a searchable SQLite store
+        self.transcripts = open_store(self.config["transcript_db"]) if self.config.get("transcript_db") else None
+        
+        # Everything captured is kept on disk when archive_dir is set
+        self.recorder = None  # SessionRecorder while a session is being recorded
+        self.archive = None
+        if self.config.get("archive_dir"):
+            self.archive = AudioArchive(self.config["archive_dir"], sample_rate,
+                                        audio_format=self.config.get("archive_format", "flac"),
+                                        segment_seconds=self.config.get("archive_segment_seconds", 60.0),
+                                        buffer_seconds=self.config.get("archive_buffer_seconds", 30.0))
+        
+        # Word-by-word subtitles paced by the ASR word timestamps
+        self.reveal = None
+        if self.config.get("progressive_reveal"):
+            self.reveal = RevealScheduler(self.write_subtitle, hold=self.config.get("reveal_hold", 1.0))
+        _live_translators.add(self)
         
     def load_config(self):
         """Load configuration from file or create default"""
-        default_config = {
-            "whisper_model_size": "tiny",
-            "chunk_duration": 5.0,
-            "sample_rate": 16000,
-            "device_name": "CABLE Output",
-            "subtitle_file": "subtitle.txt",
-            "enable_translation": True,
-            "enable_subtitles": True,
-            "subtitle_duration": 3.0,
-            "min_confidence": 0.5,
-            "language": "en",
-            "target_language": "fa"
-        }
+        default_config = get_default_config()
         
         try:
             if os.path.exists(self.config_file):
@@ -85,17 +279,11 @@ class RealtimeAudioTranslator:
         """Initialize ASR and translation models"""
         print("Initializing models...")
         
-        # Initialize Whisper ASR
-        try:
-            print(f"Loading Whisper model: {self.whisper_model_size}")
-            self.asr_model = WhisperModel(
-                self.config["whisper_model_size"],
-                device="cuda" if torch.cuda.is_available() else "cpu",
-                compute_type="float16" if torch.cuda.is_available() else "float32"
-            )
-            print("Whisper model loaded successfully")
-        except Exception as e:
-            print(f"Error loading Whisper model: {e}")
+        if self.config.get("model_server"):
+            return self.connect_model_server(self.config["model_server"])
+        
+        self.asr_model, self.asr_pool = self.load_asr(self.config)
+        if self.asr_model is None and self.asr_pool is None:
             return False
         
         # Initialize translator
@@ -104,7 +292,9 @@ class RealtimeAudioTranslator:
             self.translator = Translator(
                 target_lang=self.config.get("target_language", "fa")
             )
-            if not self.translator.load_model():
+            with STARTUP.phase("load translator"):
+                loaded = self.translator.load_model()
+            if not loaded:
                 print("Failed to load translator")
                 return False
             print("Translator loaded successfully")
@@ -114,69 +304,372 @@ class RealtimeAudioTranslator:
         
         return True
     
-    def audio_callback(self, indata, frames, time, status):
+    def load_asr(self, config):
+        """Load the Whisper model, or start the worker pool, that ``config`` asks for.
+        
+        Returns ``(asr_model, asr_pool)`` with one of them set, or
+        ``(None, None)`` on failure.
+        """
+        with STARTUP.phase("device probe"):
+            device = detect_device()
+        compute_type = compute_type_for(config, device)
+        asr_workers = int(config.get("asr_workers", 0))
+        cpu_threads = int(config.get("cpu_threads", 0))
+        if not cpu_threads and (config.get("cpu_budget") or config.get("cpu_affinity")):
+            cpu_threads = self.resources.threads_for("asr", max(1, asr_workers))
+        if self.pin_threads:
+            # Threads CTranslate2 starts while loading inherit this affinity
+            self.resources.pin("asr")
+        try:
+            print(f"Loading Whisper model: {config['whisper_model_size']}")
+            if asr_workers > 0:
+                model_path = resolve_model(config, compute_type)
+                if model_path is None:
+                    return None, None
+                # Decode in separate processes so inference never competes
+                # with the audio callback for the GIL
+                asr_pool = ASRWorkerPool(
+                    model_path,
+                    num_workers=asr_workers,
+                    slot_samples=int(self.sample_rate * self.max_chunk_duration() * 2),
+                    device=device,
+                    compute_type=compute_type,
+                    transcribe_options=self.get_transcribe_options(config),
+                    cpu_threads=cpu_threads,
+                    cpu_affinity=self.resources.cores_for("asr") if self.pin_threads else None
+                )
+                with STARTUP.phase("start ASR worker pool"):
+                    started = asr_pool.start()
+                if not started:
+                    return None, None
+                print("Whisper model loaded successfully")
+                return None, asr_pool
+            asr_model = load_whisper(config, cpu_threads=cpu_threads)
+            if asr_model is None:
+                return None, None
+            print("Whisper model loaded successfully")
+            return asr_model, None
+        except Exception as e:
+            print(f"Error loading Whisper model: {e}")
+            return None, None
+    
+    def connect_model_server(self, socket_path):
+        """Use models hosted by a shared model server instead of loading them"""
+        try:
+            print(f"Connecting to model server: {socket_path}")
+            client = ModelServerClient(socket_path, timeout=self.config.get("model_server_timeout", 30.0))
+            self.asr_model = RemoteWhisperModel(client)
+            self.translator = RemoteTranslator(
+                client,
+                target_lang=self.config.get("target_language", "fa")
+            )
+            if not self.translator.load_model():
+                return False
+            print("Model server connected")
+        except Exception as e:
+            print(f"Error connecting to model server: {e}")
+            return False
+        
+        return True
+    
+    def audio_callback(self, indata, frames, time_info, status):
         """Audio callback for real-time processing"""
-        if status:
-            print(f"Audio status: {status}")
+        with TRACER.span("audio_callback", "audio"):
+            if status:
+                print(f"Audio status: {status}")
+            
+            if self.pin_threads and not self.audio_thread_pinned:
+                # PortAudio owns this thread, so it can only be pinned from here
+                self.resources.pin("audio")
+                self.audio_thread_pinned = True
         
-        # Convert to mono and normalize (optimized for real-time)
-        audio = np.copy(indata[:,0]) if indata.ndim > 1 else np.copy(indata)
-        audio = audio.astype(np.float32)
+            # The first sample of a chunk was captured one block before this call
+            if self.buffer_fill == 0:
+                self.chunk_capture_time = time.time() - frames / self.sample_rate
         
-        # Add to buffer
-        self.audio_buffer.extend(audio)
+            # Take our channel as mono; the copy into the buffer converts to float32
+            audio = indata[:, self.input_channel] if indata.ndim > 1 else indata.reshape(-1)
+            # Read once: stop() may clear it from another thread between the check and the call
+            recorder = self.recorder
+            if self.archive is not None or recorder is not None:
+                block_time = time.time() - frames / self.sample_rate
+                if self.archive is not None:
+                    # Only copies into a preallocated ring; the writer thread does the I/O
+                    self.archive.write(audio, block_time)
+                if recorder is not None:
+                    recorder.record_audio(audio, block_time)
         
-        # Check if we have enough audio for processing
-        if len(self.audio_buffer) >= self.sample_rate * self.chunk_duration:
-            # Get the chunk and clear buffer
-            chunk = np.array(list(self.audio_buffer))
-            self.audio_buffer.clear()
+            # Add to buffer
+            end = self.buffer_fill + len(audio)
+            if end > len(self.audio_buffer):
+                grown = np.zeros(end * 2, dtype=np.float32)
+                grown[:self.buffer_fill] = self.audio_buffer[:self.buffer_fill]
+                self.audio_buffer = grown
+            self.audio_buffer[self.buffer_fill:end] = audio
+            self.buffer_fill = end
+        
+            # Check if we have enough audio for processing
+            chunk_samples = self.chunk_samples
+            if self.buffer_fill >= chunk_samples:
+                # Get the chunk and keep any overshoot for the next one
+                chunk = self.audio_buffer[:chunk_samples].copy()
+                leftover = self.buffer_fill - chunk_samples
+                self.audio_buffer[:leftover] = self.audio_buffer[chunk_samples:self.buffer_fill]
+                self.buffer_fill = leftover
             
-            # Add to processing queue (non-blocking)
-            try:
-                self.audio_queue.put_nowait(chunk)
-            except queue.Full:
-                # Drop oldest chunk if queue is full
+                trace = ChunkTrace(self.chunk_capture_time)
+                trace.mark("enqueue")
+                if leftover:
+                    self.chunk_capture_time = time.time() - leftover / self.sample_rate
+            
+                # Energy gate: silence never reaches the ASR queue
+                vad_threshold = self.config.get("vad_threshold")
+                if vad_threshold and np.sqrt(np.dot(chunk, chunk) / len(chunk)) < vad_threshold:
+                    SILENT_CHUNKS.inc()
+                    return
+            
+                # Add to processing queue (non-blocking)
                 try:
-                    self.audio_queue.get_nowait()
-                    self.audio_queue.put_nowait(chunk)
-                except queue.Empty:
-                    pass
+                    self.audio_queue.put_nowait((chunk, trace))
+                except queue.Full:
+                    # Drop oldest chunk if queue is full
+                    DROPPED_CHUNKS.inc()
+                    try:
+                        self.audio_queue.get_nowait()
+                        self.audio_queue.put_nowait((chunk, trace))
+                    except queue.Empty:
+                        pass
     
-    def process_audio_chunk(self, audio_chunk):
+    def capture_format(self, device_index):
+        """Return the ``(sample rate, channels)`` to open the device with"""
+        if not self.config.get("native_capture", True):
+            return self.sample_rate, self.input_channel + 1
+        try:
+            info = sd.query_devices(device_index)
+            rate = int(info.get("default_samplerate") or self.sample_rate)
+            channels = int(info.get("max_input_channels") or 1)
+        except Exception:
+            return self.sample_rate, self.input_channel + 1
+        return rate, max(channels, self.input_channel + 1)
+    
+    def native_audio_callback(self, indata, frames, time_info, status):
+        """Downmix or pick our channel, resample, then run the normal callback"""
+        with TRACER.span("resample", "audio"):
+            if self.config.get("downmix") and indata.ndim > 1:
+                mono = indata.mean(axis=1)
+            else:
+                mono = indata[:, self.input_channel] if indata.ndim > 1 else indata
+            audio = self.resampler.process(mono)
+        self.audio_callback(audio, len(audio), time_info, status)
+    
+    def network_audio_callback(self, samples, sample_rate):
+        """Feed a frame from a capture agent, resampling if it runs at another rate"""
+        if sample_rate != self.sample_rate:
+            if self.resampler is None or self.resampler.in_rate != sample_rate:
+                self.resampler = StreamingResampler(sample_rate, self.sample_rate)
+            with TRACER.span("resample", "audio"):
+                samples = self.resampler.process(samples)
+        self.audio_callback(samples, len(samples), None, None)
+    
+    def get_transcribe_options(self, config=None):
+        """Decoding options shared by the in-process model and ASR workers"""
+        language = (config or self.config)["language"]
+        return {
+            # ASR workers get fixed options, so with "auto" they detect every chunk
+            "language": None if language == "auto" else language,
+            "beam_size": 5,
+            "best_of": 5,
+            "temperature": 0.0,
+            "compression_ratio_threshold": 2.4,
+            "log_prob_threshold": -1.0,
+            "no_speech_threshold": 0.6,
+            "condition_on_previous_text": False,
+            "initial_prompt": None
+        }
+    
+    def transcribe_chunk(self, audio_chunk, trace=None, words=None):
+        """Run speech recognition on a chunk and return the joined text
+        
+        If ``words`` is a list, ``(start, end, word)`` timestamps are
+        requested and appended to it.
+        """
+        if self.pending_asr is not None:
+            self.cut_over_asr()
+        options = self.get_transcribe_options()
+        if words is not None:
+            options["word_timestamps"] = True
+        detecting = self.config["language"] == "auto"
+        if detecting:
+            options["language"] = self.language_tracker.next_language()
+            detecting = options["language"] is None
+        start = time.time()
+        with TRACER.span("asr", "asr"):
+            segments, info = self.asr_model.transcribe(audio_chunk, **options)
+            if detecting and info is not None:
+                # Detected from the encoder output this chunk is decoded from
+                self.language_tracker.observe(info.language, getattr(info, "language_probability", None))
+            # Segments are decoded lazily, so the join is part of the ASR time
+            texts = []
+            recorder = self.recorder
+            recorded = [] if recorder is not None else None
+            for seg in segments:
+                seg_words = [(word.start, word.end, word.word) for word in getattr(seg, "words", None) or ()]
+                if seg.text.strip():
+                    texts.append(seg.text.strip())
+                    if words is not None:
+                        words.extend(seg_words)
+                if recorded is not None:
+                    recorded.append((seg.text, getattr(seg, "start", None), getattr(seg, "end", None), seg_words))
+            text = " ".join(texts)
+        end = time.time()
+        if recorded is not None:
+            recorder.record_asr(start, end, recorded, info)
+        self.update_asr_rtf(end - start, len(audio_chunk) / self.sample_rate)
+        if trace is not None:
+            trace.mark("asr_start", start)
+            trace.mark("asr_end", end)
+        return text
+    
+    def update_asr_rtf(self, asr_seconds, audio_seconds):
+        """Fold one chunk into the smoothed ASR real-time factor"""
+        CHUNKS_PROCESSED.inc()
+        if audio_seconds > 0:
+            rtf = asr_seconds / audio_seconds
+            ASR_RTF.observe(rtf)
+            self.asr_rtf = rtf if self.asr_rtf is None else 0.8 * self.asr_rtf + 0.2 * rtf
+        if self.config.get("adaptive_chunking"):
+            self.adapt_chunk_duration()
+    
+    def max_chunk_duration(self):
+        """Longest chunk the buffers must hold"""
+        if self.config.get("adaptive_chunking"):
+            return max(self.chunk_duration, float(self.config["max_chunk_duration"]))
+        return self.chunk_duration
+    
+    def adapt_chunk_duration(self):
+        """Trade latency for throughput from the measured ASR load.
+        
+        Whisper pays a fixed cost per chunk, so longer chunks lower the
+        real-time factor. Chunks grow while ASR is falling behind (high RTF or
+        a backlog) and shrink again while there is headroom. The smoothed RTF
+        needs a few chunks at the new length before it can be trusted, hence
+        the cooldown.
+        """
+        self.chunks_since_adapt += 1
+        if self.asr_rtf is None or self.chunks_since_adapt < ADAPT_COOLDOWN_CHUNKS:
+            return
+        backlog = self.audio_queue.qsize() + (self.asr_pool.pending() if self.asr_pool else 0)
+        shortest = float(self.config["min_chunk_duration"])
+        longest = float(self.config["max_chunk_duration"])
+        duration = self.chunk_duration
+        if self.asr_rtf > ADAPT_HIGH_RTF or backlog > 1:
+            duration = min(longest, duration * ADAPT_STEP)
+        elif self.asr_rtf < ADAPT_LOW_RTF and backlog == 0:
+            duration = max(shortest, duration / ADAPT_STEP)
+        if duration != self.chunk_duration:
+            print(f"Chunk duration {self.chunk_duration:.2f}s -> {duration:.2f}s "
+                  f"(ASR RTF {self.asr_rtf:.2f}, backlog {backlog})")
+            self.chunk_duration = duration
+            self.chunk_samples = int(self.sample_rate * duration)
+            self.chunks_since_adapt = 0
+        CHUNK_DURATION_SECONDS.set(self.chunk_duration)
+    
+    def process_audio_chunk(self, audio_chunk, trace=None):
         """Process audio chunk for speech recognition and translation"""
         try:
-            # Speech recognition
-            segments, info = self.asr_model.transcribe(
-                audio_chunk,
-                language=self.config["language"],
-                beam_size=5,
-                best_of=5,
-                temperature=0.0,
-                compression_ratio_threshold=2.4,
-                log_prob_threshold=-1.0,
-                no_speech_threshold=0.6,
-                condition_on_previous_text=False,
-                initial_prompt=None
-            )
-            
-            # Extract text from segments
-            text = " ".join([seg.text.strip() for seg in segments if seg.text.strip()])
-            
+            text, options = self.recognize_chunk(audio_chunk, trace)
+            return self.handle_transcript(text, trace, **options)
+        except Exception as e:
+            print(f"Error processing audio chunk: {e}")
+        
+        return None
+    
+    def recognize_chunk(self, audio_chunk, trace=None):
+        """Recognize a chunk, or find it in the fingerprint cache
+        
+        Returns ``(text, options)`` where ``options`` are the keyword
+        arguments for ``handle_transcript``, so a SharedASRScheduler can
+        decode on its own thread and leave the output to this one.
+        """
+        fingerprint = None
+        if self.fingerprints is not None:
+            fingerprint = self.fingerprints.fingerprint(audio_chunk)
+            entry = self.fingerprints.lookup(fingerprint)
+            if entry is not None:
+                return entry.text, {"cache_entry": entry}
+        
+        # Speech recognition
+        words = [] if self.reveal is not None else None
+        text = self.transcribe_chunk(audio_chunk, trace, words)
+        return text, {"fingerprint": fingerprint, "words": words,
+                      "audio_seconds": len(audio_chunk) / self.sample_rate}
+    
+    def handle_cached(self, entry, trace=None):
+        """Reuse a fingerprint cache hit, translating only for a new target language"""
+        return self.handle_transcript(entry.text, trace, cache_entry=entry)
+    
+    def handle_transcript(self, text, trace=None, translated_text=None, fingerprint=None, cache_entry=None,
+                          words=None, audio_seconds=None):
+        """Translate recognized text and write it out as a subtitle
+        
+        ``translated_text`` skips the translation call. With the fingerprint
+        cache on, ``fingerprint`` stores a new entry and ``cache_entry``
+        reuses an existing one's translation, or adds this target language
+        to it. ``words`` and ``audio_seconds`` pace the progressive reveal.
+        """
+        if translated_text is None and cache_entry is not None:
+            translated_text = cache_entry.translations.get(self.config["target_language"])
+        try:
             if text and len(text) > 3:  # Minimum text length
                 print(f"Recognized: {text}")
                 
+                if self.text_filter is not None:
+                    reason = self.text_filter.check(text)
+                    if reason is not None:
+                        print(f"Dropped ({reason}): {text}")
+                        return None
+                
                 # Translate if enabled
                 if self.config["enable_translation"]:
-                    translated_text = self.translator.translate_text(text)
+                    if translated_text is None:
+                        src = self.source_language()
+                        translate_start = time.time()
+                        with TRACER.span("translate", "translation"):
+                            translated_text = self.translator.translate_text(text, src=src)
+                        translate_end = time.time()
+                        recorder = self.recorder
+                        if recorder is not None:
+                            recorder.record_translation(translate_start, translate_end, text, src,
+                                                        self.config["target_language"], translated_text)
+                        TRANSLATION_SECONDS.observe(translate_end - translate_start)
+                        if trace is not None:
+                            trace.mark("translate_start", translate_start)
+                            trace.mark("translate_end", translate_end)
                     print(f"Translated: {translated_text}")
                     
+                    if self.fingerprints is not None:
+                        if cache_entry is None:
+                            cache_entry = self.fingerprints.add(fingerprint, text)
+                        if cache_entry is not None:
+                            cache_entry.translations[self.config["target_language"]] = translated_text
+                    
                     # Write subtitle if enabled
                     if self.config["enable_subtitles"]:
-                        self.write_subtitle(translated_text, text)  # Pass both languages
+                        if self.reveal is not None:
+                            self.reveal.show(translated_text, text, words, audio_seconds, trace)
+                        else:
+                            self.write_subtitle(translated_text, text, trace=trace)  # Pass both languages
+                    
+                    if self.transcripts is not None:
+                        # Stamped with the capture time so lines line up with the audio
+                        captured = trace.stamps.get("capture") if trace is not None else None
+                        self.transcripts.append(self.transcript_session(), text, translated_text,
+                                                self.source_language(), self.config["target_language"], captured)
                     
                     self.translation_count += 1
                     self.last_translation_time = time.time()
+                    if trace is not None:
+                        self.record_trace(trace)
                     
                     return translated_text
             
@@ -185,28 +678,78 @@ class RealtimeAudioTranslator:
         
         return None
     
-    def write_subtitle(self, translated_text, english_text=None):
-        """Write subtitle text to file for OBS"""
-        try:
-            # Create subtitle data with timing and both languages
-            subtitle_data = {
-                "text": translated_text,
-                "english": english_text if english_text else "",
-                "timestamp": time.time(),
-                "duration": self.config["subtitle_duration"]
-            }
+    def transcript_session(self):
+        """Session name for the transcript store; defaults to the subtitle file name"""
+        return (self.config.get("transcript_session")
+                or os.path.splitext(os.path.basename(self.subtitle_file))[0])
+    
+    def source_language(self):
+        """Language to translate from: the configured one, or the detected one for "auto" """
+        language = self.config["language"]
+        if language == "auto":
+            return self.language_tracker.language or "auto"
+        return language
+    
+    def record_trace(self, trace):
+        """Fold a finished trace into the latency percentiles and metrics"""
+        self.latency.record(trace)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record_trace(trace)
+        stamps = trace.stamps
+        if "asr_start" in stamps and "write" in stamps:
+            CHUNK_PROCESSING_SECONDS.observe(stamps["write"] - stamps["asr_start"])
+    
+    def drain_asr_pool(self):
+        """Handle transcripts the worker pool has finished, in capture order"""
+        for seq, text, error, asr_start, asr_end in self.asr_pool.get_ready():
+            trace, audio_seconds = self.pool_traces.pop(seq, (None, 0))
+            fingerprint = self.pool_fingerprints.pop(seq, None)
+            entry = self.pool_cached.pop(seq, None)
+            if entry is not None:
+                self.handle_cached(entry, trace)
+                continue
+            if error:
+                print(f"Error processing audio chunk: {error}")
+                continue
+            if asr_start is not None:
+                self.update_asr_rtf(asr_end - asr_start, audio_seconds)
+                if trace is not None:
+                    trace.mark("asr_start", asr_start)
+                    trace.mark("asr_end", asr_end)
+            self.handle_transcript(text, trace, fingerprint=fingerprint, audio_seconds=audio_seconds)
+    
+    def write_subtitle(self, translated_text, english_text=None, duration=None, trace=None):
+        """Write subtitle text to file for OBS; ``duration`` defaults to subtitle_duration"""
+        write_start = time.time()
+        with TRACER.span("write_subtitle", "writer"):
+            try:
+                # Create subtitle data with timing and both languages
+                subtitle_data = {
+                    "text": translated_text,
+                    "english": english_text if english_text else "",
+                    "timestamp": time.time(),
+                    "duration": duration if duration is not None else self.config["subtitle_duration"],
+                    "progressive": duration is not None
+                }
+            
+                # Write only translated text to TXT file (for OBS)
+                with open(self.subtitle_file, 'w', encoding='utf-8') as f:
+                    f.write(translated_text)
             
-            # Write only translated text to TXT file (for OBS)
-            with open(self.subtitle_file, 'w', encoding='utf-8') as f:
-                f.write(translated_text)
+                # The subtitle is on screen once the TXT file is written
+                if trace is not None:
+                    trace.mark("write")
+                    subtitle_data["trace"] = trace.to_dict()
             
-            # Write JSON format with both languages for monitoring
-            json_file = self.subtitle_file.replace('.txt', '.json')
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(subtitle_data, f, ensure_ascii=False, indent=2)
+                # Write JSON format with both languages for monitoring
+                json_file = self.subtitle_file.replace('.txt', '.json')
+                with open(json_file, 'w', encoding='utf-8') as f:
+                    json.dump(subtitle_data, f, ensure_ascii=False, indent=2)
                 
-        except Exception as e:
-            print(f"Error writing subtitle: {e}")
+            except Exception as e:
+                print(f"Error writing subtitle: {e}")
+        WRITE_SECONDS.observe(time.time() - write_start)
     
     def get_audio_devices(self):
         """List available audio devices"""
@@ -224,12 +767,276 @@ class RealtimeAudioTranslator:
                 return i
         return None
     
+    def attach_shared_models(self, asr_model, translator, asr_scheduler=None, model_provider=None):
+        """Use models owned by someone else instead of loading our own.
+
+        With a scheduler attached, chunks left in ``audio_queue`` are decoded
+        by the scheduler and only translation and output happen here. A
+        ``model_provider`` (SharedModels) supplies the replacement models when
+        the config changes.
+        """
+        self.asr_model = asr_model
+        self.translator = translator
+        self.asr_scheduler = asr_scheduler
+        self.model_provider = model_provider
+    
+    def apply_config(self, changes, persist=True):
+        """Apply config changes to a running translator without restarting it.
+        
+        Translation and output settings and the chunk length switch at once.
+        A new ASR model is loaded in the background and switched to between
+        chunks, so captions continue on the old model meanwhile; if that load
+        fails, ``get_stats()["model_swap"]`` says why. With ASR workers a new
+        ``language`` waits for a new pool the same way. Values must have the
+        type of their default in ``get_default_config()``; unknown keys and
+        mistyped values are not applied. Returns a dict listing keys that
+        were ``applied``, are ``pending`` a model load, need a ``restart``,
+        or had ``errors``.
+        """
+        result = {"applied": [], "pending": [], "restart": [], "errors": {}}
+        defaults = get_default_config()
+        with self.reconfig_lock:
+            changes = {key: value for key, value in changes.items() if self.config.get(key) != value}
+            for key in list(changes):
+                changes[key], error = check_setting(key, changes[key], defaults)
+                if error:
+                    result["errors"][key] = error
+                    del changes[key]
+            new_config = dict(self.config)
+            
+            translator = None
+            if "target_language" in changes and self.translator is not None:
+                translator = self.build_translator(changes["target_language"])
+                if translator is None:
+                    result["errors"]["target_language"] = "translator failed to load"
+                    del changes["target_language"]
+            
+            duration = None
+            if "chunk_duration" in changes:
+                duration = changes["chunk_duration"]
+                if duration <= 0:
+                    result["errors"]["chunk_duration"] = "must be a positive number"
+                    del changes["chunk_duration"]
+                    duration = None
+            
+            chunk_keys = [key for key in ("chunk_duration", "max_chunk_duration", "adaptive_chunking") if key in changes]
+            if chunk_keys:
+                error = self.check_pool_slots(dict(new_config, **{key: changes[key] for key in chunk_keys}),
+                                              duration if duration is not None else self.chunk_duration)
+                if error:
+                    for key in chunk_keys:
+                        result["errors"][key] = error
+                        del changes[key]
+                    duration = None
+            
+            model_changes = {key: changes.pop(key) for key in MODEL_KEYS if key in changes}
+            if self.asr_pool is not None and "language" in changes:
+                # Workers got their decoding options when they started, so a
+                # new language needs a new pool
+                model_changes["language"] = changes.pop("language")
+            for key, value in changes.items():
+                new_config[key] = value
+                result["restart" if key in RESTART_KEYS else "applied"].append(key)
+            
+            # Everything that needs no model load switches in one step
+            if translator is not None:
+                self.translator = translator
+            if duration is not None:
+                if duration != self.chunk_duration:
+                    # Percentiles measured on chunks of the old length would mix in
+                    self.latency.reset()
+                self.chunk_duration = duration
+                self.chunk_samples = int(self.sample_rate * duration)
+            self.config = new_config
+            if "language" in changes:
+                self.reset_language_state()
+            
+            if model_changes:
+                if self.asr_model is None and self.asr_pool is None:
+                    # Not started yet; initialize_models picks the keys up
+                    self.config = dict(self.config, **model_changes)
+                    self.whisper_model_size = self.config["whisper_model_size"]
+                    result["applied"].extend(model_changes)
+                elif self.config.get("model_server"):
+                    for key in model_changes:
+                        result["errors"][key] = "models are owned by the model server"
+                else:
+                    if self.model_provider is not None:
+                        # Shared models run with the session manager's thread budget
+                        for key in ("cpu_threads", "num_workers"):
+                            if key in model_changes:
+                                del model_changes[key]
+                                result["errors"][key] = "set by the shared CPU budget"
+                    if model_changes:
+                        self.model_generation += 1
+                        self.swapping_keys = list(model_changes)
+                        self.model_swap_error = None
+                        threading.Thread(target=self.prepare_asr_swap,
+                                         args=(model_changes, self.model_generation, persist),
+                                         daemon=True).start()
+                        result["pending"].extend(model_changes)
+            
+            if persist:
+                self.save_config()
+        return result
+    
+    def reset_language_state(self):
+        """Forget what was learned about the old source language"""
+        self.language_tracker.reset()
+        if self.text_filter is not None:
+            self.text_filter.reset()
+        if self.fingerprints is not None:
+            self.fingerprints.clear()  # cached transcripts are in the old language
+    
+    def check_pool_slots(self, config, chunk_duration):
+        """Return why chunks under ``config`` would not fit the ASR pool, or None.
+
+        The pool's shared-memory slots are sized when it starts, so longer
+        chunks need a restart.
+        """
+        if self.asr_pool is None:
+            return None
+        longest = chunk_duration
+        if config.get("adaptive_chunking"):
+            try:
+                longest = max(longest, float(config["max_chunk_duration"]))
+            except (TypeError, ValueError):
+                return "max_chunk_duration must be a number"
+        pools = [self.asr_pool] + ([self.pending_asr[1]] if self.pending_asr and self.pending_asr[1] else [])
+        slot_seconds = min(pool.slot_samples for pool in pools) / self.sample_rate
+        if longest > slot_seconds:
+            return (f"chunks up to {longest:.1f}s do not fit the ASR worker pool's "
+                    f"{slot_seconds:.1f}s slots; restart to use them")
+        return None
+    
+    def build_translator(self, target_lang):
+        """Create a loaded translator for another target language, or None"""
+        if self.model_provider is not None:
+            return self.model_provider.get_translator(target_lang)
+        if isinstance(self.translator, RemoteTranslator):
+            translator = RemoteTranslator(self.translator.client, target_lang=target_lang)
+        else:
+            translator = Translator(target_lang=target_lang)
+        return translator if translator.load_model() else None
+    
+    def prepare_asr_swap(self, model_changes, generation, persist):
+        """Load the model for ``model_changes`` and queue it for cut-over"""
+        config = dict(self.config, **model_changes)
+        error = "model failed to load"
+        try:
+            if self.model_provider is not None:
+                asr_model, asr_pool = self.model_provider.get_asr_model(config["whisper_model_size"], config), None
+            else:
+                asr_model, asr_pool = self.load_asr(config)
+        except Exception as e:
+            asr_model, asr_pool, error = None, None, str(e)
+        if asr_model is None and asr_pool is None:
+            print(f"Model swap failed ({error}); keeping the current model")
+            if generation == self.model_generation:
+                self.swapping_keys = []
+                self.model_swap_error = error
+            return
+        if generation != self.model_generation:
+            # A newer change superseded this one while it loaded
+            if asr_pool is not None:
+                asr_pool.stop()
+            return
+        self.pending_asr = (asr_model, asr_pool, model_changes, persist)
+        self.swapping_keys = []
+    
+    def cut_over_asr(self):
+        """Switch to the model prepared by ``prepare_asr_swap``; call between chunks"""
+        pending, self.pending_asr = self.pending_asr, None
+        if pending is None:
+            return
+        asr_model, asr_pool, model_changes, persist = pending
+        if asr_pool is not None:
+            old_pool = self.asr_pool
+            # Finish the old pool's chunks first so subtitles stay in order
+            # and sequence numbers do not collide
+            while old_pool is not None and old_pool.pending():
+                self.drain_asr_pool()
+                time.sleep(0.01)
+            self.asr_pool = asr_pool
+            if old_pool is not None:
+                threading.Thread(target=old_pool.stop, daemon=True).start()
+        else:
+            self.asr_model = asr_model
+        with self.reconfig_lock:
+            self.config = dict(self.config, **model_changes)
+            self.whisper_model_size = self.config["whisper_model_size"]
+            if "language" in model_changes:
+                self.reset_language_state()
+            if persist:
+                self.save_config()
+        print(f"Switched ASR model: {', '.join(f'{k}={v}' for k, v in model_changes.items())}")
+    
+    def run_processing_loop(self):
+        """Process queued audio until recording stops"""
+        if self.pin_threads:
+            # Decoding happens elsewhere in pool and scheduler mode
+            self.resources.pin("io" if self.asr_pool or self.asr_scheduler else "asr")
+        if self.archive is not None:
+            self.archive.session = self.transcript_session()
+            self.archive.start()
+        while self.is_recording:
+            try:
+                if self.asr_scheduler:
+                    text, trace, options = self.transcript_queue.get(timeout=1.0)
+                    self.handle_transcript(text, trace, **options)
+                elif self.asr_pool:
+                    # Poll often so finished transcripts are not held back
+                    self.drain_asr_pool()
+                    audio_chunk, trace = self.audio_queue.get(timeout=0.1)
+                    fingerprint = None
+                    if self.fingerprints is not None:
+                        fingerprint = self.fingerprints.fingerprint(audio_chunk)
+                        entry = self.fingerprints.lookup(fingerprint)
+                        if entry is not None:
+                            # Output it in its turn, after chunks still decoding
+                            seq = self.asr_pool.skip()
+                            self.pool_traces[seq] = (trace, len(audio_chunk) / self.sample_rate)
+                            self.pool_cached[seq] = entry
+                            continue
+                    if self.pending_asr is not None:
+                        self.cut_over_asr()
+                    seq = self.asr_pool.submit(audio_chunk)
+                    self.pool_traces[seq] = (trace, len(audio_chunk) / self.sample_rate)
+                    if fingerprint is not None:
+                        self.pool_fingerprints[seq] = fingerprint
+                else:
+                    # Get audio chunk from queue (non-blocking)
+                    audio_chunk, trace = self.audio_queue.get(timeout=1.0)
+                    self.process_audio_chunk(audio_chunk, trace)
+            except queue.Empty:
+                continue
+            except KeyboardInterrupt:
+                print("\nStopping audio stream...")
+                break
+            except Exception as e:
+                print(f"Error in processing loop: {e}")
+        
+        if self.asr_pool:
+            # Hand over transcripts still in flight when recording stopped
+            deadline = time.time() + 10.0
+            while self.asr_pool.pending() and time.time() < deadline:
+                self.drain_asr_pool()
+                time.sleep(0.05)
+        
+        if self.archive is not None:
+            self.archive.stop()
+        if self.transcripts is not None:
+            self.transcripts.flush()
+    
     def start_streaming(self):
         """Start the real-time audio translation stream"""
-        if not self.initialize_models():
+        if self.asr_model is None and not self.initialize_models():
             print("Failed to initialize models")
             return
         
+        if self.config.get("network_source"):
+            return self.stream_from_network(self.config["network_source"])
+        
         # Find audio device
         device_index = self.find_device_index(self.device_name)
         if device_index is None:
@@ -239,17 +1046,31 @@ class RealtimeAudioTranslator:
         
         print(f"Using audio device: {self.device_name} (index: {device_index})")
         
+        # Open the device as it natively runs and convert here rather than
+        # leaving resampling to the driver
+        capture_rate, capture_channels = self.capture_format(device_index)
+        callback = self.audio_callback
+        self.resampler = None
+        if capture_rate != self.sample_rate or self.config.get("downmix"):
+            self.resampler = StreamingResampler(capture_rate, self.sample_rate)
+            callback = self.native_audio_callback
+            print(f"Capturing {capture_channels} channel(s) at {capture_rate} Hz, "
+                  f"resampling to {self.sample_rate} Hz")
+        
         # Set up audio stream with optimized settings
+        self.audio_thread_pinned = False  # a new stream gets a new callback thread
         try:
             with sd.InputStream(
                 device=device_index,
-                channels=1,
-                samplerate=self.sample_rate,
-                callback=self.audio_callback,
+                channels=capture_channels,
+                samplerate=capture_rate,
+                callback=callback,
                 dtype=np.float32,
-                blocksize=int(self.sample_rate * 0.1),  # 100ms blocks for lower latency
+                blocksize=int(capture_rate * 0.1),  # 100ms blocks for lower latency
                 latency='low'
             ):
+                STARTUP.mark("audio stream open")
+                STARTUP.report()
                 print(f"Started listening on {self.device_name}")
                 print("Press Ctrl+C to stop")
                 print("-" * 50)
@@ -257,25 +1078,51 @@ class RealtimeAudioTranslator:
                 self.is_recording = True
                 
                 # Process audio chunks in background
-                while self.is_recording:
-                    try:
-                        # Get audio chunk from queue (non-blocking)
-                        audio_chunk = self.audio_queue.get(timeout=1.0)
-                        self.process_audio_chunk(audio_chunk)
-                    except queue.Empty:
-                        continue
-                    except KeyboardInterrupt:
-                        print("\nStopping audio stream...")
-                        break
-                    except Exception as e:
-                        print(f"Error in processing loop: {e}")
+                self.run_processing_loop()
                         
         except Exception as e:
             print(f"Error starting audio stream: {e}")
+        finally:
+            if self.asr_pool:
+                self.asr_pool.stop()
+                self.asr_pool = None
+    
+    def stream_from_network(self, address):
+        """Caption audio sent by a capture agent; ``address`` is host:port/stream"""
+        host, port, stream = parse_address(address)
+        if not stream:
+            print(f"Network source '{address}' has no stream name (expected host:port/stream)")
+            return
+        try:
+            server = get_server(host, port)
+            self.network_source = server.open_source(stream, self.network_audio_callback,
+                                                     jitter_delay=self.config.get("jitter_delay", 0.3))
+        except (OSError, ValueError) as e:
+            print(f"Error starting network ingest: {e}")
+            return
+        
+        self.resampler = None
+        self.audio_thread_pinned = False
+        STARTUP.mark("network ingest open")
+        STARTUP.report()
+        print(f"Waiting for capture agent on {host}:{server.port}/{stream}")
+        print("Press Ctrl+C to stop")
+        print("-" * 50)
+        try:
+            self.is_recording = True
+            self.run_processing_loop()
+        finally:
+            server.close_source(stream)
+            if self.asr_pool:
+                self.asr_pool.stop()
+                self.asr_pool = None
     
     def stop_streaming(self):
         """Stop the audio stream"""
         self.is_recording = False
+        if self.transcripts is not None:
+            # Lines still queued are committed before we report stopped
+            self.transcripts.flush()
         print("Audio stream stopped")
     
     def get_stats(self):
@@ -285,7 +1132,22 @@ class RealtimeAudioTranslator:
         return {
             "translation_count": self.translation_count,
             "last_translation": elapsed,
-            "is_recording": self.is_recording
+            "is_recording": self.is_recording,
+            "asr_rtf": self.asr_rtf,
+            "queue_depth": self.audio_queue.qsize(),
+            "chunk_duration": self.chunk_duration,
+            "model_swap": {"pending": list(self.swapping_keys), "error": self.model_swap_error},
+            "latency": self.latency.get_percentiles(),
+            "cpu_allocation": self.resources.describe(),
+            "resampler": self.resampler.get_stats() if self.resampler else None,
+            "network_source": self.network_source.get_stats() if self.network_source else None,
+            "fingerprint_cache": self.fingerprints.get_stats() if self.fingerprints else None,
+            "reveal": self.reveal.get_stats() if self.reveal else None,
+            "text_filter": self.text_filter.get_stats() if self.text_filter else None,
+            "transcripts": self.transcripts.get_stats() if self.transcripts else None,
+            "archive": self.archive.get_stats() if self.archive else None,
+            "source_language": self.source_language(),
+            "language_detection": self.language_tracker.get_stats() if self.config["language"] == "auto" else None
         }
 
 def create_web_control_interface():
@@ -317,6 +1179,22 @@ def create_web_control_interface():
             return "Translation stopped"
         return "No active translation"
     
+    def apply_changes(whisper_model, chunk_duration, target_language):
+        global translator_instance
+        if translator_instance:
+            result = translator_instance.apply_config({
+                "whisper_model_size": whisper_model,
+                "chunk_duration": float(chunk_duration),
+                "target_language": target_language
+            })
+            message = f"Applied: {', '.join(result['applied']) or 'nothing'}"
+            if result["pending"]:
+                message += f"; loading in background: {', '.join(result['pending'])}"
+            if result["errors"]:
+                message += f"; errors: {result['errors']}"
+            return message
+        return "No active translation"
+    
     def get_stats():
         global translator_instance
         if translator_instance:
@@ -347,9 +1225,14 @@ def create_web_control_interface():
                     value="CABLE Output",
                     label="Audio Device Name"
                 )
+                target_language = gr.Textbox(
+                    value="fa",
+                    label="Target Language"
+                )
                 
                 start_btn = gr.Button("Start Translation", variant="primary")
                 stop_btn = gr.Button("Stop Translation", variant="secondary")
+                apply_btn = gr.Button("Apply Changes Live")
                 
             with gr.Column():
                 status_output = gr.Textbox(label="Status", interactive=False)
@@ -368,6 +1251,12 @@ def create_web_control_interface():
             outputs=status_output
         )
         
+        apply_btn.click(
+            fn=apply_changes,
+            inputs=[whisper_model, chunk_duration, target_language],
+            outputs=status_output
+        )
+        
         interface.load(fn=get_stats, outputs=stats_output, every=2)
     
     return interface
@@ -378,15 +1267,27 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Real-time Audio Translator")
     parser.add_argument("--web", action="store_true", help="Launch web control interface")
     parser.add_argument("--whisper-model", default="tiny", choices=["tiny", "base", "small", "medium"], help="Whisper model size")
-    parser.add_argument("--chunk-duration", type=float, default=5.0, help="Audio chunk duration in seconds")
+    parser.add_argument("--chunk-duration", type=float, default=None, help="Audio chunk duration in seconds (default: from translation_config.json)")
     parser.add_argument("--device", default="CABLE Output", help="Audio device name")
     parser.add_argument("--list-devices", action="store_true", help="List available audio devices")
+    parser.add_argument("--trace", metavar="FILE", help="Record a Chrome trace of the pipeline threads and write it to FILE on exit")
+    parser.add_argument("--profile-seconds", type=float, default=10.0, help="Length of the sampling profile taken on SIGUSR1 (SIGUSR2 toggles tracing)")
+    parser.add_argument("--profile-startup", action="store_true", help="Print how long imports, model loads and opening the audio device took")
+    parser.add_argument("--watch-config", action="store_true", help="Apply edits to translation_config.json while streaming")
+    parser.add_argument("--record", metavar="DIR", help="Record audio, ASR and translation results with timings to DIR for replay")
+    parser.add_argument("--network-source", metavar="HOST:PORT/STREAM", help="Caption audio from a remote capture agent instead of a local device")
     
     args = parser.parse_args()
+    STARTUP.enabled = args.profile_startup
+    
+    install_signal_handlers(profile_seconds=args.profile_seconds)
+    if args.trace:
+        TRACER.start()
     
     if args.list_devices:
         translator = RealtimeAudioTranslator()
         translator.get_audio_devices()
+        STARTUP.report()
     elif args.web:
         interface = create_web_control_interface()
         interface.launch(
@@ -403,4 +1304,24 @@ if __name__ == "__main__":
             chunk_duration=args.chunk_duration,
             device_name=args.device
         )
-        translator.start_streaming()
+        if args.network_source:
+            translator.config["network_source"] = args.network_source
+        recorder = None
+        if args.record:
+            from session_recorder import SessionRecorder
+            recorder = SessionRecorder(args.record, translator)
+            recorder.start()
+        watcher = None
+        if args.watch_config:
+            from config_watcher import ConfigWatcher
+            watcher = ConfigWatcher(translator)
+            watcher.start()
+        try:
+            translator.start_streaming()
+        finally:
+            if watcher:
+                watcher.stop()
+            if recorder:
+                recorder.stop()
+            if args.trace:
+                TRACER.stop(args.trace)
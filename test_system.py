@@ -10,7 +10,7 @@ import time
 import json
 from pathlib import Path
 
-def test_imports():
+def check_imports():
     """Test if all required modules can be imported"""
     print("🔍 Testing imports...")
     
@@ -58,7 +58,7 @@ def test_imports():
     
     return True
 
-def test_audio_devices():
+def check_audio_devices():
     """Test audio device detection"""
     print("\n🎙️ Testing audio devices...")
     
@@ -85,7 +85,7 @@ def test_audio_devices():
         print(f"❌ Audio device test failed: {e}")
         return False
 
-def test_translator():
+def check_translator():
     """Test the translator"""
     print("\n🌐 Testing translator...")
     
@@ -113,7 +113,7 @@ def test_translator():
         print(f"❌ Translator test failed: {e}")
         return False
 
-def test_whisper_model():
+def check_whisper_model():
     """Test Whisper speech recognition"""
     print("\n🎤 Testing Whisper model...")
     
@@ -130,7 +130,7 @@ def test_whisper_model():
         print(f"❌ Whisper model test failed: {e}")
         return False
 
-def test_file_permissions():
+def check_file_permissions():
     """Test file write permissions for subtitle files"""
     print("\n📁 Testing file permissions...")
     
@@ -154,7 +154,7 @@ def test_file_permissions():
     
     return True
 
-def test_obs_integration():
+def check_obs_integration():
     """Test OBS integration script"""
     print("\n🎬 Testing OBS integration...")
     
@@ -179,7 +179,7 @@ def test_obs_integration():
         print(f"❌ OBS integration test failed: {e}")
         return False
 
-def test_web_interface():
+def check_web_interface():
     """Test web interface components"""
     print("\n🌐 Testing web interface...")
     
@@ -225,13 +225,13 @@ def run_comprehensive_test():
     print("=" * 50)
     
     tests = [
-        ("Imports", test_imports),
-        ("Audio Devices", test_audio_devices),
-        ("Translator", test_translator),
-        ("Whisper Model", test_whisper_model),
-        ("File Permissions", test_file_permissions),
-        ("OBS Integration", test_obs_integration),
-        ("Web Interface", test_web_interface),
+        ("Imports", check_imports),
+        ("Audio Devices", check_audio_devices),
+        ("Translator", check_translator),
+        ("Whisper Model", check_whisper_model),
+        ("File Permissions", check_file_permissions),
+        ("OBS Integration", check_obs_integration),
+        ("Web Interface", check_web_interface),
         ("Configuration", create_test_config)
     ]
     
@@ -276,6 +276,1391 @@ def run_comprehensive_test():
     
     return passed == total
 
+# ---------------------------------------------------------------------------
+# Performance regression gate (run with: python -m pytest test_system.py)
+#
+# These tests drive the pipeline with a fake sounddevice, a simulated clock
+# and stub ASR/translation, so they need no audio hardware, models or
+# network, and fail when the hot path gets slower than its budget.
+# ---------------------------------------------------------------------------
+
+# Budgets for one 100 ms block at 16 kHz and one 3 s chunk
+CALLBACK_MEAN_BUDGET = 0.0005      # seconds per block, averaged
+CALLBACK_MAX_BUDGET = 0.005        # seconds for the slowest block (chunk boundary)
+CHUNK_OVERHEAD_BUDGET = 0.02       # real seconds spent outside ASR/translation per chunk
+QUEUE_TO_WRITE_BUDGET = 1.5        # simulated seconds from enqueue to subtitle write
+RETAINED_BLOCKS_BUDGET = 40        # allocations still alive after one chunk is queued
+TRANSIENT_MEMORY_FACTOR = 3.0      # peak extra memory per chunk, in chunk sizes
+
+SAMPLE_RATE = 16000
+BLOCK = 1600
+CHUNK_DURATION = 3.0
+
+
+class FakeClock:
+    """Stands in for the time module; only moves when told to"""
+
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeInputStream:
+    """sounddevice.InputStream that records the callback instead of opening a device"""
+
+    instances = []
+
+    def __init__(self, device=None, channels=1, samplerate=16000, callback=None, **kwargs):
+        self.device = device
+        self.channels = channels
+        self.samplerate = samplerate
+        self.callback = callback
+        FakeInputStream.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def feed(self, block):
+        self.callback(block.reshape(-1, self.channels), len(block), None, None)
+
+
+class FakeSoundDevice:
+    InputStream = FakeInputStream
+
+    @staticmethod
+    def query_devices():
+        return [{"name": "CABLE Output", "max_input_channels": 1, "max_output_channels": 0}]
+
+
+class NativeSoundDevice(FakeSoundDevice):
+    """A stereo device that runs at 48 kHz"""
+
+    @staticmethod
+    def query_devices(index=None):
+        device = {"name": "CABLE Output", "max_input_channels": 2, "default_samplerate": 48000.0}
+        return device if index is not None else [device]
+
+
+class _Segment:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubWhisperModel:
+    """ASR stub whose cost is charged to the simulated clock"""
+
+    def __init__(self, clock=None, rtf=0.2, text="hello from the stub model"):
+        self.clock = clock
+        self.rtf = rtf
+        self.text = text
+
+    def transcribe(self, audio, **options):
+        if self.clock is not None:
+            self.clock.advance(len(audio) / SAMPLE_RATE * self.rtf)
+        return iter([_Segment(self.text)]), None
+
+
+class CrashingWhisperModel:
+    """Worker-side ASR stub: a chunk starting with a negative sample kills the process"""
+
+    def transcribe(self, audio, **options):
+        if audio[0] < 0:
+            # Crash partway through a decode, after earlier results were sent
+            time.sleep(0.2)
+            os._exit(3)
+        return iter([_Segment(f"chunk {int(audio[0])}")]), None
+
+
+def load_crashing_model(model_size, device, compute_type, cpu_threads):
+    return CrashingWhisperModel()
+
+
+class StubTranslator:
+    def __init__(self, clock=None, latency=0.2):
+        self.clock = clock
+        self.latency = latency
+        self.model = self
+
+    def translate_text(self, text, src="en"):
+        if self.clock is not None:
+            self.clock.advance(self.latency)
+        return text.upper()
+
+
+def _import_pipeline():
+    """Import subtitle_stream, stubbing heavy dependencies that are not installed"""
+    import importlib
+    import types
+
+    # Model libraries are imported lazily, so only the audio backend is needed
+    stubs = {
+        "sounddevice": {"query_devices": FakeSoundDevice.query_devices, "InputStream": FakeInputStream},
+    }
+    for name, attributes in stubs.items():
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            module = types.ModuleType(name)
+            module.__dict__.update(attributes)
+            sys.modules[name] = module
+    import subtitle_stream
+    return subtitle_stream
+
+
+def _make_translator(tmp_path, clock=None):
+    subtitle_stream = _import_pipeline()
+    translator = subtitle_stream.RealtimeAudioTranslator(
+        chunk_duration=CHUNK_DURATION,
+        subtitle_file=str(tmp_path / "subtitle.txt"),
+        config_file=str(tmp_path / "translation_config.json")
+    )
+    translator.attach_shared_models(StubWhisperModel(clock), StubTranslator(clock))
+    return translator
+
+
+def _blocks(seconds, channels=1):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal((int(seconds * SAMPLE_RATE), channels)) * 0.1).astype(np.float32)
+    return [audio[i:i + BLOCK] for i in range(0, len(audio) - BLOCK + 1, BLOCK)]
+
+
+def test_import_skips_heavy_dependencies():
+    import subprocess
+    import textwrap
+
+    code = textwrap.dedent("""
+        import sys, types
+        sys.modules["sounddevice"] = types.ModuleType("sounddevice")
+        import subtitle_stream, translator
+        heavy = ["torch", "faster_whisper", "ctranslate2", "gradio", "googletrans"]
+        print(",".join(name for name in heavy if name in sys.modules))
+    """)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_callback_time_per_block(tmp_path):
+    translator = _make_translator(tmp_path)
+    blocks = _blocks(CHUNK_DURATION * 4)
+    timings = []
+    for block in blocks:
+        start = time.perf_counter()
+        translator.audio_callback(block, BLOCK, None, None)
+        timings.append(time.perf_counter() - start)
+
+    assert translator.audio_queue.qsize() == 4
+    assert sum(timings) / len(timings) < CALLBACK_MEAN_BUDGET
+    assert max(timings) < CALLBACK_MAX_BUDGET
+
+
+def test_callback_allocations_per_chunk(tmp_path):
+    import tracemalloc
+
+    translator = _make_translator(tmp_path)
+    blocks = _blocks(CHUNK_DURATION)
+    translator.audio_callback(blocks[0], BLOCK, None, None)  # warm up lazy state
+    translator.buffer_fill = 0
+    chunk_bytes = int(SAMPLE_RATE * CHUNK_DURATION) * 4
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        for block in blocks:
+            translator.audio_callback(block, BLOCK, None, None)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    retained = sum(max(0, stat.count_diff) for stat in after.compare_to(before, "lineno"))
+    assert translator.audio_queue.qsize() == 1
+    assert retained < RETAINED_BLOCKS_BUDGET
+    assert peak - baseline < TRANSIENT_MEMORY_FACTOR * chunk_bytes
+
+
+def test_queue_to_write_latency(tmp_path, monkeypatch):
+    import latency
+    subtitle_stream = _import_pipeline()
+    clock = FakeClock()
+    monkeypatch.setattr(subtitle_stream, "time", clock)
+    monkeypatch.setattr(latency, "time", clock)
+
+    translator = _make_translator(tmp_path, clock)
+    for block in _blocks(CHUNK_DURATION):
+        clock.advance(BLOCK / SAMPLE_RATE)
+        translator.audio_callback(block, BLOCK, None, None)
+
+    chunk, trace = translator.audio_queue.get_nowait()
+    overhead_start = time.perf_counter()
+    result = translator.process_audio_chunk(chunk, trace)
+    real_seconds = time.perf_counter() - overhead_start
+
+    assert result == "HELLO FROM THE STUB MODEL"
+    queue_to_write = trace.stamps["write"] - trace.stamps["enqueue"]
+    # ASR at RTF 0.2 on 3 s plus 0.2 s translation; anything more is pipeline overhead
+    assert abs(queue_to_write - (CHUNK_DURATION * 0.2 + 0.2)) < 1e-6
+    assert queue_to_write < QUEUE_TO_WRITE_BUDGET
+    assert real_seconds < CHUNK_OVERHEAD_BUDGET
+
+    with open(tmp_path / "subtitle.json", encoding="utf-8") as f:
+        assert json.load(f)["trace"]["durations"]["total"] > 0
+
+
+def test_streaming_with_fake_device(tmp_path, monkeypatch):
+    import threading
+    subtitle_stream = _import_pipeline()
+    monkeypatch.setattr(subtitle_stream, "sd", FakeSoundDevice)
+    FakeInputStream.instances = []
+
+    translator = _make_translator(tmp_path)
+    thread = threading.Thread(target=translator.start_streaming, daemon=True)
+    thread.start()
+    deadline = time.time() + 5.0
+    while not FakeInputStream.instances and time.time() < deadline:
+        time.sleep(0.01)
+
+    for block in _blocks(CHUNK_DURATION * 2):
+        FakeInputStream.instances[0].feed(block)
+    while translator.translation_count < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    translator.stop_streaming()
+    thread.join(timeout=5.0)
+
+    assert translator.translation_count == 2
+    assert (tmp_path / "subtitle.txt").read_text(encoding="utf-8") == "HELLO FROM THE STUB MODEL"
+    assert translator.get_stats()["latency"]["total"]["count"] == 2
+
+
+def test_native_rate_capture_resamples_in_blocks(tmp_path, monkeypatch):
+    import threading
+    import numpy as np
+    from scipy.signal import upfirdn
+    from resampler import StreamingResampler
+
+    # Block-wise output matches filtering the whole signal at once
+    resampler = StreamingResampler(44100, SAMPLE_RATE)
+    signal = np.random.default_rng(1).standard_normal(44100).astype(np.float32)
+    streamed = np.concatenate([resampler.process(signal[i:i + 4410]) for i in range(0, 44100, 4410)])
+    taps = resampler.phases[:, ::-1].T.reshape(-1)
+    np.testing.assert_allclose(streamed, upfirdn(taps, signal, resampler.up, resampler.down)[:len(streamed)],
+                               atol=1e-5)
+    assert len(streamed) == SAMPLE_RATE
+
+    subtitle_stream = _import_pipeline()
+    monkeypatch.setattr(subtitle_stream, "sd", NativeSoundDevice)
+    FakeInputStream.instances = []
+    translator = _make_translator(tmp_path)
+    thread = threading.Thread(target=translator.start_streaming, daemon=True)
+    thread.start()
+    deadline = time.time() + 5.0
+    while not FakeInputStream.instances and time.time() < deadline:
+        time.sleep(0.01)
+    stream = FakeInputStream.instances[0]
+    assert (stream.samplerate, stream.channels) == (48000, 2)
+
+    for _ in range(int(CHUNK_DURATION * 10)):
+        stream.feed(np.zeros((4800, 2), dtype=np.float32))
+    while translator.translation_count < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    translator.stop_streaming()
+    thread.join(timeout=5.0)
+
+    assert translator.translation_count == 1
+    assert translator.get_stats()["resampler"]["blocks"] == CHUNK_DURATION * 10
+
+
+def test_network_ingest_reorders_and_feeds_translator(tmp_path):
+    import threading
+    import numpy as np
+    from network_ingest import CaptureAgent, NetworkSource, get_server
+
+    # The jitter buffer restores order, drops duplicates and fills gaps
+    delivered = []
+    source = NetworkSource("test", lambda samples, rate: delivered.append(samples.copy()), jitter_delay=0.05)
+    source.on_hello({"session": "a", "sample_rate": SAMPLE_RATE})
+    for seq in (1, 0, 1, 3):
+        source.push(seq, None, np.full(4, seq, dtype=np.float32))
+    deadline = time.time() + 2.0
+    while len(delivered) < 4 and time.time() < deadline:
+        time.sleep(0.01)
+    source.close()
+    assert np.concatenate(delivered).tolist() == [0] * 4 + [1] * 4 + [0] * 4 + [3] * 4
+    assert (source.duplicates, source.concealed) == (1, 1)
+
+    subtitle_stream = _import_pipeline()
+    translator = _make_translator(tmp_path)
+    translator.config["network_source"] = "127.0.0.1:0/host"
+    thread = threading.Thread(target=translator.start_streaming, daemon=True)
+    thread.start()
+    server = get_server("127.0.0.1", 0)
+    while translator.network_source is None and time.time() < deadline + 3.0:
+        time.sleep(0.01)
+
+    agent = CaptureAgent(("127.0.0.1", server.port), "host", 48000)
+    for _ in range(int(CHUNK_DURATION * 10)):
+        agent.push(np.zeros(4800, dtype=np.float32))
+    agent.start()
+    deadline = time.time() + 5.0
+    while translator.translation_count < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    agent.stop()
+    translator.stop_streaming()
+    thread.join(timeout=5.0)
+    server.stop()
+
+    assert translator.translation_count == 1
+    stats = translator.get_stats()
+    assert stats["network_source"]["received"] == CHUNK_DURATION * 10
+    assert stats["resampler"]["in_rate"] == 48000
+
+
+def test_network_ingest_drops_malformed_agents():
+    import socket
+    import zlib
+    from model_server import send_message, recv_message
+    from network_ingest import IngestServer, parse_address
+
+    assert parse_address(":7880/host") == ("127.0.0.1", 7880, "host")
+    server = IngestServer(port=0)
+    server.start()
+    source = server.open_source("host", lambda samples, rate: None)
+
+    def connect(encoding="pcm16"):
+        sock = socket.create_connection(("127.0.0.1", server.port), timeout=5.0)
+        send_message(sock, {"type": "hello", "stream": "host", "session": "s",
+                            "sample_rate": SAMPLE_RATE, "encoding": encoding})
+        assert recv_message(sock)[0]["ok"]
+        return sock
+
+    bad_frames = [
+        ("pcm16", {"ts": 1.0}, b"\0\0"),                                       # no seq
+        ("pcm16", {"seq": "0"}, b"\0\0"),                                      # seq of the wrong type
+        ("pcm16", {"seq": 0, "payload_bytes": 1 << 30}, b""),                  # oversized payload
+        ("pcm16z", {"seq": 0}, zlib.compress(bytes(64 * 1024 * 1024), 9)),     # decompression bomb
+    ]
+    try:
+        for encoding, header, payload in bad_frames:
+            sock = connect(encoding)
+            if "payload_bytes" in header:
+                data = json.dumps(header).encode("utf-8")
+                sock.sendall(len(data).to_bytes(4, "big") + data)
+            else:
+                send_message(sock, header, payload)
+            # The server hangs up instead of raising in its thread
+            assert sock.recv(1) == b"", header
+            sock.close()
+        assert source.received == 0
+    finally:
+        server.stop()
+
+
+def test_fingerprint_cache_skips_repeated_audio(tmp_path):
+    import numpy as np
+    from fingerprint_cache import FingerprintCache
+
+    calls = []
+
+    class CountingModel(StubWhisperModel):
+        def transcribe(self, audio, **options):
+            calls.append("asr")
+            return super().transcribe(audio, **options)
+
+    class CountingTranslator(StubTranslator):
+        def translate_text(self, text, src="en"):
+            calls.append("translate")
+            return super().translate_text(text, src)
+
+    translator = _make_translator(tmp_path)
+    translator.attach_shared_models(CountingModel(), CountingTranslator())
+    translator.fingerprints = FingerprintCache(size=8, sample_rate=SAMPLE_RATE)
+
+    rng = np.random.default_rng(3)
+    jingle = (rng.standard_normal(SAMPLE_RATE * 4) * 0.1).astype(np.float32)
+    chunk = int(SAMPLE_RATE * CHUNK_DURATION)
+    translator.process_audio_chunk(jingle[:chunk])
+    # The replay starts a little later and is slightly noisier
+    replay = jingle[100:100 + chunk] + (rng.standard_normal(chunk) * 0.01).astype(np.float32)
+    assert translator.process_audio_chunk(replay) == "HELLO FROM THE STUB MODEL"
+    translator.process_audio_chunk((rng.standard_normal(chunk) * 0.1).astype(np.float32))
+
+    assert calls == ["asr", "translate"] * 2
+    assert translator.translation_count == 3
+    assert translator.get_stats()["fingerprint_cache"]["hits"] == 1
+
+
+class _HeldPool:
+    """ASRWorkerPool stand-in whose chunks finish only when released"""
+
+    slot_samples = SAMPLE_RATE * 60
+
+    def __init__(self):
+        self.next_seq = 0
+        self.next_result = 0
+        self.held = []
+        self.completed = {}
+
+    def submit(self, audio_chunk, timeout=None):
+        self.held.append(self.next_seq)
+        self.next_seq += 1
+        return self.next_seq - 1
+
+    def skip(self):
+        self.completed[self.next_seq] = (None, None, None, None)
+        self.next_seq += 1
+        return self.next_seq - 1
+
+    def release(self):
+        for seq in self.held:
+            self.completed[seq] = ("freshly decoded words", None, None, None)
+        self.held = []
+
+    def get_ready(self):
+        ready = []
+        while self.next_result in self.completed:
+            ready.append((self.next_result,) + self.completed.pop(self.next_result))
+            self.next_result += 1
+        return ready
+
+    def pending(self):
+        return self.next_seq - self.next_result
+
+
+def test_fingerprint_cache_hits_keep_their_place(tmp_path):
+    import threading
+    import numpy as np
+    from fingerprint_cache import FingerprintCache
+    _import_pipeline()
+    from session_manager import SharedASRScheduler
+
+    rng = np.random.default_rng(4)
+    chunk = int(SAMPLE_RATE * CHUNK_DURATION)
+    jingle = (rng.standard_normal(chunk) * 0.1).astype(np.float32)
+    speech = (rng.standard_normal(chunk) * 0.1).astype(np.float32)
+
+    def cached_translator():
+        translator = _make_translator(tmp_path)
+        translator.fingerprints = FingerprintCache(size=8, sample_rate=SAMPLE_RATE)
+        entry = translator.fingerprints.add(translator.fingerprints.fingerprint(jingle), "the cached jingle")
+        entry.translations[translator.config["target_language"]] = "THE CACHED JINGLE"
+        return translator
+
+    # Worker pool: a hit behind a chunk still decoding waits for it
+    translator = cached_translator()
+    written = []
+    translator.write_subtitle = lambda translated, english=None, **kwargs: written.append(english)
+    translator.asr_pool = pool = _HeldPool()
+    translator.is_recording = True
+    worker = threading.Thread(target=translator.run_processing_loop, daemon=True)
+    worker.start()
+    translator.audio_queue.put((speech, None))
+    translator.audio_queue.put((jingle, None))
+    deadline = time.time() + 5.0
+    while pool.next_seq < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    assert written == []
+    pool.release()
+    while len(written) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    translator.is_recording = False
+    worker.join()
+    assert written == ["freshly decoded words", "the cached jingle"]
+
+    # Shared scheduler: the hit skips the model and keeps its place
+    translator = cached_translator()
+    scheduler = SharedASRScheduler()
+    translator.attach_shared_models(StubWhisperModel(), StubTranslator(), asr_scheduler=scheduler)
+    translator.fingerprints.hits = 0
+    for audio in (speech, jingle):
+        translator.audio_queue.put((audio, None))
+    scheduler.register(translator)
+    scheduler.start()
+    try:
+        results = [translator.transcript_queue.get(timeout=5.0) for _ in range(2)]
+    finally:
+        scheduler.stop()
+    assert [text for text, _, _ in results] == ["hello from the stub model", "the cached jingle"]
+    assert "cache_entry" in results[1][2] and translator.fingerprints.hits == 1
+
+
+def test_progressive_reveal_follows_word_timestamps(tmp_path):
+    import numpy as np
+    from types import SimpleNamespace
+    from subtitle_reveal import RevealScheduler
+
+    class WordModel(StubWhisperModel):
+        def transcribe(self, audio, **options):
+            assert options["word_timestamps"]
+            words = [SimpleNamespace(start=0.2 + 0.3 * i, end=0.45 + 0.3 * i, word=f" w{i}") for i in range(3)]
+            return iter([SimpleNamespace(text=" w0 w1 w2", words=words)]), None
+
+    translator = _make_translator(tmp_path)
+    translator.attach_shared_models(WordModel(), StubTranslator())
+    writes = []
+    translator.reveal = RevealScheduler(
+        lambda translated, english, duration, trace: writes.append((time.time(), english, translated, duration)),
+        hold=1.0)
+
+    start = time.time()
+    translator.process_audio_chunk(np.zeros(int(SAMPLE_RATE * CHUNK_DURATION), dtype=np.float32))
+    deadline = time.time() + 2.0
+    while len(writes) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert [english for _, english, _, _ in writes] == ["w0", "w0 w1", "w0 w1 w2"]
+    assert writes[-1][2] == "W0 W1 W2"
+    # Steps follow the speech, and the cue lives for the speech plus the hold
+    assert writes[1][0] - start >= 0.28 and writes[2][0] - start >= 0.58
+    assert abs(writes[0][3] - 1.85) < 0.05
+
+
+def test_auto_language_is_sticky(tmp_path):
+    import numpy as np
+    from types import SimpleNamespace
+
+    # Language spoken in each chunk; one Spanish word does not flip the stream
+    spoken = ["en"] * 4 + ["es"] + ["en"] * 5 + ["es"] * 4
+    requested = []
+
+    class DetectingModel(StubWhisperModel):
+        def transcribe(self, audio, **options):
+            requested.append(options["language"])
+            language = spoken[len(requested) - 1]
+            return iter([_Segment(f"speech in {language}")]), SimpleNamespace(language=language, language_probability=0.9)
+
+    class SourceTranslator(StubTranslator):
+        def translate_text(self, text, src="en"):
+            sources.append(src)
+            return text
+
+    sources = []
+    translator = _make_translator(tmp_path)
+    translator.config["language"] = "auto"
+    translator.language_tracker.check_interval = 4
+    translator.attach_shared_models(DetectingModel(), SourceTranslator())
+    chunk = np.zeros(int(SAMPLE_RATE * CHUNK_DURATION), dtype=np.float32)
+    for _ in spoken:
+        translator.process_audio_chunk(chunk)
+
+    # Detect on the first 3 chunks, then every 4th, then every chunk while a switch is pending
+    assert requested == [None] * 3 + ["en", None, None, "en", "en", None, "en", "en", "en", None, None]
+    assert sources == ["en"] * 13 + ["es"]
+    assert translator.language_tracker.switches == 1
+
+
+def test_text_filter_skips_junk_transcripts(tmp_path):
+    from text_filter import TextFilter
+
+    translated = []
+
+    class RecordingTranslator(StubTranslator):
+        def translate_text(self, text, src="en"):
+            translated.append(text)
+            return text.upper()
+
+    translator = _make_translator(tmp_path)
+    translator.attach_shared_models(StubWhisperModel(), RecordingTranslator())
+    translator.text_filter = TextFilter(history=3)
+    for text in ["Thank you.", "Subtitles by the Amara.org community",
+                 "We are going to look at the weather today.", "We are going to look at the weather today!",
+                 "so so so so so so", "And tomorrow it will rain.",
+                 "This novel was translated by my grandmother in 1950.",
+                 "See the rest on amara.org", "That was great. Translated by Jane Doe"]:
+        translator.handle_transcript(text)
+
+    # "translated by" inside a sentence is speech, not a credit
+    assert translated == ["We are going to look at the weather today.", "And tomorrow it will rain.",
+                          "This novel was translated by my grandmother in 1950."]
+    stats = translator.get_stats()["text_filter"]
+    assert stats["rejected"] == {"blocklist": 4, "repetition": 1, "compression": 0, "duplicate": 1}
+    assert stats["translate_calls_saved"] == 6
+
+
+def test_transcript_store_searches_committed_lines(tmp_path):
+    import sqlite3
+    from latency import ChunkTrace
+    from transcript_store import TranscriptReader, TranscriptStore
+
+    translator = _make_translator(tmp_path)
+    translator.transcripts = store = TranscriptStore(str(tmp_path / "transcripts.db"), flush_interval=5.0)
+    for index, text in enumerate(["The weather is sunny", "Markets closed higher", "Rain expected tonight"]):
+        translator.handle_transcript(text, ChunkTrace(1000.0 + index))
+    store.append("other", "Sunny weather in the north", "...", timestamp=1001.5)
+    # Stopping commits what is still queued
+    translator.stop_streaming()
+    assert store.get_stats()["pending"] == 0 and store.get_stats()["written"] == 4
+
+    reader = TranscriptReader(str(tmp_path / "transcripts.db"))
+    assert [line["source"] for line in reader.search("weather")] == ["Sunny weather in the north", "The weather is sunny"]
+    # Blank text is no filter rather than an FTS syntax error
+    assert len(reader.search(" ")) == 4
+    try:
+        reader._connect_readonly().execute("DELETE FROM lines")
+        assert False, "reader connection is writable"
+    except sqlite3.OperationalError:
+        pass
+
+    lines = store.search("weather")
+    assert [line["source"] for line in lines] == ["Sunny weather in the north", "The weather is sunny"]
+    assert lines[1]["translation"] == "THE WEATHER IS SUNNY"
+    assert [line["source"] for line in store.search("WEATHER", session="subtitle")] == ["The weather is sunny"]
+    assert [line["timestamp"] for line in store.search(session="subtitle", start=1001.0, end=1003.0)] == [1002.0, 1001.0]
+    store.close()
+    assert store.get_stats()["written"] == 4
+
+
+def test_audio_archive_segments_captured_audio(tmp_path):
+    import wave
+    import numpy as np
+    from audio_archive import AudioArchive, find_segment
+
+    translator = _make_translator(tmp_path)
+    archive_dir = str(tmp_path / "archive")
+    translator.archive = AudioArchive(archive_dir, SAMPLE_RATE, audio_format="wav",
+                                      segment_seconds=1.0, buffer_seconds=4.0, session="test")
+    translator.archive.start()
+    blocks = _blocks(2.5)
+    start = time.time()
+    for block in blocks:
+        translator.audio_callback(block, BLOCK, None, None)
+    translator.archive.stop()
+
+    with open(f"{archive_dir}/index.jsonl") as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry["samples"] for entry in entries] == [SAMPLE_RATE, SAMPLE_RATE, SAMPLE_RATE // 2]
+    recorded = []
+    for entry in entries:
+        with wave.open(f"{archive_dir}/{entry['file']}") as segment:
+            recorded.append(np.frombuffer(segment.readframes(segment.getnframes()), dtype="<i2"))
+    expected = (np.clip(np.concatenate(blocks)[:, 0], -1.0, 1.0) * 32767).astype("<i2")
+    np.testing.assert_array_equal(np.concatenate(recorded), expected)
+
+    path, offset = find_segment(archive_dir, entries[0]["start"] + 0.25, session="test")
+    assert path.endswith(entries[0]["file"]) and abs(offset - 0.25) < 1e-6
+    assert abs(entries[0]["start"] - start) < 0.5
+    assert translator.get_stats()["archive"]["dropped_seconds"] == 0
+
+    # Tiny blocks (network ingest, resampled input) and a writer a full ring
+    # behind still map the oldest buffered sample to its capture time
+    archive = AudioArchive(archive_dir, SAMPLE_RATE, audio_format="wav", buffer_seconds=1.0)
+    block_samples = 8
+    for index in range(2 * SAMPLE_RATE // block_samples):
+        archive.write(np.zeros(block_samples, dtype=np.float32), 500.0 + index * block_samples / SAMPLE_RATE)
+    oldest = archive.written - len(archive.ring)
+    assert abs(archive.capture_time_of(oldest) - (500.0 + oldest / SAMPLE_RATE)) < 1e-6
+
+
+def test_session_replay_reproduces_outputs_and_timing(tmp_path):
+    import threading
+    from session_recorder import SessionRecorder, SessionReplayer
+
+    class SlowTranslator(StubTranslator):
+        def translate_text(self, text, src="en"):
+            time.sleep(0.05)
+            return f"{text.upper()} ({src})"
+
+    translator = _make_translator(tmp_path)
+    translator.attach_shared_models(StubWhisperModel(), SlowTranslator())
+    recorder = SessionRecorder(str(tmp_path / "recording"), translator)
+    recorder.start()
+    translator.is_recording = True
+    worker = threading.Thread(target=translator.run_processing_loop, daemon=True)
+    worker.start()
+    for block in _blocks(CHUNK_DURATION * 2):
+        translator.audio_callback(block, BLOCK, None, None)
+    while translator.translation_count < 2:
+        time.sleep(0.01)
+    translator.is_recording = False
+    worker.join()
+    recorder.stop()
+    with open(translator.subtitle_file, encoding="utf-8") as f:
+        live_subtitle = f.read()
+
+    # Both stages come from the recording, at the recorded pace
+    replayer = SessionReplayer(str(tmp_path / "recording"), speed=1.0, output_dir=str(tmp_path / "replay"))
+    report = replayer.run()
+    assert report["subtitles"] == report["recorded_subtitles"] == 2
+    assert report["unmatched"] == {"asr": 0, "translate": 0}
+    with open(report["subtitle_file"], encoding="utf-8") as f:
+        assert f.read() == live_subtitle == "HELLO FROM THE STUB MODEL (en)"
+    assert 0.04 < report["latency"]["translate"]["p50"] < 0.2
+    assert abs(report["audio_seconds"] - CHUNK_DURATION * 2) < 0.2
+
+    # A bounded queue would drop chunks of a fast replay and shift every
+    # later mocked result onto the wrong chunk
+    replayer = SessionReplayer(str(tmp_path / "recording"), speed=0, output_dir=str(tmp_path / "fast"))
+    replayer.meta["config"].update({"max_queued_chunks": 1, "asr_workers": 2})
+    assert replayer.build_translator().audio_queue.maxsize == 0
+    report = replayer.run()
+    assert report["subtitles"] == 2 and report["unmatched"] == {"asr": 0, "translate": 0}
+
+
+def test_benchmark_replay_keeps_files_apart(tmp_path):
+    import numpy as np
+    from benchmark import FakeTranslator, replay
+
+    class LengthModel:
+        def transcribe(self, audio, **options):
+            return iter([_Segment(f"{len(audio) / SAMPLE_RATE:.1f}s")]), None
+
+    translator = _make_translator(tmp_path)
+    fake_translator = FakeTranslator()
+    translator.attach_shared_models(LengthModel(), fake_translator)
+    rng = np.random.default_rng(0)
+    for seconds in (4.05, 2.5):
+        replay(translator, (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.1).astype(np.float32))
+
+    # Each file's tail is its own chunk instead of the head of the next file
+    assert fake_translator.texts == ["3.0s", "1.1s", "2.5s"]
+    assert translator.buffer_fill == 0
+
+
+def test_benchmark_reports_child_that_died():
+    import multiprocessing as mp
+    from benchmark import _wait_for_result
+
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    process = ctx.Process(target=os._exit, args=(3,))
+    process.start()
+    result = _wait_for_result(process, result_queue, {"whisper_model_size": "tiny"}, poll=0.1)
+    assert result == {"config": {"whisper_model_size": "tiny"}, "error": "Benchmark process exited with code 3"}
+
+
+def test_profile_route_rejects_bad_seconds():
+    _import_pipeline()
+    import flask_web_interface
+
+    client = flask_web_interface.app.test_client()
+    for seconds in ("abc", "nan", "-5", "0", "1e9"):
+        response = client.post(f"/profile?seconds={seconds}")
+        assert response.status_code == 400, seconds
+
+
+def test_tracer_records_pipeline_spans(tmp_path):
+    from profiling import TRACER
+
+    translator = _make_translator(tmp_path)
+    assert TRACER.span("asr") is TRACER.span("translate")  # shared no-op while disabled
+
+    TRACER.start()
+    try:
+        for block in _blocks(CHUNK_DURATION):
+            translator.audio_callback(block, BLOCK, None, None)
+        chunk, trace = translator.audio_queue.get_nowait()
+        translator.process_audio_chunk(chunk, trace)
+    finally:
+        path = TRACER.stop(str(tmp_path / "trace.json"))
+
+    with open(path, encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    names = {event["name"] for event in events if event["ph"] == "X"}
+    assert {"audio_callback", "asr", "translate", "write_subtitle"} <= names
+
+
+def test_metrics_sum_thread_shards_and_render():
+    import threading
+    from metrics import Registry
+
+    registry = Registry()
+    chunks = registry.counter("chunks_total", "Chunks", labels={"stream": "a"})
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            chunks.inc()
+        latency.observe(0.05)
+        latency.observe(5.0)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    chunks.inc(2)
+
+    assert chunks.value() == 8002
+    assert latency.snapshot() == ([8, 0, 8], 8 * 5.05)
+    # Shards of exited threads are folded away; only this thread's is left
+    assert len(chunks._shards) == 1 and len(latency._shards) == 0
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == ["# HELP chunks_total Chunks", "# TYPE chunks_total counter", 'chunks_total{stream="a"} 8002']
+    assert 'latency_seconds_bucket{le="0.1"} 8' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 8' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 16' in lines
+    assert "latency_seconds_count 16" in lines
+
+
+def test_adaptive_chunking_follows_asr_load(tmp_path):
+    translator = _make_translator(tmp_path)
+    translator.config.update({"adaptive_chunking": True, "min_chunk_duration": 2.0, "max_chunk_duration": 4.0})
+
+    for _ in range(3):
+        translator.update_asr_rtf(1.0, 1.0)  # saturated
+    assert translator.chunk_duration == 3.75
+    for _ in range(3):
+        translator.update_asr_rtf(1.0, 1.0)
+    assert translator.chunk_duration == 4.0  # clamped
+
+    # The callback cuts chunks at the new length without a restart
+    for block in _blocks(4.0):
+        translator.audio_callback(block, BLOCK, None, None)
+    chunk, _ = translator.audio_queue.get_nowait()
+    assert len(chunk) == 4 * SAMPLE_RATE
+
+    for _ in range(30):
+        translator.update_asr_rtf(0.05, 1.0)  # plenty of headroom
+    assert translator.chunk_duration == 2.0
+
+
+def test_hot_reconfiguration_cuts_over_between_chunks(tmp_path):
+    from config_watcher import ConfigWatcher
+
+    class Provider:
+        def get_asr_model(self, size, config=None):
+            return StubWhisperModel(text=f"decoded by {size}")
+
+        def get_translator(self, target_lang):
+            return StubTranslator()
+
+    translator = _make_translator(tmp_path)
+    translator.model_provider = Provider()
+    old_translator = translator.translator
+    translator.latency.samples["asr"].append(0.5)
+
+    result = translator.apply_config({"chunk_duration": 2.0, "target_language": "de",
+                                      "device_name": "Mic", "whisper_model_size": "base"}, persist=False)
+    assert sorted(result["applied"]) == ["chunk_duration", "target_language"]
+    assert result["restart"] == ["device_name"] and result["pending"] == ["whisper_model_size"]
+    assert translator.chunk_samples == 2 * SAMPLE_RATE
+    assert translator.translator is not old_translator
+    # Latency of the old chunk length is not mixed into the new one
+    assert translator.latency.get_percentiles() == {}
+
+    deadline = time.time() + 5.0
+    while translator.pending_asr is None and time.time() < deadline:
+        time.sleep(0.01)
+    # The old model keeps captioning until the next chunk starts
+    assert translator.config["whisper_model_size"] == "tiny"
+    assert translator.transcribe_chunk(_blocks(2.0)[0].reshape(-1)) == "decoded by base"
+    assert translator.config["whisper_model_size"] == "base"
+
+    watcher = ConfigWatcher(translator)
+    config = dict(translator.config, chunk_duration=4.0)
+    with open(translator.config_file, "w") as f:
+        json.dump(config, f)
+    os.utime(translator.config_file, ns=(0, watcher.last_mtime + 1))
+    assert watcher.check()["applied"] == ["chunk_duration"]
+    assert translator.chunk_duration == 4.0
+
+
+def test_hot_reconfiguration_reports_what_it_could_not_apply(tmp_path):
+    import types
+
+    class Provider:
+        def get_asr_model(self, size, config=None):
+            raise RuntimeError(f"No usable Whisper model for {size}")
+
+    translator = _make_translator(tmp_path)
+    translator.model_provider = Provider()
+
+    # Mistyped and unknown keys are reported, not applied
+    result = translator.apply_config({"vad_threshold": "0.01", "bogus_key": 1, "input_channel": 1.5,
+                                      "text_filter": 1, "subtitle_duration": 2}, persist=False)
+    assert result["errors"] == {"vad_threshold": "must be a number", "bogus_key": "unknown setting",
+                                "input_channel": "must be a whole number",
+                                "text_filter": "must be true or false"}
+    assert result["applied"] == ["subtitle_duration"] and translator.config["subtitle_duration"] == 2.0
+    assert translator.config["vad_threshold"] == 0.0 and "bogus_key" not in translator.config
+
+    result = translator.apply_config({"whisper_model_size": "huge", "cpu_threads": 3}, persist=False)
+    assert result["pending"] == ["whisper_model_size"]
+    assert result["errors"] == {"cpu_threads": "set by the shared CPU budget"}
+    deadline = time.time() + 5.0
+    while translator.get_stats()["model_swap"]["pending"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert translator.get_stats()["model_swap"] == {"pending": [], "error": "No usable Whisper model for huge"}
+    assert translator.pending_asr is None and translator.config["whisper_model_size"] == "tiny"
+
+    # Worker pool slots hold twice the starting chunk; longer chunks need a restart
+    translator.asr_pool = types.SimpleNamespace(slot_samples=int(2 * CHUNK_DURATION * SAMPLE_RATE))
+    result = translator.apply_config({"chunk_duration": 4.0}, persist=False)
+    assert result["applied"] == ["chunk_duration"] and translator.chunk_duration == 4.0
+    result = translator.apply_config({"chunk_duration": 7.0}, persist=False)
+    assert "chunk_duration" in result["errors"] and translator.chunk_duration == 4.0
+    result = translator.apply_config({"adaptive_chunking": True, "max_chunk_duration": 12.0}, persist=False)
+    assert sorted(result["errors"]) == ["adaptive_chunking", "max_chunk_duration"]
+    assert not translator.config["adaptive_chunking"]
+
+
+def test_language_change_restarts_asr_workers(tmp_path):
+    import types
+
+    translator = _make_translator(tmp_path)
+    translator.asr_pool = types.SimpleNamespace(slot_samples=int(2 * CHUNK_DURATION * SAMPLE_RATE),
+                                                pending=lambda: 0, stop=lambda: None)
+    started = []
+
+    def load_asr(config):
+        # The new pool's workers decode in the new language
+        started.append(translator.get_transcribe_options(config)["language"])
+        return None, types.SimpleNamespace(slot_samples=translator.asr_pool.slot_samples, pending=lambda: 0)
+
+    translator.load_asr = load_asr
+    result = translator.apply_config({"language": "de"}, persist=False)
+    assert result["pending"] == ["language"] and translator.config["language"] == "en"
+    deadline = time.time() + 5.0
+    while translator.pending_asr is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert started == ["de"]
+    old_pool = translator.asr_pool
+    translator.cut_over_asr()
+    assert translator.asr_pool is not old_pool and translator.config["language"] == "de"
+
+
+def test_multi_capture_splits_channels_of_one_device(tmp_path, monkeypatch):
+    import numpy as np
+    from scipy.signal import resample_poly
+    subtitle_stream = _import_pipeline()
+    import multi_capture
+
+    class Provider:
+        def get_asr_model(self, size, config=None):
+            return StubWhisperModel()
+
+        def get_translator(self, target_lang):
+            return StubTranslator()
+
+    monkeypatch.setattr(multi_capture, "sd", NativeSoundDevice)
+    monkeypatch.setattr(subtitle_stream, "sd", NativeSoundDevice)
+    FakeInputStream.instances.clear()
+    inputs = [
+        {"name": "host", "device_name": "CABLE Output", "channel": 0,
+         "subtitle_file": str(tmp_path / "host.txt"), "vad_threshold": 0.01},
+        {"name": "guest", "device_name": "CABLE Output", "channel": 1,
+         "subtitle_file": str(tmp_path / "guest.txt"), "vad_threshold": 0.01},
+    ]
+    capture = multi_capture.MultiDeviceCapture(inputs, chunk_duration=CHUNK_DURATION,
+                                               config_file=str(tmp_path / "translation_config.json"),
+                                               models=Provider())
+    assert capture.start()
+    try:
+        assert len(FakeInputStream.instances) == 1
+        stream = FakeInputStream.instances[0]
+        # Opened at the device's rate; each input resamples its own channel
+        assert (stream.samplerate, stream.channels) == (48000, 2)
+        # Speech on the host channel only; the guest channel stays silent
+        for block in _blocks(CHUNK_DURATION * 2):
+            native = resample_poly(block[:, 0], 3, 1).astype(np.float32).reshape(-1, 1)
+            stream.feed(np.concatenate([native, np.zeros_like(native)], axis=1))
+        deadline = time.time() + 5.0
+        while capture.translators["host"].translation_count < 2 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        capture.stop()
+
+    assert capture.translators["host"].translation_count == 2
+    assert capture.translators["guest"].translation_count == 0
+    assert capture.translators["host"].get_stats()["resampler"]["blocks"] == CHUNK_DURATION * 2 * 10
+    assert (tmp_path / "host.txt").exists() and not (tmp_path / "guest.txt").exists()
+
+
+def test_model_registry_rejects_corrupt_files(tmp_path):
+    from model_registry import ModelRegistry
+
+    model_dir = tmp_path / "models" / "tiny"
+    model_dir.mkdir(parents=True)
+    (model_dir / "model.bin").write_bytes(b"\x01" * 10000)
+    (model_dir / "tokenizer.json").write_text("{}")
+
+    registry = ModelRegistry(str(tmp_path / "models"))
+    registry.register("tiny", "int8", str(model_dir))
+
+    reloaded = ModelRegistry(str(tmp_path / "models"))
+    assert reloaded.resolve("tiny", "int8") == str(model_dir)
+    # Unquantized weights serve any compute type
+    assert reloaded.resolve("tiny", "float32") == str(model_dir)
+    assert reloaded.resolve("base", "int8") is None
+
+    # A touched but unchanged file is re-hashed once and its mtime recorded
+    os.utime(model_dir / "model.bin", ns=(0, 10**18))
+    assert reloaded.resolve("tiny", "int8") == str(model_dir)
+    assert ModelRegistry(str(tmp_path / "models")).entries()["tiny-int8"]["files"]["model.bin"]["mtime_ns"] == 10**18
+
+    (model_dir / "model.bin").write_bytes(b"\x02" * 10000)
+    assert reloaded.resolve("tiny", "int8") is None
+
+    # Loads trust size and mtime; only verify re-hashes every file
+    os.utime(model_dir / "model.bin", ns=(0, 10**18))
+    assert reloaded.resolve("tiny", "int8") == str(model_dir)
+    assert not reloaded.verify("tiny-int8")
+
+
+def test_autotune_picks_most_accurate_passing_config(monkeypatch):
+    import autotune
+
+    asr_rtf = {"small": 0.9, "base": 0.3, "tiny": 0.1}
+
+    def fake_run(wav_files, config, realtime, translation_delay):
+        rtf = asr_rtf[config["whisper_model_size"]] * (2.0 / config["cpu_threads"])
+        return {"config": config, "asr_rtf": rtf,
+                "latency": {"asr": {"p95": rtf * config["chunk_duration"]}}}
+
+    monkeypatch.setattr(autotune, "run_isolated", fake_run)
+    best, results = autotune.calibrate(["a.wav"], {}, ["tiny", "small", "base"], ["int8"],
+                                       [2.0, 5.0], [1, 2], [1], target_rtf=0.5, target_latency=4.0)
+
+    assert best["whisper_model_size"] == "base"
+    assert best["cpu_threads"] == 2 and best["chunk_duration"] == 2.0
+    # tiny is never measured once base passes
+    assert {result["config"]["whisper_model_size"] for result in results} == {"small", "base"}
+    assert autotune.word_error_rate("the cat sat", "the cat sat down") == 1 / 3
+
+
+def test_resource_manager_isolates_audio_core():
+    from resources import ResourceManager
+
+    manager = ResourceManager(cores=[4, 5, 6, 7, 8, 9], cpu_budget=5)
+    assert manager.describe() == {"audio": [4], "io": [5], "asr": [6, 7, 8]}
+    assert manager.threads_for("asr") == 3
+    assert manager.threads_for("asr", workers=2) == 1
+
+    shared = ResourceManager(cores=[0, 1], isolate_audio=False)
+    assert shared.cores_for("audio") == shared.cores_for("asr") == [0, 1]
+
+
+def _pool_results(pool, count, timeout=60.0):
+    results = {}
+    deadline = time.time() + timeout
+    while len(results) < count and time.time() < deadline:
+        for seq, text, error, _, _ in pool.get_ready():
+            results[seq] = (text, error)
+        time.sleep(0.02)
+    return results
+
+
+def test_asr_pool_replaces_dead_worker():
+    import numpy as np
+    from asr_worker_pool import ASRWorkerPool
+
+    pool = ASRWorkerPool("stub", num_workers=1, slot_samples=BLOCK, model_loader=load_crashing_model)
+    assert pool.start(timeout=60.0)
+    try:
+        first = pool.submit(np.full(BLOCK, 1, dtype=np.float32))
+        crash = pool.submit(np.full(BLOCK, -1, dtype=np.float32))
+        results = _pool_results(pool, 2)
+        assert results[first] == ("chunk 1", None)
+        # The lost chunk fails instead of holding back every later result
+        assert results[crash][0] is None and "died" in results[crash][1]
+        assert pool.pending() == 0
+
+        # The replacement decodes new chunks in order
+        later = [pool.submit(np.full(BLOCK, value, dtype=np.float32)) for value in (2, 3)]
+        results = _pool_results(pool, 2)
+        assert [results[seq][0] for seq in later] == ["chunk 2", "chunk 3"]
+        assert pool.restarts == 1
+    finally:
+        pool.stop()
+
+
+def test_model_server_transcribes_while_translation_waits():
+    import tempfile
+    import threading
+    import numpy as np
+    from model_server import ModelServer, ModelServerClient, Segment
+
+    release = threading.Event()
+
+    class ServerWhisperModel:
+        def transcribe(self, audio, **options):
+            return iter([Segment("hello", 0.0, 0.1)]), None
+
+    class BlockedTranslator(StubTranslator):
+        def translate_batch(self, texts, src="en"):
+            release.wait(10.0)
+            return [text.upper() for text in texts]
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "models.sock")
+    server = ModelServer(socket_path)
+    server.asr_model = ServerWhisperModel()
+    server.translators["fa"] = BlockedTranslator()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    deadline = time.time() + 5.0
+    while not os.path.exists(socket_path) and time.time() < deadline:
+        time.sleep(0.01)
+    try:
+        translated = []
+        translating = threading.Thread(
+            target=lambda: translated.append(ModelServerClient(socket_path).translate("hello")), daemon=True)
+        translating.start()
+        while server.translations.qsize() == 0 and server.batch_count == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        # The translation is stuck on the network; ASR still answers at once
+        start = time.time()
+        result = ModelServerClient(socket_path).transcribe(np.zeros(BLOCK, dtype=np.float32))
+        assert result["segments"] == [["hello", 0.0, 0.1]]
+        assert time.time() - start < 1.0 and not translated
+
+        release.set()
+        translating.join(timeout=5.0)
+        assert translated == ["HELLO"]
+        # Counted just after the replies go out
+        while server.get_stats()["served_count"] < 2 and time.time() < deadline + 5.0:
+            time.sleep(0.01)
+        assert server.get_stats()["served_count"] == 2
+    finally:
+        release.set()
+        server.stop()
+
+
+def test_model_server_client_times_out_on_stuck_server():
+    import socket
+    import tempfile
+    from model_server import ModelServerClient
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "stuck.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    try:
+        client = ModelServerClient(socket_path, timeout=0.2)
+        start = time.time()
+        try:
+            client.ping()
+            assert False, "a server that never replies should time out"
+        except TimeoutError:
+            pass
+        assert time.time() - start < 2.0
+        # The connection holding the unanswered request is dropped
+        assert client.sock is None
+    finally:
+        listener.close()
+
+
+def test_shared_scheduler_keeps_each_stream_in_order(tmp_path):
+    import numpy as np
+    _import_pipeline()
+    from session_manager import SharedASRScheduler
+
+    class SlowFirstModel:
+        def transcribe(self, audio, **options):
+            time.sleep(0.3 if audio[0] == 1 else 0.0)
+            return iter([_Segment(str(int(audio[0])))]), None
+
+    scheduler = SharedASRScheduler(decode_threads=2)
+    translator = _make_translator(tmp_path)
+    translator.attach_shared_models(SlowFirstModel(), StubTranslator(), asr_scheduler=scheduler)
+    for value in (1, 2, 3):
+        translator.audio_queue.put((np.full(BLOCK, value, dtype=np.float32), None))
+    scheduler.register(translator)
+    scheduler.start()
+    try:
+        texts = [translator.transcript_queue.get(timeout=5.0)[0] for _ in range(3)]
+    finally:
+        scheduler.stop()
+    assert texts == ["1", "2", "3"]
+
+
+def test_session_that_fails_to_start_frees_its_slot(tmp_path, monkeypatch):
+    subtitle_stream = _import_pipeline()
+    monkeypatch.setattr(subtitle_stream, "sd", FakeSoundDevice)
+    from session_manager import SessionManager
+
+    class StubModels:
+        def get_asr_model(self, model_size, config=None):
+            return StubWhisperModel()
+
+        def get_translator(self, target_lang):
+            return StubTranslator()
+
+    manager = SessionManager(max_sessions=1, config_file=str(tmp_path / "translation_config.json"))
+    manager.models = StubModels()
+    manager.create_session(device_name="No Such Device", subtitle_file=str(tmp_path / "a.txt"))
+    deadline = time.time() + 5.0
+    while manager.get_stats()["sessions"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert manager.get_stats()["sessions"] == 0
+    assert manager.scheduler.translators == []
+    # The slot is free again
+    manager.create_session(device_name="No Such Device", subtitle_file=str(tmp_path / "b.txt"))
+    manager.stop_all()
+
+
+def test_session_models_load_outside_the_manager_lock(tmp_path, monkeypatch):
+    import threading
+    subtitle_stream = _import_pipeline()
+    monkeypatch.setattr(subtitle_stream, "sd", FakeSoundDevice)
+    from session_manager import Session, SessionManager
+
+    loading = threading.Event()
+    release = threading.Event()
+
+    class SlowModels:
+        def get_asr_model(self, model_size, config=None):
+            loading.set()
+            release.wait(10.0)
+            return StubWhisperModel()
+
+        def get_translator(self, target_lang):
+            return StubTranslator()
+
+    manager = SessionManager(max_sessions=1, config_file=str(tmp_path / "translation_config.json"))
+    manager.models = SlowModels()
+    creating = threading.Thread(target=manager.create_session, daemon=True,
+                                kwargs={"device_name": "No Such Device", "session_id": "slow",
+                                        "subtitle_file": str(tmp_path / "slow.txt")})
+    creating.start()
+    try:
+        assert loading.wait(5.0)
+        # The registry answers while the model loads, and the slot is taken
+        start = time.time()
+        assert manager.list_sessions() == []
+        assert time.time() - start < 1.0
+        for session_id in ("slow", "other"):
+            try:
+                manager.create_session(session_id=session_id)
+                assert False, "the loading session holds the only slot"
+            except ValueError:
+                pass
+    finally:
+        release.set()
+        creating.join(timeout=5.0)
+    manager.stop_all()
+
+    # Session ids name files, so paths are refused
+    manager = SessionManager(config_file=str(tmp_path / "translation_config.json"))
+    try:
+        manager.create_session(session_id="../../etc/x")
+        assert False, "a session id with a path should be refused"
+    except ValueError:
+        pass
+    assert manager.reserved == set()
+
+    # Live values win over the settings the session was created with
+    translator = _make_translator(tmp_path)
+    translator.chunk_duration = 4.0
+    session = Session("s", translator, {"chunk_duration": 3.0, "target_language": "de"})
+    stats = session.get_stats()
+    assert stats["chunk_duration"] == 4.0 and stats["target_language"] == "de"
+
+
+class _FakeStream:
+    def __init__(self, spec):
+        self.spec = spec
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def get_stats(self):
+        return {"queue_depth": 0, "asr_rtf": 0.1}
+
+    def is_running(self):
+        return self.running
+
+
+def _dispatch_setup(names, factories=None, **options):
+    from stream_dispatcher import LocalBroker, LocalTransport, StreamCoordinator, CaptionWorker, COORDINATOR
+
+    broker = LocalBroker()
+    coordinator = StreamCoordinator(LocalTransport(broker, COORDINATOR), **options)
+    workers = {name: CaptionWorker(LocalTransport(broker, name), capacity=2,
+                                   stream_factory=(factories or {}).get(name, _FakeStream))
+               for name in names}
+    for worker in workers.values():
+        worker.register()
+    return broker, coordinator, workers
+
+
+def _pump(*workers):
+    for worker in workers:
+        message = worker.transport.recv(timeout=0)
+        while message is not None:
+            worker.handle_message(message)
+            message = worker.transport.recv(timeout=0)
+
+
+def test_dispatcher_reassigns_streams_of_restarted_worker():
+    from stream_dispatcher import LocalTransport, CaptionWorker
+
+    broker, coordinator, workers = _dispatch_setup(["w1"])
+    coordinator.add_stream("s1", {})
+    coordinator.tick()
+    _pump(workers["w1"])
+    assert set(workers["w1"].streams) == {"s1"}
+
+    # Same name, new process: it runs nothing, so s1 must be sent again
+    restarted = CaptionWorker(LocalTransport(broker, "w1"), capacity=2, stream_factory=_FakeStream)
+    restarted.register()
+    coordinator.tick()
+    _pump(restarted)
+    assert set(restarted.streams) == {"s1"}
+    assert coordinator.get_stats()["workers"]["w1"]["streams"] == ["s1"]
+
+
+def test_dispatcher_releases_streams_after_partition():
+    broker, coordinator, workers = _dispatch_setup(["w1", "w2"], heartbeat_timeout=0.2)
+    coordinator.add_stream("s1", {})
+    coordinator.tick()
+    _pump(*workers.values())
+    assert set(workers["w1"].streams) == {"s1"}
+
+    # w1 is cut off: its reports and the coordinator's messages are lost
+    time.sleep(0.3)
+    workers["w2"].report_load()
+    coordinator.tick()
+    while broker.inbox("w1").qsize():
+        broker.inbox("w1").get_nowait()
+    _pump(workers["w2"])
+    assert set(workers["w2"].streams) == {"s1"}
+
+    # The link heals; w1's stale report gets it reconciled and s1 released
+    workers["w1"].report_load()
+    coordinator.tick()
+    _pump(workers["w1"])
+    coordinator.tick()
+    _pump(workers["w1"])
+    assert workers["w1"].streams == {}
+    assert coordinator.assignments == {"s1": "w2"}
+
+
+def test_dispatcher_reassigns_stream_whose_factory_failed():
+    def failing_factory(spec):
+        raise RuntimeError("device not found")
+
+    broker, coordinator, workers = _dispatch_setup(["w1", "w2"], factories={"w1": failing_factory},
+                                                   assign_timeout=0.0)
+    coordinator.add_stream("s1", {})
+    coordinator.tick()
+    _pump(*workers.values())
+    assert coordinator.assignments == {"s1": "w1"} and workers["w1"].streams == {}
+
+    workers["w1"].report_load()
+    coordinator.tick()
+    _pump(*workers.values())
+    assert coordinator.assignments == {"s1": "w2"}
+    assert set(workers["w2"].streams) == {"s1"}
+    assert coordinator.get_stats()["failed_starts"] == 1
+
+
 if __name__ == "__main__":
     success = run_comprehensive_test()
     sys.exit(0 if success else 1) 
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+Drop junk transcripts before they are translated and shown.
+
+On silence, music or noise Whisper tends to produce text nobody said:
+"Thank you.", "Subtitles by the Amara.org community", or a phrase repeated
+until the window ends. TextFilter rejects such a transcript for one of
+these reasons:
+
+``blocklist``
+    The whole text is a known hallucination, a sentence of it starts with
+    a credit ("Subtitles by ..."), or it names a subtitle site.
+``repetition``
+    An n-gram repeats back to back too many times.
+``compression``
+    The text compresses better than real speech does. This is Whisper's
+    own ``compression_ratio_threshold`` test, applied to the joined text.
+``duplicate``
+    The text nearly matches one of the last ``history`` accepted outputs,
+    e.g. the same sentence decoded again from overlapping audio.
+
+Each rejection saves one translation call and one subtitle write.
+"""
+
+import re
+import threading
+import zlib
+from collections import deque
+from difflib import SequenceMatcher
+
+from metrics import REGISTRY
+
+REASONS = ("blocklist", "repetition", "compression", "duplicate")
+FILTERED = {reason: REGISTRY.counter("translator_filtered_transcripts_total",
+                                     "Transcripts dropped before translation", labels={"reason": reason})
+            for reason in REASONS}
+
+# Whole transcripts Whisper produces from silence or music
+HALLUCINATIONS = {
+    "you", "thank you", "thanks", "thank you very much", "thanks for watching",
+    "thank you for watching", "thank you so much for watching", "bye", "bye bye",
+    "please subscribe", "subscribe to my channel", "like and subscribe",
+    "see you next time", "see you in the next video", "music", "applause", "silence",
+}
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+# Credit lines learned from subtitle files. Only a sentence that starts with
+# one is a credit; "it was translated by my grandmother" is speech
+CREDIT_PREFIXES = tuple(normalize(phrase) for phrase in (
+    "subtitles by", "subtitled by", "captions by", "transcribed by", "translated by",
+    "transcription by castingwords"))
+# Subtitle sites named in those credits, matched as whole words anywhere
+CREDIT_SITES = tuple(normalize(site) for site in ("amara.org", "www.mooji.org"))
+# Sentence ends; a dot inside "amara.org" is not one
+SENTENCE_END = re.compile(r"[.!?]+(?:\s+|$)")
+
+
+def is_credit(text):
+    """Whether ``text`` is, or contains a sentence that is, a subtitle credit"""
+    padded = f" {normalize(text)} "
+    if any(f" {site} " in padded for site in CREDIT_SITES):
+        return True
+    for sentence in SENTENCE_END.split(text):
+        sentence = normalize(sentence)
+        if any(sentence == prefix or sentence.startswith(prefix + " ") for prefix in CREDIT_PREFIXES):
+            return True
+    return False
+
+
+def longest_repeat(words, max_n=4):
+    """Most times any n-gram (n <= max_n) occurs back to back"""
+    best = 1
+    for n in range(1, max_n + 1):
+        for start in range(len(words) - n):
+            gram = words[start:start + n]
+            count = 1
+            position = start + n
+            while words[position:position + n] == gram:
+                count += 1
+                position += n
+            best = max(best, count)
+    return best
+
+
+def compression_ratio(text):
+    data = text.encode("utf-8")
+    return len(data) / len(zlib.compress(data))
+
+
+class TextFilter:
+    """Reject hallucinated, repeated and duplicate transcripts.
+
+    Parameters
+    ----------
+    history : int
+        Accepted outputs kept for near-duplicate detection. 0 disables it.
+    similarity : float
+        SequenceMatcher ratio at or above which a text is a duplicate.
+    max_repeats : int
+        Back-to-back repetitions of an n-gram allowed before rejecting.
+    max_compression : float
+        Highest zlib compression ratio accepted.
+    blocklist : iterable of str, optional
+        Extra whole-text hallucinations, matched after normalization.
+    """
+
+    def __init__(self, history=5, similarity=0.9, max_repeats=3, max_compression=2.4, blocklist=()):
+        self.similarity = similarity
+        self.max_repeats = max_repeats
+        self.max_compression = max_compression
+        self.blocklist = HALLUCINATIONS | {normalize(phrase) for phrase in blocklist}
+        self.recent = deque(maxlen=history) if history else None
+        self.lock = threading.Lock()
+        self.checked = 0
+        self.rejected = dict.fromkeys(REASONS, 0)
+
+    def check(self, text):
+        """Return the reason ``text`` is junk, or None to keep it"""
+        normalized = normalize(text)
+        words = normalized.split()
+        reason = None
+        if normalized in self.blocklist or is_credit(text):
+            reason = "blocklist"
+        elif longest_repeat(words) > self.max_repeats:
+            reason = "repetition"
+        elif len(normalized) >= 24 and compression_ratio(normalized) > self.max_compression:
+            # Short strings never compress well, so only longer ones are tested
+            reason = "compression"
+
+        with self.lock:
+            self.checked += 1
+            if reason is None and self.recent is not None:
+                if any(SequenceMatcher(None, normalized, previous).ratio() >= self.similarity
+                       for previous in self.recent):
+                    reason = "duplicate"
+                else:
+                    self.recent.append(normalized)
+            if reason is not None:
+                self.rejected[reason] += 1
+        if reason is not None:
+            FILTERED[reason].inc()
+        return reason
+
+    def reset(self):
+        with self.lock:
+            if self.recent is not None:
+                self.recent.clear()
+
+    def get_stats(self):
+        with self.lock:
+            saved = sum(self.rejected.values())
+            return {
+                "checked": self.checked,
+                "rejected": dict(self.rejected),
+                "translate_calls_saved": saved,
+                "write_calls_saved": saved
+            }
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Searchable store of every committed subtitle.
+
+Only the latest subtitle survives in ``subtitle.json``. TranscriptStore
+appends every source/translation pair to a SQLite database with an FTS5
+index over both texts. The pipeline only puts a tuple on a queue. A writer
+thread commits whatever has queued up, one transaction per batch, so a
+slow disk never holds up captions.
+
+Searches run on their own connection. WAL mode lets them read while the
+writer commits. TranscriptReader searches without a writer, over a
+read-only connection, for processes that only look lines up. A word search
+goes through the FTS index, and a time range through the
+``(session, timestamp)`` index. Both stay fast after hundreds of thousands
+of lines.
+
+Example:
+    python transcript_store.py search "weather" --session default
+    python transcript_store.py search --since 2024-05-01T18:00 --until 2024-05-01T19:00
+"""
+
+import os
+import sys
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from urllib.parse import quote
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    source_language TEXT,
+    target_language TEXT
+);
+CREATE INDEX IF NOT EXISTS lines_session_time ON lines (session, timestamp);
+CREATE INDEX IF NOT EXISTS lines_time ON lines (timestamp);
+"""
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts
+USING fts5(source, translation, content='lines', content_rowid='id', tokenize='unicode61');
+"""
+COLUMNS = ("id", "session", "timestamp", "source", "translation", "source_language", "target_language")
+_FLUSH = object()  # queued by flush() to end the current batch early
+
+
+def fts_query(text):
+    """Quote each word so user input cannot inject FTS syntax; words are ANDed"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class TranscriptReader:
+    """Read-only searches over a transcript database.
+
+    Parameters
+    ----------
+    path : str
+        SQLite database file; it must already exist.
+    """
+
+    def __init__(self, path="transcripts.db"):
+        self.path = path
+        connection = self._connect_readonly()
+        try:
+            self.fts = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'lines_fts'").fetchone() is not None
+        finally:
+            connection.close()
+
+    def _connect_readonly(self):
+        return sqlite3.connect(f"file:{quote(os.path.abspath(self.path))}?mode=ro", uri=True,
+                               timeout=10.0, check_same_thread=False)
+
+    def search(self, text=None, session=None, start=None, end=None, limit=50):
+        """Return matching lines, newest first, as dicts.
+
+        ``text`` matches words in either language; ``start`` and ``end``
+        are Unix timestamps bounding the line time. Text that is only
+        whitespace matches every line.
+        """
+        # An empty FTS query is a syntax error
+        text = text.strip() if text else None
+        conditions = []
+        params = []
+        if text and self.fts:
+            table = "lines_fts JOIN lines ON lines.id = lines_fts.rowid"
+            conditions.append("lines_fts MATCH ?")
+            params.append(fts_query(text))
+        else:
+            table = "lines"
+            if text:
+                conditions.append("(lines.source LIKE ? OR lines.translation LIKE ?)")
+                params.extend([f"%{text}%"] * 2)
+        if session is not None:
+            conditions.append("lines.session = ?")
+            params.append(session)
+        if start is not None:
+            conditions.append("lines.timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("lines.timestamp < ?")
+            params.append(end)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Lines are inserted in time order, and FTS5 can walk its rowids
+        # backwards, so a common word does not sort every match
+        order = "lines_fts.rowid" if text and self.fts else "lines.timestamp"
+        query = (f"SELECT {', '.join('lines.' + column for column in COLUMNS)} FROM {table} {where} "
+                 f"ORDER BY {order} DESC LIMIT ?")
+        connection = self._connect_readonly()
+        try:
+            rows = connection.execute(query, params + [int(limit)]).fetchall()
+        finally:
+            connection.close()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def sessions(self):
+        """Every session with its line count and time span"""
+        connection = self._connect_readonly()
+        try:
+            rows = connection.execute("SELECT session, COUNT(*), MIN(timestamp), MAX(timestamp) "
+                                      "FROM lines GROUP BY session").fetchall()
+        finally:
+            connection.close()
+        return [{"session": row[0], "lines": row[1], "first": row[2], "last": row[3]} for row in rows]
+
+
+class TranscriptStore(TranscriptReader):
+    """Append-only transcript database with a background batch writer.
+
+    Parameters
+    ----------
+    path : str
+        SQLite database file, created if missing.
+    batch_size : int
+        Most lines committed in one transaction.
+    flush_interval : float
+        Longest a queued line waits before it is committed.
+    max_pending : int
+        Lines queued before new ones are dropped, so a stalled disk cannot
+        grow memory without bound.
+    """
+
+    def __init__(self, path="transcripts.db", batch_size=256, flush_interval=0.5, max_pending=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+        connection = self._connect()
+        with connection:
+            connection.executescript(SCHEMA)
+            try:
+                connection.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError as e:
+                # Some SQLite builds lack FTS5; text search then falls back to LIKE
+                print(f"Full-text index unavailable ({e}); text search will scan")
+                self.fts = False
+        connection.close()
+
+        self.thread = threading.Thread(target=self._writer, name="transcript-writer", daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def append(self, session, source, translation, source_language=None, target_language=None, timestamp=None):
+        """Queue one committed line; never blocks"""
+        try:
+            self.pending.put_nowait((session, timestamp or time.time(), source, translation,
+                                     source_language, target_language))
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self):
+        connection = self._connect()
+        closing = False
+        while not closing:
+            try:
+                item = self.pending.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            batch = []
+            markers = 0
+            deadline = time.time() + self.flush_interval
+            while True:
+                if item is None or item is _FLUSH:
+                    # Commit now instead of waiting out the batch
+                    closing = item is None
+                    markers = 1
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.pending.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(connection, batch)
+            for _ in range(len(batch) + markers):
+                self.pending.task_done()
+        connection.close()
+
+    def _write_batch(self, connection, batch):
+        try:
+            with connection:
+                for row in batch:
+                    cursor = connection.execute(
+                        "INSERT INTO lines (session, timestamp, source, translation, source_language, target_language) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", row)
+                    if self.fts:
+                        connection.execute("INSERT INTO lines_fts (rowid, source, translation) VALUES (?, ?, ?)",
+                                           (cursor.lastrowid, row[2], row[3]))
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            print(f"Error writing transcripts: {e}")
+
+    def flush(self, timeout=5.0):
+        """Commit every queued line now and wait until it is done"""
+        try:
+            self.pending.put_nowait(_FLUSH)
+        except queue.Full:
+            pass  # a full queue is written in whole batches anyway
+        deadline = time.time() + timeout
+        while self.pending.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join(timeout=10.0)
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "written": self.written,
+            "pending": self.pending.qsize(),
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "full_text": self.fts
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path):
+    """Process-wide TranscriptStore per database file, closed at exit"""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            if not _stores:
+                atexit.register(close_stores)
+            store = _stores[path] = TranscriptStore(path)
+        return store
+
+
+def close_stores():
+    """Commit every queued line and stop the writers of ``open_store``'s stores"""
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+
+
+def parse_time(text):
+    """Unix timestamp from a number or an ISO 8601 local time"""
+    from datetime import datetime
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search stored transcripts")
+    parser.add_argument("--db", default="transcripts.db", help="Transcript database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="Find lines by text and/or time")
+    search.add_argument("text", nargs="?", help="Words to find in either language")
+    search.add_argument("--session", help="Only this session")
+    search.add_argument("--since", help="Start time (Unix seconds or ISO 8601)")
+    search.add_argument("--until", help="End time (Unix seconds or ISO 8601)")
+    search.add_argument("--limit", type=int, default=50)
+
+    commands.add_parser("sessions", help="List stored sessions")
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"No transcript database at {args.db}")
+        return 1
+    store = TranscriptReader(args.db)
+
+    if args.command == "sessions":
+        for row in store.sessions():
+            first = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["first"]))
+            last = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["last"]))
+            print(f"{row['session']}: {row['lines']} lines, {first} - {last}")
+    else:
+        start_time = time.perf_counter()
+        rows = store.search(args.text, args.session,
+                            parse_time(args.since) if args.since else None,
+                            parse_time(args.until) if args.until else None,
+                            args.limit)
+        for row in reversed(rows):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["timestamp"]))
+            print(f"[{stamp}] {row['session']}: {row['source']}")
+            print(f"{' ' * 22}{row['translation']}")
+        print(f"{len(rows)} line(s) in {(time.perf_counter() - start_time) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
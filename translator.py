@@ -1,6 +1,3 @@
-from googletrans import Translator as GoogleTranslator
-import gradio as gr
-
 class Translator:
     """Wrapper around Google Translate for English → target language translation.
 
@@ -21,6 +18,8 @@ class Translator:
         """Initialize the Google Translate client."""
         try:
             print("Initializing Google Translate client")
+            # Imported here so the CLI and workers start without httpx/googletrans
+            from googletrans import Translator as GoogleTranslator
             self.translator = GoogleTranslator()
             self.model = self.translator  # attribute used by other modules
             print("Translator ready")
@@ -29,22 +28,22 @@ class Translator:
             print(f"Error initializing translator: {e}")
             return False
 
-    def translate_text(self, english_text):
+    def translate_text(self, english_text, src="en"):
         """Translate a single English string to the target language."""
         if not self.model:
             return "Error: Translator not initialized."
         try:
-            result = self.translator.translate(english_text, src="en", dest=self.target_lang)
+            result = self.translator.translate(english_text, src=src, dest=self.target_lang)
             return result.text
         except Exception as e:
             return f"Translation error: {e}"
 
-    def translate_batch(self, english_texts):
+    def translate_batch(self, english_texts, src="en"):
         """Translate a list of English strings to the target language."""
         if not self.model:
             return ["Error: Translator not initialized"] * len(english_texts)
         try:
-            results = self.translator.translate(english_texts, src="en", dest=self.target_lang)
+            results = self.translator.translate(english_texts, src=src, dest=self.target_lang)
             if not isinstance(results, list):
                 results = [results]
             return [res.text for res in results]
@@ -54,6 +53,8 @@ class Translator:
 
 def create_gradio_interface():
     """Create a Gradio web interface for the translator."""
+    import gradio as gr
+
     translator = Translator()
 
     def translate_interface(text):